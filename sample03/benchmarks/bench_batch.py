@@ -0,0 +1,90 @@
+"""電卓の計算をまとめて行う calculate_batch() のスループットのベンチマーク。
+
+要素の数ごとに、1つの演算子と要素ごとの演算子の場合の calculate_batch() の
+1秒あたりの要素数を計り、要素ごとに calculate() を呼ぶ場合と比べる。
+
+--block より多い要素は、--block 個の入力を繰り返し計算して計る。10**8 個の入力と
+結果を一度にメモリに置かずに計れる。計る前に、一部の要素の結果が calculate() と
+同じ文字列になることを確かめる。
+
+実行方法 (sample03 ディレクトリで、NumPy が必要):
+
+    python benchmarks/bench_batch.py
+    python benchmarks/bench_batch.py --sizes 1000000 100000000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import numpy as np
+
+from calc_batch import OPERATORS, calculate_batch, format_batch
+from calc_engine import calculate
+
+
+def make_inputs(size, seed=0):
+    """0 や整数になる値を含む、大きさ size の入力を作る。"""
+    rng = np.random.default_rng(seed)
+    # 整数・0.25 刻み・0.1 刻みの値を混ぜる
+    op1 = rng.integers(-10**6, 10**6, size) / rng.choice([1.0, 4.0, 10.0], size)
+    op2 = rng.integers(-10**6, 10**6, size) / rng.choice([1.0, 4.0, 10.0], size)
+    op2[rng.random(size) < 0.01] = 0.0
+    ops = rng.choice(list(OPERATORS), size)
+    return op1, op2, ops
+
+
+def verify(op1, op2, ops, count=100_000):
+    """先頭の count 個の結果が calculate() と同じ文字列になることを確かめる。"""
+    op1, op2, ops = op1[:count], op2[:count], ops[:count]
+    for op in list(OPERATORS) + [ops]:
+        values, errors = calculate_batch(op1, op2, op)
+        per_element = ops if not isinstance(op, str) else [op] * len(op1)
+        expected = [
+            str(calculate(a, b, o)) for a, b, o in zip(op1.tolist(), op2.tolist(), per_element)
+        ]
+        if format_batch(values, errors) != expected:
+            raise AssertionError(f"calculate_batch differs from calculate for {op!r}")
+
+
+def throughput(size, block, op1, op2, op):
+    """size 個の要素を計算したときの1秒あたりの要素数を返す。"""
+    start = time.perf_counter()
+    done = 0
+    while done < size:
+        count = min(block, size - done)
+        calculate_batch(op1[:count], op2[:count], op if isinstance(op, str) else op[:count])
+        done += count
+    return size / (time.perf_counter() - start)
+
+
+def scalar_throughput(op1, op2, ops, count=200_000):
+    a, b, o = op1[:count].tolist(), op2[:count].tolist(), ops[:count].tolist()
+    start = time.perf_counter()
+    for x, y, op in zip(a, b, o):
+        calculate(x, y, op)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**6, 10**7, 10**8])
+    parser.add_argument("--block", type=int, default=10**7, help="一度に渡す要素の数")
+    args = parser.parse_args()
+
+    op1, op2, ops = make_inputs(min(max(args.sizes), args.block))
+    verify(op1, op2, ops)
+    scalar = scalar_throughput(op1, op2, ops)
+    print(f"{'case':<16} {'elements':>12} {'elements/s':>14} {'vs scalar':>10}")
+    print(f"{'scalar':<16} {'':>12} {scalar:>14.3g} {1:>9.1f}x")
+    for size in args.sizes:
+        for name, op in (("single op", "*"), ("per-element op", ops)):
+            rate = throughput(size, args.block, op1, op2, op)
+            print(f"{name:<16} {size:>12} {rate:>14.3g} {rate / scalar:>9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""式の計算のベンチマーク (eval() と src/expression.py の比較)。
+
+項の数ごとに、"1+2*3-4/5+..." のような長い式について次の時間を計る:
+
+- eval: eval(式)。"=" を押すたびに変換から行う以前の calc-01 の方法。
+  項が多すぎて eval() が RecursionError になる場合は failed と表示する。
+- compile: キャッシュを使わずに compile_expression() で変換して計算する時間。
+- cached: LRU キャッシュにある式を evaluate() で計算する時間。
+- "=" (incremental): ExpressionInput にキーを1つずつ追加した後の result() の時間。
+  "=" を押してから結果が出るまでの時間で、eval と比べる。
+- typing: ExpressionInput にキーを1つずつ追加する時間 (1キーあたり)。
+
+実行方法 (sample03 ディレクトリで):
+
+    python benchmarks/bench_expression.py
+    python benchmarks/bench_expression.py --terms 10 1000 --repeat 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from expression import ExpressionInput, compile_expression, evaluate
+
+OPERATORS = ["+", "*", "-", "/"]
+
+
+def chained(terms):
+    """terms 個の項を + * - / で順につないだ式を返す。"""
+    parts = ["1"]
+    for i in range(1, terms):
+        parts.append(OPERATORS[i % 4])
+        parts.append(str(i % 9 + 1))
+    return "".join(parts)
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(terms, repeat):
+    text = chained(terms)
+    try:
+        expected = eval(text)
+    except RecursionError:
+        expected = None
+    else:
+        assert str(evaluate(text)) == str(expected)
+
+    def typed():
+        entry = ExpressionInput()
+        for char in text:
+            entry.append(char)
+        return entry
+
+    entry = typed()
+    return {
+        "eval": best_time(lambda: eval(text), repeat) if expected is not None else None,
+        "compile": best_time(lambda: compile_expression.__wrapped__(text).evaluate(), repeat),
+        "cached": best_time(lambda: evaluate(text), repeat),
+        '"=" (incremental)': best_time(entry.result, repeat),
+        "typing": best_time(typed, repeat) / len(text),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terms", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'case':<20} {'terms':>8} {'time':>12} {'vs eval':>9}")
+    for terms in args.terms:
+        results = measure(terms, args.repeat)
+        base = results["eval"]
+        for name, seconds in results.items():
+            if seconds is None:
+                print(f"{name:<20} {terms:>8} {'failed':>12}")
+                continue
+            if name == "typing":
+                note = f"{'per key':>9}"
+            else:
+                note = f"{base / seconds:>8.1f}x" if base is not None else ""
+            print(f"{name:<20} {terms:>8} {seconds * 1e6:>10.1f}us {note}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
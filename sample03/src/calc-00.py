@@ -1,92 +1,57 @@
 import flet as ft
 
+from calc_engine import ERROR, CalculatorEngine
+from history_panel import HistoryPanel
+from tape import CalculationTape
+
+# 計算の記録を書き足すファイル
+TAPE_PATH = "storage/calc-00-tape.jsonl"
+# 記録に残すキー (数字の入力は、次の演算子と一緒に記録する)
+RECORDED_KEYS = ("+", "-", "*", "/", "=", "%", "+/-")
+
 def main(page: ft.Page):
     page.title = "Calc App"
-    # ── 状態変数 ─────────────────────────────────────────
-    page.operand1 = 0.0
-    page.operator = "+"
-    page.new_operand = True
+    # ── 状態 (計算は Flet を使わないエンジンで行う) ─────────────
+    engine = CalculatorEngine()
+    tape = CalculationTape(path=TAPE_PATH)
+    if tape.last is not None:
+        engine.restore(tape.last.state)
+    history = HistoryPanel(tape, rows=6, width=280, color=ft.Colors.WHITE54)
 
     # ── 画面に置くテキスト ─────────────────────────────────
-    result = ft.Text(value="0", size=30, color=ft.Colors.WHITE)
-
-    # ── ヘルパー関数 ───────────────────────────────────────
-    def format_number(n):
-        return int(n) if n == int(n) else n
-
-    def calculate(op1, op2, op):
-        if op == "+":
-            return format_number(op1 + op2)
-        if op == "-":
-            return format_number(op1 - op2)
-        if op == "*":
-            return format_number(op1 * op2)
-        if op == "/":
-            return "Error" if op2 == 0 else format_number(op1 / op2)
+    result = ft.Text(value=engine.display, size=30, color=ft.Colors.WHITE)
 
     # ── ボタン押下時イベント ─────────────────────────────────
     def on_click(e: ft.ControlEvent):
         data = e.control.data
 
-        # AC or Error → リセット
-        if data == "AC" or result.value == "Error":
-            page.operand1 = 0.0
-            page.operator = "+"
-            page.new_operand = True
-            result.value = "0"
-
-        # 数字・ドット
-        elif data in "0123456789.":
-            if result.value == "0" or page.new_operand:
-                result.value = data
+        # 取り消し・やり直し → テープに記録した状態に戻す
+        if data == "Undo":
+            if not tape.can_undo():
+                return
+            entry = tape.undo()
+            if entry is None:
+                engine.reset()
             else:
-                result.value += data
-            page.new_operand = False
-
-        # 演算子
-        elif data in "+-*/":
-            try:
-                curr = float(result.value)
-            except:
-                curr = 0.0
-            res = calculate(page.operand1, curr, page.operator)
-            result.value = str(res)
-            page.operand1 = 0.0 if res == "Error" else float(res)
-            page.operator = data
-            page.new_operand = True
-
-        # イコール
-        elif data == "=":
-            try:
-                curr = float(result.value)
-            except:
-                curr = 0.0
-            res = calculate(page.operand1, curr, page.operator)
-            result.value = str(res)
-            page.operand1 = 0.0
-            page.operator = "+"
-            page.new_operand = True
-
-        # パーセント
-        elif data == "%":
-            try:
-                curr = float(result.value)
-                result.value = str(format_number(curr / 100))
-            except:
-                result.value = "Error"
-            page.operand1 = 0.0
-            page.operator = "+"
-            page.new_operand = True
-
-        # 符号反転
-        elif data == "+/-":
-            try:
-                curr = float(result.value)
-                result.value = str(-curr)
-            except:
-                pass
-
-        result.update()
+                engine.restore(entry.state)
+        elif data == "Redo":
+            entry = tape.redo()
+            if entry is None:
+                return
+            engine.restore(entry.state)
+        else:
+            before = engine.display
+            engine.press(data)
+            # Error の後のキーはリセットだけなので記録しない
+            if data not in RECORDED_KEYS or before == ERROR:
+                result.value = engine.display
+                result.update()
+                return
+            tape.record(f"{before} {data}", engine.display, engine.snapshot())
+
+        result.value = engine.display
+        history.refresh(update=False)
+        page.update()
 
     # ── ボタン生成ユーティリティ ───────────────────────────
     def make_btn(txt, bg, fg, exp=1):
@@ -106,16 +71,17 @@ def main(page: ft.Page):
         [("4","WHITE24"),("5","WHITE24"),("6","WHITE24"),("-","ORANGE")],
         [("1","WHITE24"),("2","WHITE24"),("3","WHITE24"),("+","ORANGE")],
         [("0","WHITE24",2),(".","WHITE24",1),("=","ORANGE",1)],
+        [("Undo","BLUE_GREY_100"),("Redo","BLUE_GREY_100")],
     ]
 
-    controls = [ft.Row(controls=[result], alignment="end")]
+    controls = [history, ft.Row(controls=[result], alignment="end")]
     for row in rows:
         btns = []
         for spec in row:
             txt = spec[0]
             clr = getattr(ft.Colors, spec[1])
             exp = spec[2] if len(spec) == 3 else 1
-            fg = ft.Colors.WHITE if txt not in ("AC","+/-","%") else ft.Colors.BLACK
+            fg = ft.Colors.WHITE if txt not in ("AC","+/-","%","Undo","Redo") else ft.Colors.BLACK
             btns.append(make_btn(txt, clr, fg, exp))
         controls.append(ft.Row(controls=btns))
 
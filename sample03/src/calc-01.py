@@ -1,5 +1,16 @@
 import flet
 from flet import IconButton, Page, Row, TextField, icons, ElevatedButton
+from flet import Colors, LineChart, LineChartData, LineChartDataPoint, Text
+
+from expression import ExpressionInput
+from function_plot import evaluate_range
+from history_panel import HistoryPanel
+from tape import CalculationTape
+
+# Width of the chart in pixels; the plotted points are decimated to this many buckets
+CHART_WIDTH = 300
+# File the calculation tape is appended to
+TAPE_PATH = "storage/calc-01-tape.jsonl"
 
 def main(page: Page):
     page.title = "Flet Calculator"
@@ -8,36 +19,105 @@ def main(page: Page):
     # Text field to display the input and result
     txt_result = TextField(value="0", text_align="right", width=300)
 
-    # Store the expression
-    expression = ""
+    # Store the expression (parsed and partly evaluated as keys are appended)
+    expression = ExpressionInput()
+
+    # Every "=" is recorded on the tape; the state of an entry is the expression after it
+    tape = CalculationTape(path=TAPE_PATH)
+    history = HistoryPanel(tape, rows=6, width=300)
+    if tape.last is not None:
+        expression.set(tape.last.state)
+        txt_result.value = expression.text or "0"
+
+    # Go back to the expression of a tape entry (or the empty expression)
+    def restore(entry):
+        expression.set(entry.state if entry is not None else "")
+        txt_result.value = expression.text or "0"
 
     # Function to handle button clicks
     def button_clicked(e):
-        nonlocal expression
         button_text = e.control.text
         if button_text == "=":
+            label = expression.text
             try:
-                result = str(eval(expression))
+                result = str(expression.result())
                 txt_result.value = result
-                expression = result
-            except Exception as e:
+                expression.set(result)
+            except (ValueError, ArithmeticError):
                 txt_result.value = "Error"
-                expression = ""
+                expression.clear()
+            tape.record(label, txt_result.value, expression.text)
+            history.refresh(update=False)
+        elif button_text == "Undo":
+            if tape.can_undo():
+                restore(tape.undo())
+                history.refresh(update=False)
+        elif button_text == "Redo":
+            if tape.can_redo():
+                restore(tape.redo())
+                history.refresh(update=False)
         elif button_text == "C":
-            expression = ""
+            expression.clear()
             txt_result.value = "0"
+        elif button_text == "Plot":
+            plot_expression()
         else:
-            expression += button_text
-            txt_result.value = expression
+            expression.append(button_text)
+            txt_result.value = expression.text
         page.update()
 
+    # Range of x for the plot mode
+    txt_from = TextField(value="-10", label="x from", width=95)
+    txt_to = TextField(value="10", label="x to", width=95)
+    txt_points = TextField(value="1000000", label="points", width=110)
+    chart = LineChart(width=CHART_WIDTH, height=200, visible=False)
+    txt_stats = Text(width=300)
+
+    # Evaluate the expression over the range of x and show a decimated chart
+    def plot_expression():
+        try:
+            start = float(txt_from.value)
+            stop = float(txt_to.value)
+            result = evaluate_range(
+                expression.text, start, stop, int(txt_points.value), width=CHART_WIDTH
+            )
+        except ImportError as e:
+            chart.visible = False
+            txt_stats.value = str(e)
+            return
+        except (ValueError, ArithmeticError):
+            chart.visible = False
+            txt_stats.value = "Error"
+            return
+        stats = result.stats
+        chart.data_series = [
+            LineChartData(
+                data_points=[LineChartDataPoint(x, y) for x, y in result.chart_points()],
+                stroke_width=1,
+                color=Colors.BLUE,
+            )
+        ]
+        chart.min_x, chart.max_x = min(start, stop), max(start, stop)
+        chart.min_y = stats.min if stats.count else None
+        chart.max_y = stats.max if stats.count else None
+        chart.visible = bool(stats.count)
+        if stats.count:
+            txt_stats.value = (
+                f"min {stats.min:.6g} (x={stats.x_at_min:.6g}), "
+                f"max {stats.max:.6g} (x={stats.x_at_max:.6g})\n"
+                f"mean {stats.mean:.6g}, std {stats.std:.6g}, "
+                f"{stats.count} points, {stats.invalid} undefined"
+            )
+        else:
+            txt_stats.value = f"{stats.invalid} undefined points"
+
     # Define buttons
     buttons = [
         "7", "8", "9", "/",
         "4", "5", "6", "*",
         "1", "2", "3", "-",
         "0", ".", "=", "+",
-        "C"
+        "C", "x", "Plot"
     ]
 
     # Create rows of buttons
@@ -53,11 +133,21 @@ def main(page: Page):
                 )
             )
         rows.append(row)
+    rows.append(
+        Row(
+            [ElevatedButton(text=text, on_click=button_clicked) for text in ("Undo", "Redo")],
+            alignment="center",
+        )
+    )
 
     # Add controls to the page
     page.add(
+        history,
         txt_result,
         *rows,
+        Row([txt_from, txt_to, txt_points], alignment="center"),
+        chart,
+        txt_stats,
     )
 
 flet.app(target=main)
@@ -0,0 +1,119 @@
+"""電卓の計算 (calc_engine.calculate) を配列にまとめて行う。
+
+calculate_batch() は演算子の左右の値の配列と演算子 (1つ、または要素ごとの配列) を
+受け取り、NumPy でまとめて計算して、値の配列とエラーの配列を返す。結果は要素ごとに
+calculate() を呼んだ場合と同じになる:
+
+- 0 で割った要素はエラー (calculate() の "Error") になる。
+- 整数になる値は calculate() では int になる。値としては同じなので float64 のまま
+  返し、表示の文字列が必要なら format_batch() で calculate() と同じ文字列にする。
+  int になった -0.0 は 0 になるので、値も 0.0 にする。
+
+NumPy は必要なときだけ読み込む。pip install "sample03[batch]" で入れる。
+"""
+from calc_engine import ERROR, format_number
+
+# 一度に計算する要素の数。途中の配列の大きさをこの分に抑える
+CHUNK_SIZE = 1 << 16
+
+OPERATORS = "+-*/"
+
+
+def require_numpy():
+    """numpy モジュールを返す。入っていなければ、入れ方を書いた ImportError を送出する。"""
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError(
+            'NumPy is required; install it with pip install "sample03[batch]"'
+        ) from e
+    return numpy
+
+
+# 演算子 -> ufunc の名前
+UFUNCS = {"+": "add", "-": "subtract", "*": "multiply", "/": "divide"}
+
+
+def _operator_codes(np, op):
+    """要素ごとの演算子の配列を、文字コードの整数の配列にする。"""
+    op = np.asarray(op).ravel()
+    if op.dtype.kind == "U" and op.dtype.itemsize == 4:
+        return op.view(np.uint32)
+    if op.dtype.kind == "S" and op.dtype.itemsize == 1:
+        return op.view(np.uint8)
+    # 2文字以上の要素を含む配列は、知らない演算子として 0 にする
+    return np.array([ord(o) if len(o) == 1 else 0 for o in op.astype(str).tolist()], np.uint32)
+
+
+def calculate_batch(op1, op2, op, chunk_size=CHUNK_SIZE):
+    """要素ごとの op1 op op2 を計算する。
+
+    Args:
+        op1, op2 (array_like): 演算子の左右の値。float64 として計算する。
+        op (str | array_like): "+", "-", "*", "/" のどれか、または要素ごとの演算子の配列。
+        chunk_size (int): 一度に計算する要素の数。
+
+    Returns:
+        (values, errors): 結果の float64 の配列と、エラーになった要素が True の
+        bool の配列。エラーの要素の値は nan。
+
+    Raises:
+        ValueError: 配列の長さが違う場合や、知らない演算子がある場合。
+    """
+    np = require_numpy()
+    op1 = np.asarray(op1, dtype=np.float64).ravel()
+    op2 = np.asarray(op2, dtype=np.float64).ravel()
+    if isinstance(op, str):
+        if op not in UFUNCS:
+            raise ValueError(f"unknown operator: {op!r}")
+        codes = None
+    else:
+        codes = _operator_codes(np, op)
+        if len(codes) != len(op1):
+            raise ValueError("operands and operators must have the same length")
+    if len(op1) != len(op2):
+        raise ValueError("operands and operators must have the same length")
+
+    size = len(op1)
+    values = np.empty(size, dtype=np.float64)
+    errors = np.zeros(size, dtype=bool)
+    # チャンクごとに確保しないように、途中の配列を使い回す
+    mask = np.empty(min(size, chunk_size), dtype=bool)
+    known = np.empty(len(mask), dtype=bool)
+    with np.errstate(all="ignore"):
+        for start in range(0, size, chunk_size):
+            stop = min(start + chunk_size, size)
+            a = op1[start:stop]
+            b = op2[start:stop]
+            out = values[start:stop]
+            err = errors[start:stop]
+            if codes is None:
+                getattr(np, UFUNCS[op])(a, b, out=out)
+                if op == "/":
+                    np.equal(b, 0, out=err)
+            else:
+                m = mask[: stop - start]
+                k = known[: stop - start]
+                k[:] = False
+                # 演算子ごとに、その演算子の要素だけを計算する
+                for symbol, name in UFUNCS.items():
+                    np.equal(codes[start:stop], ord(symbol), out=m)
+                    k |= m
+                    getattr(np, name)(a, b, out=out, where=m)
+                    if symbol == "/":
+                        np.logical_and(m, b == 0, out=err)
+                if not k.all():
+                    index = start + int(np.argmin(k))
+                    raise ValueError(f"unknown operator at index {index}")
+            out[err] = np.nan
+            # format_number() で int になる -0.0 は 0 にする (0.0 を足すと 0.0 になる)
+            out += 0.0
+    return values, errors
+
+
+def format_batch(values, errors):
+    """calculate_batch() の結果を、calculate() の結果の str() と同じ文字列のリストにする。"""
+    return [
+        ERROR if error else str(format_number(value))
+        for value, error in zip(values.tolist(), errors.tolist())
+    ]
@@ -0,0 +1,236 @@
+"""Flet を使わない電卓のエンジン (calc-00 の計算処理)。
+
+CalculatorEngine はキー ("0"-"9", ".", "+", "-", "*", "/", "=", "%", "+/-", "AC")
+を受け取って表示の文字列を返す状態機械。画面の無いテストや回帰チェックで、
+記録したキー操作をまとめて再生できる:
+
+    engine = CalculatorEngine()
+    engine.feed(["1", "2", "+", "3", "="])  # -> "15"
+
+記録したキー操作のファイル (1行に1つの操作、キーは空白区切り) を再生するには:
+
+    python src/calc_engine.py sequences.txt
+    python src/calc_engine.py sequences.txt --expected results.txt
+"""
+import argparse
+import math
+import sys
+import time
+
+DIGITS = frozenset("0123456789.")
+OPERATORS = frozenset("+-*/")
+KEYS = DIGITS | OPERATORS | {"=", "%", "+/-", "AC"}
+
+ERROR = "Error"
+
+
+def format_number(n):
+    """整数になる値は int にする。inf と nan はそのまま返す。"""
+    return int(n) if math.isfinite(n) and n == int(n) else n
+
+
+def calculate(op1, op2, op):
+    """op1 op op2 を計算する。0 で割った場合は "Error" を返す。"""
+    if op == "+":
+        return format_number(op1 + op2)
+    if op == "-":
+        return format_number(op1 - op2)
+    if op == "*":
+        return format_number(op1 * op2)
+    if op == "/":
+        return ERROR if op2 == 0 else format_number(op1 / op2)
+    raise ValueError(f"unknown operator: {op!r}")
+
+
+def _parse(text):
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+class CalculatorEngine:
+    """calc-00 の電卓の状態機械。
+
+    状態:
+        display (str): 表示している文字列。
+        operand1 (float): 演算子の左側の値。
+        operator (str): 次に計算する演算子。
+        new_operand (bool): 次の数字キーで新しい数を入力し始めるか。
+
+    表示中の値は数値でも持っておき、計算の結果を表示した後に演算子を押したときに
+    表示の文字列を float() で読み直さない。読み直すのは数字キーで入力した数だけ。
+    """
+
+    __slots__ = ("display", "operand1", "operator", "new_operand", "_value")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """AC を押した状態に戻す。"""
+        self.display = "0"
+        self.operand1 = 0.0
+        self.operator = "+"
+        self.new_operand = True
+        # 表示中の値。None は display を読み直す必要があることを表す
+        self._value = 0.0
+
+    def snapshot(self):
+        """状態を JSON にできるリストで返す。restore() で戻せる。"""
+        return [self.display, self.operand1, self.operator, self.new_operand]
+
+    def restore(self, state):
+        """snapshot() で取った状態に戻す。"""
+        self.display, self.operand1, self.operator, self.new_operand = state
+        self._value = None
+
+    @property
+    def value(self):
+        """表示中の値 (float)。数として読めない表示は 0.0。"""
+        if self._value is None:
+            self._value = _parse(self.display)
+        return self._value
+
+    def press(self, key):
+        """キーを1つ押して、表示の文字列を返す。"""
+        return self.feed((key,))
+
+    def feed(self, keys):
+        """keys を順に押して、最後の表示の文字列を返す。
+
+        Raises:
+            ValueError: 電卓に無いキーが含まれている場合。それより前のキーは処理済み。
+        """
+        # 1キーごとの属性の読み書きを避けるため、状態をローカル変数に置いて処理する
+        display = self.display
+        operand1 = self.operand1
+        operator = self.operator
+        new_operand = self.new_operand
+        value = self._value
+        try:
+            for key in keys:
+                if key == "AC" or display == ERROR:
+                    if key not in KEYS:
+                        raise ValueError(f"unknown key: {key!r}")
+                    display, operand1, operator, new_operand, value = "0", 0.0, "+", True, 0.0
+                elif key in DIGITS:
+                    if new_operand or display == "0":
+                        display = key
+                    else:
+                        display += key
+                    new_operand = False
+                    value = None
+                elif key in OPERATORS or key == "=":
+                    result = calculate(
+                        operand1, _parse(display) if value is None else value, operator
+                    )
+                    display = str(result)
+                    if result == ERROR:
+                        operand1 = 0.0
+                    elif key == "=":
+                        operand1 = 0.0
+                        value = float(result)
+                    else:
+                        operand1 = value = float(result)
+                    operator = "+" if key == "=" else key
+                    new_operand = True
+                elif key == "%":
+                    try:
+                        if value is None:
+                            value = float(display)
+                        result = format_number(value / 100)
+                        display = str(result)
+                        value = float(result)
+                    except ValueError:
+                        display = ERROR
+                    operand1, operator, new_operand = 0.0, "+", True
+                elif key == "+/-":
+                    if value is None:
+                        try:
+                            value = float(display)
+                        except ValueError:
+                            # 数として読めない表示はそのまま
+                            continue
+                    value = -value
+                    display = str(value)
+                else:
+                    raise ValueError(f"unknown key: {key!r}")
+        finally:
+            self.display = display
+            self.operand1 = operand1
+            self.operator = operator
+            self.new_operand = new_operand
+            self._value = value
+        return display
+
+
+def replay(sequences):
+    """キー操作の列ごとに、新しい電卓で押したときの最後の表示のリストを返す。
+
+    記録したキー操作には同じ列が何度も現れるので、同じ列は1回だけ計算する。
+    """
+    engine = CalculatorEngine()
+    reset = engine.reset
+    feed = engine.feed
+    seen = {}
+    results = []
+    append = results.append
+    for keys in sequences:
+        keys = tuple(keys)
+        result = seen.get(keys)
+        if result is None:
+            reset()
+            seen[keys] = result = feed(keys)
+        append(result)
+    return results
+
+
+def read_sequences(path):
+    """1行に1つ、空白区切りのキー操作の列を読む。空行は除く。"""
+    with open(path, encoding="utf-8") as f:
+        return [line.split() for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記録したキー操作を電卓のエンジンで再生する。")
+    parser.add_argument("sequences", help="1行に1つ、空白区切りのキー操作の列のファイル")
+    parser.add_argument("--expected", help="各行の期待する表示のファイル。違う行があれば失敗する")
+    args = parser.parse_args()
+
+    sequences = read_sequences(args.sequences)
+    start = time.perf_counter()
+    results = replay(sequences)
+    elapsed = time.perf_counter() - start
+    keys = sum(len(keys) for keys in sequences)
+
+    if args.expected:
+        with open(args.expected, encoding="utf-8") as f:
+            expected = [line.strip() for line in f if line.strip()]
+        failures = [
+            (line, want, got)
+            for line, (want, got) in enumerate(zip(expected, results), start=1)
+            if want != got
+        ]
+        if len(expected) != len(results):
+            print(f"FAIL: {len(expected)} expected results for {len(results)} sequences")
+            return 1
+        for line, want, got in failures:
+            print(f"FAIL: line {line}: expected {want}, got {got}")
+        if failures:
+            return 1
+    else:
+        for result in results:
+            print(result)
+
+    rate = keys / elapsed if elapsed else float("inf")
+    print(
+        f"{len(sequences)} sequences, {keys} keys in {elapsed * 1000:.1f} ms "
+        f"({rate / 1e6:.2f}M keys/s)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
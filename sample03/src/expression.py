@@ -0,0 +1,296 @@
+"""calc-01 の式を eval() を使わずに計算するパーサー。
+
+式は数と + - * / // ** (単項の + - を含む) からなり、優先順位と計算結果は
+Python の eval() と同じになる。式は逆ポーランド記法のコードに変換してから計算する。
+
+- compile_expression(text) は変換したコードを LRU キャッシュに入れておくので、
+  同じ式を何度計算しても変換は1回で済む。
+- ExpressionInput はキーを1つずつ受け取りながら式を読み、計算できる部分は
+  その場で計算しておく。"=" を押したときに残っている計算だけを行う。
+
+compile_expression(text, variables=("x",)) のように変数を許すと、式に x を書けて、
+evaluate(x=...) で値を渡して計算する。値には NumPy の配列も渡せる。
+"""
+import functools
+import operator
+import re
+
+# 整数のべき乗の結果の大きさの上限 (ビット数)。eval() と違い、これを超える計算は
+# 途中でエラーにして、9**9**9 のような式で止まらないようにする
+MAX_POWER_BITS = 1_000_000
+
+NUMBER = re.compile(r"(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?")
+INTEGER = re.compile(r"[1-9][0-9]*|0+")
+TOKEN = re.compile(
+    r"\s*(?:(?P<number>[0-9.](?:[0-9.eE]|(?<=[eE])[+-])*)|(?P<op>\*\*|//|[-+*/])"
+    r"|(?P<name>[A-Za-z_][A-Za-z_0-9]*)|(?P<other>\S))"
+)
+
+
+class ExpressionError(ValueError):
+    """式の書き方が正しくない。"""
+
+
+def power(base, exponent):
+    if (
+        isinstance(base, int)
+        and isinstance(exponent, int)
+        and exponent > 0
+        and abs(base) > 1
+        and (base.bit_length() - 1) * exponent > MAX_POWER_BITS
+    ):
+        raise OverflowError("power result too large")
+    return base ** exponent
+
+
+# 演算子 -> (優先順位, 関数)。優先順位は Python と同じ
+BINARY = {
+    "+": (1, operator.add),
+    "-": (1, operator.sub),
+    "*": (2, operator.mul),
+    "/": (2, operator.truediv),
+    "//": (2, operator.floordiv),
+    "**": (4, power),
+}
+UNARY = {"+": (3, operator.pos), "-": (3, operator.neg)}
+RIGHT_ASSOCIATIVE = 4
+
+
+def parse_number(text):
+    """数のトークンを int か float にする。Python のリテラルとして正しくなければエラー。"""
+    if not NUMBER.fullmatch(text):
+        raise ExpressionError(f"invalid number: {text!r}")
+    if "." in text or "e" in text or "E" in text:
+        return float(text)
+    if not INTEGER.fullmatch(text):
+        # Python と同じく 007 のような 0 で始まる整数は書けない
+        raise ExpressionError(f"leading zeros in integer: {text!r}")
+    return int(text)
+
+
+def tokenize(text):
+    """text を ("number" | "op" | "name", 文字列) のトークンに分ける。"""
+    for match in TOKEN.finditer(text):
+        kind = match.lastgroup
+        if kind == "other":
+            raise ExpressionError(f"unexpected character: {match.group(kind)!r}")
+        yield kind, match.group(kind)
+
+
+class Parser:
+    """トークンを受け取り、逆ポーランド記法のコードを code に追加していく。
+
+    code の要素は (0, 数), (1, 単項の関数), (2, 二項の関数), (-1, 変数名) のいずれか。
+    使える変数名は variables で指定する。
+    優先順位が決まった部分からすぐに code に追加するので、トークンを受け取る
+    たびに code の増えた分を計算していける。
+    """
+
+    __slots__ = ("code", "variables", "_ops", "_expect_operand")
+
+    def __init__(self, variables=()):
+        self.code = []
+        self.variables = variables
+        # (優先順位, 引数の数, 関数) のスタック
+        self._ops = []
+        self._expect_operand = True
+
+    def feed(self, kind, text):
+        if kind == "number":
+            if not self._expect_operand:
+                raise ExpressionError(f"unexpected number: {text!r}")
+            self.code.append((0, parse_number(text)))
+            self._expect_operand = False
+        elif kind == "name":
+            if text not in self.variables:
+                raise ExpressionError(f"unknown name: {text!r}")
+            if not self._expect_operand:
+                raise ExpressionError(f"unexpected name: {text!r}")
+            self.code.append((-1, text))
+            self._expect_operand = False
+        elif self._expect_operand:
+            if text not in UNARY:
+                raise ExpressionError(f"unexpected operator: {text!r}")
+            precedence, func = UNARY[text]
+            self._ops.append((precedence, 1, func))
+        else:
+            precedence, func = BINARY[text]
+            ops = self._ops
+            code = self.code
+            while ops and (
+                ops[-1][0] > precedence
+                or (ops[-1][0] == precedence and precedence != RIGHT_ASSOCIATIVE)
+            ):
+                _, arity, top = ops.pop()
+                code.append((arity, top))
+            ops.append((precedence, 2, func))
+            self._expect_operand = True
+
+    def copy(self):
+        """code を空にして、それ以外の状態を写したパーサーを返す。"""
+        parser = Parser(self.variables)
+        parser._ops = list(self._ops)
+        parser._expect_operand = self._expect_operand
+        return parser
+
+    def tail(self):
+        """式がここで終わる場合に、残りの演算子のコードを返す。状態は変えない。"""
+        if self._expect_operand:
+            raise ExpressionError("incomplete expression")
+        return [(arity, func) for _, arity, func in reversed(self._ops)]
+
+
+def run(code, stack, env=None):
+    """code を計算して、結果を stack に積む。変数の値は env から取る。"""
+    for arity, arg in code:
+        if arity == 0:
+            stack.append(arg)
+        elif arity == 2:
+            right = stack.pop()
+            stack[-1] = arg(stack[-1], right)
+        elif arity == 1:
+            stack[-1] = arg(stack[-1])
+        else:
+            stack.append(env[arg])
+
+
+class Expression:
+    """変換済みの式。evaluate() で計算する。"""
+
+    __slots__ = ("text", "code", "variables")
+
+    def __init__(self, text, code):
+        self.text = text
+        self.code = code
+        # 式で使っている変数名
+        self.variables = frozenset(arg for arity, arg in code if arity < 0)
+
+    def evaluate(self, **env):
+        """式を計算する。変数の値はキーワード引数で渡す。"""
+        stack = []
+        run(self.code, stack, env)
+        return stack[0]
+
+    def __repr__(self):
+        return f"Expression({self.text!r})"
+
+
+@functools.lru_cache(maxsize=256)
+def compile_expression(text, variables=()):
+    """text を Expression に変換する。
+
+    Args:
+        text (str): 式。
+        variables (tuple[str]): 式で使える変数名。
+
+    Raises:
+        ExpressionError: 式の書き方が正しくない場合。
+    """
+    parser = Parser(variables)
+    for kind, token in tokenize(text):
+        parser.feed(kind, token)
+    return Expression(text, tuple(parser.code + parser.tail()))
+
+
+def evaluate(text):
+    """式 text を計算する。
+
+    Raises:
+        ExpressionError: 式の書き方が正しくない場合。
+        ArithmeticError: 0 で割った場合や、結果が大きすぎる場合。
+    """
+    return compile_expression(text).evaluate()
+
+
+class ExpressionInput:
+    """キーを追加しながら式を読み、計算できる部分から計算しておく入力欄。
+
+    書き方の誤りや計算のエラーは、result() を呼んだときに送出する。
+    """
+
+    def __init__(self, text=""):
+        self.clear()
+        self.append(text)
+
+    def clear(self):
+        self.text = ""
+        self._parser = Parser()
+        self._values = []
+        # 読み終えていない最後のトークン
+        self._pending = ""
+        self._error = None
+
+    def set(self, text):
+        """式を text に置き換える。"""
+        self.clear()
+        self.append(text)
+
+    def append(self, chars):
+        """式の末尾に chars を追加する。"""
+        self.text += chars
+        for char in chars:
+            pending = self._pending
+            if pending and self._extends(pending, char):
+                self._pending = pending + char
+                # ** と // はそれ以上長くならない
+                if self._pending in ("**", "//"):
+                    self._flush()
+                continue
+            self._flush()
+            if char in "+-":
+                self._feed("op", char)
+            elif char in "0123456789.*/":
+                self._pending = char
+            elif not char.isspace():
+                self._fail(ExpressionError(f"unexpected character: {char!r}"))
+
+    @staticmethod
+    def _extends(pending, char):
+        if pending in ("*", "/"):
+            return char == pending
+        if pending[0] in "0123456789.":
+            return char in "0123456789.eE" or (char in "+-" and pending[-1] in "eE")
+        return False
+
+    def _flush(self):
+        pending, self._pending = self._pending, ""
+        if not pending:
+            return
+        self._feed(self._kind(pending), pending)
+
+    @staticmethod
+    def _kind(token):
+        return "number" if token[0] in "0123456789." else "op"
+
+    def _feed(self, kind, text):
+        if self._error is not None:
+            return
+        try:
+            self._parser.feed(kind, text)
+            # 計算済みのコードは残さない
+            code = self._parser.code
+            run(code, self._values)
+            code.clear()
+        except (ValueError, ArithmeticError) as e:
+            self._fail(e)
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+
+    def result(self):
+        """式の値を返す。入力の状態は変えない。
+
+        Raises:
+            ExpressionError: 式の書き方が正しくない場合。
+            ArithmeticError: 0 で割った場合や、結果が大きすぎる場合。
+        """
+        if self._error is not None:
+            raise self._error
+        # 残りのトークンと演算子だけを、計算済みの値の写しの上で計算する
+        parser = self._parser.copy()
+        if self._pending:
+            parser.feed(self._kind(self._pending), self._pending)
+        values = list(self._values)
+        run(parser.code + parser.tail(), values)
+        return values[0]
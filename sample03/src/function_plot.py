@@ -0,0 +1,157 @@
+"""x を含む式を範囲の上で計算して、グラフ用に間引いた点と統計を作る。
+
+evaluate_range() は start から stop までを points 個に等分した x で式を計算する。
+x の配列は chunk_size 個ずつ作って NumPy でまとめて計算するので、points が
+大きくても使うメモリは chunk_size 個分とグラフの幅の分だけで済む。
+
+グラフの点は、横軸を width 個の区間 (画面のピクセル) に分け、区間ごとの最小値と
+最大値だけを残す。点の数は最大 2 * width 個になり、計算した点の数によらない。
+
+計算できない点 (0 での割り算、inf、nan など) は統計とグラフから除き、数だけを数える。
+"""
+import math
+
+from calc_batch import require_numpy
+from expression import compile_expression
+
+# 一度に計算する x の数
+CHUNK_SIZE = 1 << 16
+
+
+class RangeStats:
+    """計算できた点の数・最小・最大・平均・標準偏差と、計算できなかった点の数。"""
+
+    def __init__(self):
+        self.count = 0
+        self.invalid = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.x_at_min = None
+        self.x_at_max = None
+        self.mean = 0.0
+        # 平均との差の2乗の合計
+        self._m2 = 0.0
+
+    @property
+    def std(self):
+        """母標準偏差。点が無い場合は nan。"""
+        return math.sqrt(self._m2 / self.count) if self.count else math.nan
+
+    def add(self, np, xs, ys):
+        """計算できた点 xs, ys を加える。"""
+        count = len(ys)
+        if not count:
+            return
+        low = int(np.argmin(ys))
+        high = int(np.argmax(ys))
+        if ys[low] < self.min:
+            self.min = float(ys[low])
+            self.x_at_min = float(xs[low])
+        if ys[high] > self.max:
+            self.max = float(ys[high])
+            self.x_at_max = float(xs[high])
+        # チャンクごとの平均と2乗和を合わせる (Chan らの方法)
+        mean = float(ys.mean())
+        m2 = float(np.square(ys - mean).sum())
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "invalid": self.invalid,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "x_at_min": self.x_at_min,
+            "x_at_max": self.x_at_max,
+            "mean": self.mean if self.count else None,
+            "std": self.std if self.count else None,
+        }
+
+
+class RangeResult:
+    """evaluate_range() の結果。
+
+    Attributes:
+        x: 区間ごとの最初の点の x。点の無い区間は nan。
+        low, high: 区間ごとの y の最小値と最大値。計算できた点の無い区間は nan。
+        stats (RangeStats): 全体の統計。
+    """
+
+    def __init__(self, x, low, high, stats):
+        self.x = x
+        self.low = low
+        self.high = high
+        self.stats = stats
+
+    def chart_points(self):
+        """グラフに送る (x, y) のリスト。区間ごとに最小値と最大値の2点 (同じなら1点)。"""
+        points = []
+        for x, low, high in zip(self.x.tolist(), self.low.tolist(), self.high.tolist()):
+            if low != low:
+                # nan: 計算できた点が無い
+                continue
+            points.append((x, low))
+            if high != low:
+                points.append((x, high))
+        return points
+
+
+def evaluate_range(text, start, stop, points, width=300, chunk_size=CHUNK_SIZE):
+    """x を start から stop まで points 個に等分して式 text を計算する。
+
+    Args:
+        text (str): x を含んでよい式。
+        start, stop (float): x の範囲 (両端を含む)。
+        points (int): 計算する点の数。
+        width (int): グラフの区間の数 (ピクセル数)。
+        chunk_size (int): 一度に計算する点の数。
+
+    Returns:
+        RangeResult
+
+    Raises:
+        ExpressionError: 式の書き方が正しくない場合。
+        ArithmeticError: x によらない部分が計算できない場合 (1/0 など)。
+        ValueError: points か width が 1 未満の場合。
+    """
+    np = require_numpy()
+    if points < 1 or width < 1:
+        raise ValueError("points and width must be at least 1")
+    expression = compile_expression(text, ("x",))
+    width = min(width, points)
+    step = (stop - start) / (points - 1) if points > 1 else 0.0
+
+    bucket_x = np.full(width, np.nan)
+    low = np.full(width, np.nan)
+    high = np.full(width, np.nan)
+    stats = RangeStats()
+    with np.errstate(all="ignore"):
+        for first in range(0, points, chunk_size):
+            last = min(first + chunk_size, points)
+            index = np.arange(first, last)
+            xs = start + index * step
+            if last == points and points > 1:
+                # linspace と同じく、最後の点は stop そのものにする
+                xs[-1] = stop
+            ys = np.asarray(expression.evaluate(x=xs), dtype=np.float64)
+            if ys.shape != xs.shape:
+                # x を含まない式
+                ys = np.broadcast_to(ys, xs.shape)
+            valid = np.isfinite(ys)
+            stats.invalid += len(ys) - int(valid.sum())
+            stats.add(np, xs[valid], ys[valid])
+            ys = np.where(valid, ys, np.nan)
+
+            # チャンクの中で区間が変わる位置ごとに、最小値と最大値をまとめて求める
+            buckets = index * width // points
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+            ids = buckets[starts]
+            low[ids] = np.fmin(low[ids], np.fmin.reduceat(ys, starts))
+            high[ids] = np.fmax(high[ids], np.fmax.reduceat(ys, starts))
+            new = np.isnan(bucket_x[ids])
+            bucket_x[ids[new]] = xs[starts[new]]
+    return RangeResult(bucket_x, low, high, stats)
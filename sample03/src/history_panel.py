@@ -0,0 +1,74 @@
+"""計算の記録 (CalculationTape) を表示するパネル。
+
+表示する行の数だけ Text を作っておき、スクロールしたときや記録が増えたときは
+それらの文字列を入れ替えるだけにする。記録が何件あっても、画面に送る
+コントロールの数と大きさは変わらない。
+"""
+import flet as ft
+
+
+class HistoryPanel(ft.Column):
+    """テープの記録のうち、見えている rows 行だけを表示するパネル。
+
+    最後の記録を表示しているときは、記録が増えると一緒にスクロールする。
+    マウスのホイールか、下のスライダー (左が最も古い記録) でスクロールできる。
+    """
+
+    def __init__(self, tape, rows=8, width=300, color=None):
+        """HistoryPanel の初期化メソッド。
+
+        Args:
+            tape (CalculationTape): 表示するテープ。
+            rows (int): 表示する行の数。
+            width (int): パネルの幅。
+            color (str): 文字の色。
+        """
+        super().__init__(spacing=0, width=width)
+        self.tape = tape
+        self.rows = rows
+        # 表示している最初の記録の番号
+        self.offset = 0
+        # 最後の記録まで表示しているか
+        self.follow = True
+        self.lines = [
+            ft.Text(size=14, color=color, no_wrap=True, text_align=ft.TextAlign.RIGHT, width=width)
+            for _ in range(rows)
+        ]
+        self.slider = ft.Slider(min=0, max=1, value=0, width=width, on_change=self.slider_changed)
+        self.controls = [
+            ft.GestureDetector(
+                content=ft.Column(controls=self.lines, spacing=0),
+                on_scroll=self.scrolled,
+            ),
+            self.slider,
+        ]
+        self.refresh(update=False)
+
+    def refresh(self, update=True):
+        """テープの変更を表示に反映する。"""
+        count = len(self.tape)
+        last_offset = max(count - self.rows, 0)
+        if self.follow or self.offset > last_offset:
+            self.offset = last_offset
+        self.follow = self.offset == last_offset
+        entries = self.tape.entries(self.offset, self.offset + self.rows)
+        for line, entry in zip(self.lines, entries + [None] * (self.rows - len(entries))):
+            line.value = f"{entry.label} → {entry.result}" if entry is not None else ""
+        self.slider.max = max(last_offset, 1)
+        self.slider.value = self.offset
+        self.slider.disabled = last_offset == 0
+        if update:
+            self.update()
+
+    def scroll_to(self, offset):
+        count = len(self.tape)
+        self.offset = min(max(int(offset), 0), max(count - self.rows, 0))
+        self.follow = False
+        self.refresh()
+
+    def scrolled(self, e: ft.ScrollEvent):
+        if e.scroll_delta_y:
+            self.scroll_to(self.offset + (1 if e.scroll_delta_y > 0 else -1))
+
+    def slider_changed(self, e):
+        self.scroll_to(round(self.slider.value))
@@ -0,0 +1,208 @@
+"""電卓の計算の記録 (テープ)。
+
+CalculationTape は計算の記録を、大きさ capacity の配列を輪のように使って持つ。
+capacity 件を超えると古い記録から上書きするので、長く使ってもメモリは増えない。
+記録の追加・取り消し (undo)・やり直し (redo) はどれも O(1)。
+
+path を指定すると、追加・取り消し・やり直しをファイルの末尾に1行ずつ書き足し、
+次に開いたときに読み直す。ファイルの行数が capacity の compact_factor 倍を
+超えたら、残っている記録だけのファイルに書き直す。
+"""
+import json
+import os
+
+
+class TapeEntry:
+    """1件の記録。
+
+    Attributes:
+        label (str): 表示する操作 (式など)。
+        result (str): 操作の後の表示。
+        state: 取り消しややり直しで電卓を戻すための状態。JSON にできる値。
+    """
+
+    __slots__ = ("label", "result", "state")
+
+    def __init__(self, label, result, state):
+        self.label = label
+        self.result = result
+        self.state = state
+
+    def __repr__(self):
+        return f"TapeEntry({self.label!r}, {self.result!r})"
+
+
+class CalculationTape:
+    """大きさの決まった配列に計算を記録し、取り消しとやり直しができるテープ。
+
+    len(tape) と tape[i] は取り消されていない記録 (古い順) を表す。取り消した記録は、
+    新しい記録を追加するまでやり直せる。
+    """
+
+    def __init__(self, capacity=10000, path=None, compact_factor=4):
+        """CalculationTape の初期化メソッド。
+
+        Args:
+            capacity (int): 持っておく記録の最大数。
+            path (str): 記録を書き足すファイルのパス。省略時はファイルに書かない。
+            compact_factor (int): ファイルを書き直すまでの行数 (capacity の倍数)。
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.path = path
+        self.compact_factor = compact_factor
+        self._entries = [None] * capacity
+        # 最も古い記録の位置
+        self._start = 0
+        # 取り消した記録も含む記録の数
+        self._size = 0
+        # 取り消されていない記録の数
+        self._cursor = 0
+        self._file = None
+        self._lines = 0
+        if path is not None:
+            self._load()
+
+    def __len__(self):
+        return self._cursor
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._cursor
+        if not 0 <= index < self._cursor:
+            raise IndexError("tape index out of range")
+        return self._entries[(self._start + index) % self.capacity]
+
+    def entries(self, start, stop):
+        """start 番目から stop 番目の手前までの記録のリストを返す。"""
+        start = max(start, 0)
+        stop = min(stop, self._cursor)
+        return [self[i] for i in range(start, stop)]
+
+    @property
+    def last(self):
+        """最後の記録。無ければ None。"""
+        return self[-1] if self._cursor else None
+
+    def can_undo(self):
+        return self._cursor > 0
+
+    def can_redo(self):
+        return self._cursor < self._size
+
+    def record(self, label, result, state=None):
+        """記録を追加する。取り消した記録はやり直せなくなる。"""
+        self._record(TapeEntry(label, result, state))
+        self._write({"op": "record", "label": label, "result": result, "state": state})
+
+    def undo(self):
+        """最後の記録を取り消して、その前の記録を返す。前の記録が無ければ None。
+
+        取り消す記録が無い場合は何もせず None を返す。
+        """
+        if not self._undo():
+            return None
+        self._write({"op": "undo"})
+        return self.last
+
+    def redo(self):
+        """最後に取り消した記録をやり直して、その記録を返す。無ければ None。"""
+        if not self._redo():
+            return None
+        self._write({"op": "redo"})
+        return self.last
+
+    def clear(self):
+        """すべての記録を消す。ファイルも空にする。"""
+        self._entries = [None] * self.capacity
+        self._start = self._size = self._cursor = 0
+        if self.path is not None:
+            self._rewrite()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _record(self, entry):
+        capacity = self.capacity
+        self._size = self._cursor
+        if self._size == capacity:
+            # いっぱいなので最も古い記録を上書きする
+            self._entries[self._start] = entry
+            self._start = (self._start + 1) % capacity
+        else:
+            self._entries[(self._start + self._size) % capacity] = entry
+            self._size += 1
+        self._cursor = self._size
+
+    def _undo(self):
+        if not self._cursor:
+            return False
+        self._cursor -= 1
+        return True
+
+    def _redo(self):
+        if self._cursor >= self._size:
+            return False
+        self._cursor += 1
+        return True
+
+    def _load(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        complete = True
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    self._lines += 1
+                    complete = line.endswith("\n")
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # 書き込みの途中で終了した最後の行
+                        continue
+                    kind = op.get("op")
+                    if kind == "record":
+                        self._record(TapeEntry(op["label"], op["result"], op.get("state")))
+                    elif kind == "undo":
+                        self._undo()
+                    elif kind == "redo":
+                        self._redo()
+        except FileNotFoundError:
+            pass
+        self._file = open(self.path, "a", encoding="utf-8")
+        if not complete:
+            # 途中で終わった行に続けて書かないように改行する
+            self._file.write("\n")
+            self._file.flush()
+
+    def _write(self, op):
+        if self._file is None:
+            return
+        self._file.write(json.dumps(op, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._lines += 1
+        if self._lines > self.capacity * self.compact_factor:
+            self._rewrite()
+
+    def _rewrite(self):
+        """残っている記録だけのファイルに書き直す。"""
+        self.close()
+        tmp_path = self.path + ".tmp"
+        lines = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for i in range(self._size):
+                entry = self._entries[(self._start + i) % self.capacity]
+                op = {"op": "record", "label": entry.label, "result": entry.result, "state": entry.state}
+                f.write(json.dumps(op, ensure_ascii=False) + "\n")
+                lines += 1
+            # 取り消した記録もやり直せるように残す
+            for _ in range(self._size - self._cursor):
+                f.write('{"op": "undo"}\n')
+                lines += 1
+        os.replace(tmp_path, self.path)
+        self._lines = lines
+        self._file = open(self.path, "a", encoding="utf-8")
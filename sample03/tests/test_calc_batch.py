@@ -0,0 +1,134 @@
+import unittest
+import itertools
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from calc_batch import OPERATORS, require_numpy
+from calc_engine import ERROR, calculate
+
+try:
+    np = require_numpy()
+except ImportError:
+    np = None
+else:
+    from calc_batch import calculate_batch, format_batch
+
+SPECIAL_VALUES = [0.0, -0.0, 1.0, -1.0, 0.1, 2.5, 1e308, -1e308, 5e-324, math.inf, -math.inf, math.nan]
+
+
+def special_pairs():
+    """特別な値 (±0.0, inf, nan など) のすべての組み合わせ。"""
+    pairs = list(itertools.product(SPECIAL_VALUES, repeat=2))
+    return [a for a, _ in pairs], [b for _, b in pairs]
+
+
+def random_operands(count, seed=0):
+    """整数・0.25 刻み・0.1 刻みの値と 0 を混ぜた値のリスト。"""
+    rng = random.Random(seed)
+    values = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            values.append(rng.choice([0.0, -0.0]))
+        else:
+            values.append(rng.randint(-1000, 1000) / rng.choice([1.0, 4.0, 10.0]))
+    return values
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestCalculateBatch(unittest.TestCase):
+    def assertSameAsScalar(self, op1, op2, op, **kwargs):
+        values, errors = calculate_batch(op1, op2, op, **kwargs)
+        ops = [op] * len(op1) if isinstance(op, str) else np.asarray(op).astype(str).tolist()
+        self.assertEqual(len(values), len(op1))
+        for i, (a, b, o) in enumerate(zip(op1, op2, ops)):
+            expected = calculate(a, b, o)
+            msg = f"{a!r} {o} {b!r}"
+            if expected == ERROR:
+                self.assertTrue(errors[i], msg=msg)
+                self.assertTrue(math.isnan(values[i]), msg=msg)
+                continue
+            self.assertFalse(errors[i], msg=msg)
+            value = float(values[i])
+            if math.isnan(expected):
+                self.assertTrue(math.isnan(value), msg=msg)
+            else:
+                self.assertEqual(value, expected, msg=msg)
+                # 0 は符号も同じ (int になった -0.0 は 0.0)
+                self.assertEqual(math.copysign(1, value), math.copysign(1, expected), msg=msg)
+        self.assertEqual(
+            format_batch(values, errors),
+            [str(calculate(a, b, o)) for a, b, o in zip(op1, op2, ops)],
+        )
+
+    def test_special_values(self):
+        op1, op2 = special_pairs()
+        for op in OPERATORS:
+            with self.subTest(op=op):
+                self.assertSameAsScalar(op1, op2, op)
+
+    def test_division_by_zero(self):
+        values, errors = calculate_batch([1.0, 0.0, -2.0, math.nan, math.inf], [0.0, 0.0, -0.0, 0.0, 0.0], "/")
+        self.assertEqual(errors.tolist(), [True] * 5)
+        self.assertTrue(np.isnan(values).all())
+        self.assertEqual(format_batch(values, errors), [ERROR] * 5)
+
+    def test_negative_zero_becomes_zero(self):
+        values, errors = calculate_batch([-0.0, 0.0, -1.0, -0.0], [-0.0, -0.0, 0.0, 5.0], ["+", "-", "*", "/"])
+        self.assertEqual(values.tolist(), [0.0] * 4)
+        self.assertEqual([math.copysign(1, v) for v in values.tolist()], [1.0] * 4)
+        self.assertEqual(format_batch(values, errors), ["0"] * 4)
+        self.assertEqual([str(calculate(-0.0, -0.0, "+"))], ["0"])
+
+    def test_operator_per_element(self):
+        op1 = random_operands(2000, seed=1)
+        op2 = random_operands(2000, seed=2)
+        rng = random.Random(3)
+        ops = [rng.choice(OPERATORS) for _ in op1]
+        self.assertSameAsScalar(op1, op2, ops)
+        self.assertSameAsScalar(op1, op2, np.array(ops))
+        self.assertSameAsScalar(op1, op2, np.array(ops, dtype="S1"))
+        a, b = special_pairs()
+        self.assertSameAsScalar(a, b, [OPERATORS[i % 4] for i in range(len(a))])
+
+    def test_chunk_size_splits_input(self):
+        op1 = random_operands(1000, seed=4)
+        op2 = random_operands(1000, seed=5)
+        rng = random.Random(6)
+        ops = [rng.choice(OPERATORS) for _ in op1]
+        for op in ("/", ops):
+            expected = calculate_batch(op1, op2, op)
+            for chunk_size in (1, 3, 64, 999, 1000, 1001):
+                with self.subTest(op=op if isinstance(op, str) else "per element", chunk_size=chunk_size):
+                    self.assertSameAsScalar(op1, op2, op, chunk_size=chunk_size)
+                    values, errors = calculate_batch(op1, op2, op, chunk_size=chunk_size)
+                    np.testing.assert_array_equal(values, expected[0])
+                    np.testing.assert_array_equal(errors, expected[1])
+
+    def test_empty_input(self):
+        values, errors = calculate_batch([], [], "+")
+        self.assertEqual((len(values), len(errors)), (0, 0))
+        self.assertEqual(format_batch(values, errors), [])
+
+    def test_unknown_operator(self):
+        for op in ("%", "", "+-", "**", ["+", "x"], ["+", "//"], np.array(["-", "^"])):
+            with self.subTest(op=op):
+                with self.assertRaises(ValueError):
+                    calculate_batch([1.0, 2.0], [3.0, 4.0], op)
+        with self.assertRaisesRegex(ValueError, "index 2"):
+            calculate_batch([1.0] * 4, [1.0] * 4, ["+", "-", "?", "*"], chunk_size=2)
+
+    def test_mismatched_lengths(self):
+        with self.assertRaises(ValueError):
+            calculate_batch([1.0, 2.0], [3.0], "+")
+        with self.assertRaises(ValueError):
+            calculate_batch([1.0, 2.0], [3.0, 4.0], ["+"])
+        with self.assertRaises(ValueError):
+            calculate_batch([1.0], [3.0, 4.0], ["+", "-"])
+
+
+if __name__ == "__main__":
+    unittest.main()
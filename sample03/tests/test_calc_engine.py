@@ -0,0 +1,189 @@
+import unittest
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from calc_engine import KEYS, CalculatorEngine, replay
+
+
+class ReferenceCalculator:
+    """CalculatorEngine を作る前の calc-00 の on_click を、そのまま写したもの。"""
+
+    def __init__(self):
+        self.operand1 = 0.0
+        self.operator = "+"
+        self.new_operand = True
+        self.value = "0"
+
+    @staticmethod
+    def format_number(n):
+        return int(n) if n == int(n) else n
+
+    def calculate(self, op1, op2, op):
+        if op == "+":
+            return self.format_number(op1 + op2)
+        if op == "-":
+            return self.format_number(op1 - op2)
+        if op == "*":
+            return self.format_number(op1 * op2)
+        if op == "/":
+            return "Error" if op2 == 0 else self.format_number(op1 / op2)
+
+    def press(self, data):
+        if data == "AC" or self.value == "Error":
+            self.operand1 = 0.0
+            self.operator = "+"
+            self.new_operand = True
+            self.value = "0"
+        elif data in "0123456789.":
+            if self.value == "0" or self.new_operand:
+                self.value = data
+            else:
+                self.value += data
+            self.new_operand = False
+        elif data in "+-*/":
+            try:
+                curr = float(self.value)
+            except ValueError:
+                curr = 0.0
+            res = self.calculate(self.operand1, curr, self.operator)
+            self.value = str(res)
+            self.operand1 = 0.0 if res == "Error" else float(res)
+            self.operator = data
+            self.new_operand = True
+        elif data == "=":
+            try:
+                curr = float(self.value)
+            except ValueError:
+                curr = 0.0
+            res = self.calculate(self.operand1, curr, self.operator)
+            self.value = str(res)
+            self.operand1 = 0.0
+            self.operator = "+"
+            self.new_operand = True
+        elif data == "%":
+            try:
+                curr = float(self.value)
+                self.value = str(self.format_number(curr / 100))
+            except ValueError:
+                self.value = "Error"
+            self.operand1 = 0.0
+            self.operator = "+"
+            self.new_operand = True
+        elif data == "+/-":
+            try:
+                curr = float(self.value)
+                self.value = str(-curr)
+            except ValueError:
+                pass
+        return self.value
+
+
+SEQUENCES = [
+    "1 2 + 3 4 =",
+    "1 + 2 * 3 - 4 / 5 =",
+    "9 / 0 = 7",
+    "9 / 0 + 1 =",
+    "8 / 0 AC 8 / 2 =",
+    "5 0 %",
+    "1 2 . 5 % * 4 =",
+    "5 / 0 = %",
+    "3 +/- + 2 =",
+    "+/-",
+    "0 . 5 +/- +/- * 2 =",
+    "2 * * 3 =",
+    "5 - = =",
+    "= = 4",
+    "1 . . 2 + 1 =",
+    "1 . . 2 %",
+    "1 . . 2 +/- =",
+    "0 0 0 . 0 1 * 1 0 0 =",
+    ". 1 + . 2 =",
+    "7 = 8 + 1 =",
+    "1 0 0 % % %",
+    "2 . 5 * 2 = +/- - 1 =",
+]
+
+
+def random_sequences(count, seed=0):
+    rng = random.Random(seed)
+    keys = sorted(KEYS)
+    return [[rng.choice(keys) for _ in range(rng.randint(1, 12))] for _ in range(count)]
+
+
+class TestCalculatorEngine(unittest.TestCase):
+    def assertMatchesReference(self, keys):
+        engine = CalculatorEngine()
+        reference = ReferenceCalculator()
+        for i, key in enumerate(keys):
+            self.assertEqual(engine.press(key), reference.press(key), msg=keys[: i + 1])
+
+    def test_matches_original_handler(self):
+        for sequence in SEQUENCES:
+            with self.subTest(keys=sequence):
+                self.assertMatchesReference(sequence.split())
+
+    def test_matches_original_handler_on_random_keys(self):
+        for keys in random_sequences(2000):
+            with self.subTest(keys=" ".join(keys)):
+                self.assertMatchesReference(keys)
+
+    def test_feed_matches_press(self):
+        for sequence in SEQUENCES:
+            keys = sequence.split()
+            engine = CalculatorEngine()
+            for key in keys:
+                expected = engine.press(key)
+            self.assertEqual(CalculatorEngine().feed(keys), expected)
+
+    def test_replay(self):
+        sequences = [sequence.split() for sequence in SEQUENCES] * 2
+        expected = []
+        for keys in sequences:
+            reference = ReferenceCalculator()
+            for key in keys:
+                reference.press(key)
+            expected.append(reference.value)
+        self.assertEqual(replay(sequences), expected)
+        self.assertEqual(replay([]), [])
+
+    def test_unknown_key(self):
+        engine = CalculatorEngine()
+        with self.assertRaises(ValueError):
+            engine.feed(["1", "2", "sqrt", "3"])
+        # それより前のキーは処理済み
+        self.assertEqual(engine.display, "12")
+        with self.assertRaises(ValueError):
+            engine.feed(["/", "0", "=", "sqrt"])
+        with self.assertRaises(ValueError):
+            replay([["1"], ["x"]])
+
+    def test_inf_and_nan_are_shown_as_is(self):
+        huge = ["9"] * 400
+        engine = CalculatorEngine()
+        self.assertEqual(engine.feed(huge + ["+"]), "inf")
+        self.assertEqual(engine.feed(["="]), "inf")
+        self.assertEqual(engine.feed(["+/-"]), "-inf")
+        self.assertEqual(engine.feed(["%"]), "-inf")
+        engine.reset()
+        self.assertEqual(engine.feed(huge + ["-"] + huge + ["="]), "nan")
+        self.assertEqual(engine.feed(["*", "2", "="]), "nan")
+
+    def test_snapshot_and_restore(self):
+        engine = CalculatorEngine()
+        engine.feed(["1", "2", "+", "3"])
+        state = engine.snapshot()
+        self.assertEqual(state, ["3", 12.0, "+", False])
+        self.assertEqual(engine.feed(["*", "2", "="]), "30")
+
+        engine.restore(state)
+        self.assertEqual(engine.display, "3")
+        self.assertEqual(engine.feed(["="]), "15")
+        engine.restore(["Error", 0.0, "+", True])
+        self.assertEqual(engine.feed(["5"]), "0")
+
+
+if __name__ == "__main__":
+    unittest.main()
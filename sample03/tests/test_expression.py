@@ -0,0 +1,170 @@
+import unittest
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from expression import (
+    MAX_POWER_BITS,
+    ExpressionError,
+    ExpressionInput,
+    compile_expression,
+    evaluate,
+)
+
+NUMBERS = ["0", "7", "42", "123", "1.5", ".5", "3.", "2e3", "1e-2", "0.0", "007", "1..2", "1e"]
+OPERATORS = ["+", "-", "*", "/", "//", "**"]
+
+
+def generate_keys(rng):
+    """電卓のキーで入力できる式をランダムに作る。正しくない式も混ぜる。"""
+    parts = []
+    powers = 0
+    for _ in range(rng.randint(1, 6)):
+        if rng.random() < 0.2:
+            parts.append(rng.choice("+-"))
+        parts.append(rng.choice(NUMBERS))
+        operator = rng.choice(OPERATORS)
+        if operator == "**":
+            # eval() で止まらないように、べき乗は1つまでにする
+            powers += 1
+            if powers > 1:
+                operator = "*"
+        parts.append(operator)
+    if rng.random() < 0.8:
+        # 最後の演算子を除く (除かない場合は書きかけの式)
+        parts.pop()
+    return "".join(parts)
+
+
+def eval_outcome(text):
+    """eval() の結果か、例外の種類 (ExpressionError / ArithmeticError) を返す。"""
+    try:
+        return eval(text, {"__builtins__": {}})
+    except SyntaxError:
+        return ExpressionError
+    except ArithmeticError:
+        return ArithmeticError
+
+
+class ExpressionTestBase(unittest.TestCase):
+    def assertSameOutcome(self, compute, text, eager=False):
+        """compute() の結果が eval(text) と同じかを確かめる。
+
+        eager=True は入力しながら計算する ExpressionInput の場合。書き方の誤りより前に
+        0 での割り算などがあれば、先に起きた計算のエラーになる。
+        """
+        expected = eval_outcome(text)
+        if isinstance(expected, type):
+            if eager and expected is ExpressionError:
+                expected = (ExpressionError, ArithmeticError)
+            with self.assertRaises(expected, msg=text):
+                compute()
+        else:
+            actual = compute()
+            self.assertEqual(actual, expected, msg=text)
+            self.assertIs(type(actual), type(expected), msg=text)
+
+
+class TestEvaluate(ExpressionTestBase):
+    def test_matches_eval_on_generated_keys(self):
+        rng = random.Random(0)
+        for _ in range(3000):
+            text = generate_keys(rng)
+            with self.subTest(text=text):
+                self.assertSameOutcome(lambda: evaluate(text), text)
+
+    def test_precedence(self):
+        for text in ("1+2*3", "2*3+1", "10-4-3", "7//2*3", "8/2/2", "-2**2", "2**-1", "-3*-3"):
+            with self.subTest(text=text):
+                self.assertSameOutcome(lambda: evaluate(text), text)
+
+    def test_power_is_right_associative(self):
+        self.assertEqual(evaluate("2**3**2"), 512)
+        self.assertEqual(evaluate("2**3**2"), 2 ** 3 ** 2)
+
+    def test_leading_zeros(self):
+        self.assertEqual(evaluate("0+00"), 0)
+        self.assertEqual(evaluate("0.5+007.5"), 8.0)
+        with self.assertRaises(ExpressionError):
+            evaluate("007")
+
+    def test_power_limit(self):
+        self.assertEqual(evaluate(f"2**{MAX_POWER_BITS}").bit_length(), MAX_POWER_BITS + 1)
+        for text in (f"2**{MAX_POWER_BITS + 1}", "9**9**9", "-9**9**9"):
+            with self.subTest(text=text):
+                with self.assertRaises(OverflowError):
+                    evaluate(text)
+
+    def test_incomplete_expressions(self):
+        for text in ("", "1+", "2*", "-", "3**", "1 2", "x", "1e", "(1)"):
+            with self.subTest(text=text):
+                with self.assertRaises(ExpressionError):
+                    evaluate(text)
+
+    def test_variables(self):
+        expression = compile_expression("x**2-x", ("x",))
+        self.assertEqual(expression.variables, {"x"})
+        self.assertEqual(expression.evaluate(x=3), 6)
+        self.assertIs(compile_expression("x**2-x", ("x",)), expression)
+
+
+class TestExpressionInput(ExpressionTestBase):
+    def press(self, text, check_every_key=False):
+        expression = ExpressionInput()
+        for key in text:
+            expression.append(key)
+            if check_every_key:
+                # result() は入力の状態を変えない
+                try:
+                    expression.result()
+                except (ValueError, ArithmeticError):
+                    pass
+        return expression
+
+    def test_matches_eval_on_generated_keys(self):
+        rng = random.Random(1)
+        for i in range(3000):
+            text = generate_keys(rng)
+            with self.subTest(text=text):
+                expression = self.press(text, check_every_key=i % 10 == 0)
+                self.assertEqual(expression.text, text)
+                self.assertSameOutcome(expression.result, text, eager=True)
+
+    def test_result_reentry(self):
+        # "=" の後の表示 (str(結果)) に続けて入力する
+        for result, keys in ((1e16, "+1"), (1e-05, "*2"), (2.5, "**2"), (10**20, "//3")):
+            expression = ExpressionInput(str(result))
+            expression.append(keys)
+            with self.subTest(text=expression.text):
+                self.assertSameOutcome(expression.result, expression.text)
+        expression = ExpressionInput("1e+16")
+        self.assertEqual(expression.result(), 1e16)
+
+    def test_power_limit(self):
+        expression = self.press("9**9**9")
+        with self.assertRaises(OverflowError):
+            expression.result()
+
+    def test_incomplete_expression(self):
+        expression = self.press("1+2*")
+        with self.assertRaises(ExpressionError):
+            expression.result()
+        expression.append("3")
+        self.assertEqual(expression.result(), 7)
+
+    def test_set_and_clear(self):
+        expression = ExpressionInput("1/0")
+        with self.assertRaises(ZeroDivisionError):
+            expression.result()
+        expression.set("6/4")
+        self.assertEqual(expression.result(), 1.5)
+        expression.clear()
+        self.assertEqual(expression.text, "")
+        with self.assertRaises(ExpressionError):
+            expression.result()
+
+
+if __name__ == "__main__":
+    unittest.main()
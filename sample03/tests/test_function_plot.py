@@ -0,0 +1,149 @@
+import unittest
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from calc_batch import require_numpy
+from expression import ExpressionError
+
+try:
+    np = require_numpy()
+except ImportError:
+    np = None
+else:
+    from function_plot import CHUNK_SIZE, evaluate_range
+
+
+def reference_range(np, text, start, stop, points, width):
+    """linspace で全部の点を一度に計算して、区間ごとの最初の x・最小値・最大値を求める。"""
+    xs = np.linspace(start, stop, points)
+    with np.errstate(all="ignore"):
+        ys = np.broadcast_to(np.asarray(eval(text, {"x": xs}), dtype=np.float64), xs.shape)
+    width = min(width, points)
+    buckets = np.arange(points) * width // points
+    bucket_x = np.full(width, np.nan)
+    low = np.full(width, np.nan)
+    high = np.full(width, np.nan)
+    for i in range(width):
+        in_bucket = buckets == i
+        bucket_x[i] = xs[in_bucket][0]
+        finite = ys[in_bucket][np.isfinite(ys[in_bucket])]
+        if len(finite):
+            low[i] = finite.min()
+            high[i] = finite.max()
+    return bucket_x, low, high
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestEvaluateRange(unittest.TestCase):
+    def assertSameResult(self, result, expected):
+        np.testing.assert_array_equal(result.x, expected.x)
+        np.testing.assert_array_equal(result.low, expected.low)
+        np.testing.assert_array_equal(result.high, expected.high)
+        stats, expected_stats = result.stats, expected.stats
+        for name in ("count", "invalid", "min", "max", "x_at_min", "x_at_max"):
+            self.assertEqual(getattr(stats, name), getattr(expected_stats, name), msg=name)
+        # チャンクごとに合わせる平均と分散は、最後の桁がずれてよい
+        self.assertAlmostEqual(stats.mean, expected_stats.mean, places=9)
+        self.assertAlmostEqual(stats.std, expected_stats.std, places=9)
+
+    def test_chunk_size_does_not_change_result(self):
+        for text, points, width in (
+            ("x**2-3*x", 1000, 300),
+            ("1/x+x", 1001, 300),
+            ("x*x/x", 997, 7),
+            ("5", 100, 300),
+        ):
+            expected = evaluate_range(text, -5, 5, points, width=width)
+            for chunk_size in (1, 7, 64, 333, points - 1, points, CHUNK_SIZE):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    result = evaluate_range(text, -5, 5, points, width=width, chunk_size=chunk_size)
+                    self.assertSameResult(result, expected)
+
+    def test_matches_linspace(self):
+        for text, points, width in (("x**3-x", 1000, 300), ("1/x", 1001, 10), ("x", 50, 300)):
+            with self.subTest(text=text):
+                result = evaluate_range(text, -2, 2, points, width=width, chunk_size=64)
+                bucket_x, low, high = reference_range(np, text, -2, 2, points, width)
+                np.testing.assert_allclose(result.x, bucket_x, rtol=0, atol=1e-12)
+                np.testing.assert_allclose(result.low, low, rtol=1e-9)
+                np.testing.assert_allclose(result.high, high, rtol=1e-9)
+
+    def test_chart_points_are_capped(self):
+        result = evaluate_range("x**2", -1, 1, 100000, width=50, chunk_size=4096)
+        points = result.chart_points()
+        self.assertLessEqual(len(points), 2 * 50)
+        self.assertEqual(len(result.x), 50)
+        # 端の区間には最小値と最大値の2点、最小値 0 の点も残る
+        self.assertIn((result.x[0], 1.0), points)
+        self.assertEqual(min(y for _, y in points), result.stats.min)
+        self.assertEqual(result.stats.count, 100000)
+
+        # 点の数が幅より少ないと、区間は点の数になる
+        result = evaluate_range("x", 0, 9, 10, width=300)
+        self.assertEqual(len(result.x), 10)
+        self.assertEqual(result.chart_points(), [(float(x), float(x)) for x in range(10)])
+
+    def test_invalid_points_are_counted(self):
+        # x = -1, -0.5, 0, 0.5, 1
+        result = evaluate_range("1/x", -1, 1, 5)
+        self.assertEqual(result.stats.invalid, 1)
+        self.assertEqual(result.stats.count, 4)
+        self.assertEqual((result.stats.min, result.stats.x_at_min), (-2.0, -0.5))
+        self.assertEqual((result.stats.max, result.stats.x_at_max), (2.0, 0.5))
+        self.assertEqual(len(result.chart_points()), 4)
+
+        result = evaluate_range("x/x", -1, 1, 5)
+        self.assertEqual(result.stats.invalid, 1)
+        self.assertEqual(result.stats.std, 0.0)
+
+        result = evaluate_range("10**x", 0, 1000, 11, chunk_size=3)
+        # 10**400 以上は inf
+        self.assertEqual(result.stats.invalid, 7)
+        self.assertEqual(result.stats.max, 1e300)
+
+    def test_all_points_invalid(self):
+        result = evaluate_range("0*x/0", 0, 1, 10)
+        self.assertEqual(result.stats.invalid, 10)
+        self.assertEqual(result.stats.count, 0)
+        self.assertTrue(math.isnan(result.stats.std))
+        self.assertEqual(result.chart_points(), [])
+        self.assertIsNone(result.stats.to_dict()["min"])
+
+    def test_constant_expression(self):
+        result = evaluate_range("2+3", -1, 1, 1000, width=10, chunk_size=77)
+        self.assertEqual(result.stats.count, 1000)
+        self.assertEqual((result.stats.min, result.stats.max, result.stats.mean), (5.0, 5.0, 5.0))
+        self.assertEqual(result.stats.std, 0.0)
+        self.assertEqual([y for _, y in result.chart_points()], [5.0] * 10)
+        with self.assertRaises(ZeroDivisionError):
+            evaluate_range("1/0", -1, 1, 10)
+
+    def test_one_point(self):
+        result = evaluate_range("x*2", 3, 7, 1)
+        self.assertEqual(result.chart_points(), [(3.0, 6.0)])
+        self.assertEqual(result.stats.to_dict(), {
+            "count": 1, "invalid": 0, "min": 6.0, "max": 6.0,
+            "x_at_min": 3.0, "x_at_max": 3.0, "mean": 6.0, "std": 0.0,
+        })
+
+    def test_last_point_is_stop(self):
+        result = evaluate_range("x", 0, 0.3, 7, chunk_size=3)
+        self.assertEqual(result.stats.max, 0.3)
+        self.assertEqual(result.stats.x_at_max, 0.3)
+
+    def test_invalid_arguments(self):
+        for points, width in ((0, 300), (-1, 300), (10, 0)):
+            with self.subTest(points=points, width=width):
+                with self.assertRaises(ValueError):
+                    evaluate_range("x", 0, 1, points, width=width)
+        with self.assertRaises(ExpressionError):
+            evaluate_range("x+", 0, 1, 10)
+        with self.assertRaises(ExpressionError):
+            evaluate_range("y", 0, 1, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
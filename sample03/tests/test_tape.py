@@ -0,0 +1,152 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from calc_engine import CalculatorEngine
+from tape import CalculationTape
+
+
+def labels(tape):
+    return [entry.label for entry in tape.entries(0, len(tape))]
+
+
+class TestCalculationTape(unittest.TestCase):
+    def test_ring_buffer_wraps(self):
+        tape = CalculationTape(capacity=3)
+        for i in range(5):
+            tape.record(f"{i}", str(i))
+        # 古い記録から上書きする
+        self.assertEqual(labels(tape), ["2", "3", "4"])
+        self.assertEqual(tape[0].label, "2")
+        self.assertEqual(tape[-1].label, "4")
+        with self.assertRaises(IndexError):
+            tape[3]
+
+        self.assertEqual(tape.undo().label, "3")
+        tape.record("5", "5")
+        self.assertEqual(labels(tape), ["2", "3", "5"])
+        tape.record("6", "6")
+        self.assertEqual(labels(tape), ["3", "5", "6"])
+        for _ in range(3):
+            tape.undo()
+        self.assertIsNone(tape.last)
+        self.assertIsNone(tape.undo())
+        self.assertEqual(tape.redo().label, "3")
+
+    def test_record_after_undo_drops_redo_tail(self):
+        tape = CalculationTape(capacity=10)
+        for label in "abcd":
+            tape.record(label, label)
+        tape.undo()
+        tape.undo()
+        self.assertTrue(tape.can_redo())
+        tape.record("e", "e")
+        self.assertFalse(tape.can_redo())
+        self.assertIsNone(tape.redo())
+        self.assertEqual(labels(tape), ["a", "b", "e"])
+
+    def test_invalid_capacity(self):
+        with self.assertRaises(ValueError):
+            CalculationTape(capacity=0)
+
+
+class TestPersistentTape(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "tape", "tape.jsonl")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def open(self, **kwargs):
+        tape = CalculationTape(path=self.path, **kwargs)
+        self.addCleanup(tape.close)
+        return tape
+
+    def read_ops(self):
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line)["op"] for line in f]
+
+    def test_replays_file(self):
+        tape = self.open()
+        for label in "abc":
+            tape.record(label, label.upper(), [label])
+        tape.undo()
+        tape.undo()
+        tape.redo()
+        tape.close()
+
+        tape = self.open()
+        self.assertEqual(labels(tape), ["a", "b"])
+        self.assertEqual(tape.last.state, ["b"])
+        self.assertEqual(tape.redo().result, "C")
+
+    def test_truncated_last_line(self):
+        tape = self.open()
+        tape.record("a", "A")
+        tape.record("b", "B")
+        tape.close()
+        with open(self.path, "a", encoding="utf-8") as f:
+            # 書き込みの途中で終了した行
+            f.write('{"op": "record", "label": "c", "res')
+
+        tape = self.open()
+        self.assertEqual(labels(tape), ["a", "b"])
+        tape.record("d", "D")
+        tape.close()
+        self.assertEqual(labels(self.open()), ["a", "b", "d"])
+
+    def test_rewrite_keeps_undone_entries(self):
+        tape = self.open(capacity=4, compact_factor=2)
+        for i in range(6):
+            tape.record(str(i), str(i))
+        tape.undo()
+        tape.undo()
+        # 8 行を超えたので、残っている記録と取り消しだけのファイルに書き直す
+        tape.undo()
+        self.assertEqual(self.read_ops(), ["record"] * 4 + ["undo"] * 3)
+        tape.close()
+
+        tape = self.open(capacity=4, compact_factor=2)
+        self.assertEqual(labels(tape), ["2"])
+        self.assertEqual(tape.redo().label, "3")
+        self.assertEqual(tape.redo().label, "4")
+        self.assertEqual(tape.redo().label, "5")
+        self.assertIsNone(tape.redo())
+
+    def test_clear(self):
+        tape = self.open()
+        tape.record("a", "A")
+        tape.clear()
+        self.assertEqual(len(tape), 0)
+        tape.close()
+        self.assertEqual(len(self.open()), 0)
+
+    def test_engine_state_round_trip(self):
+        engine = CalculatorEngine()
+        tape = self.open()
+        for keys in (["1", "2", "+", "3", "="], ["*", "2", "+"], ["4"]):
+            label = " ".join(keys)
+            tape.record(label, engine.feed(keys), engine.snapshot())
+        tape.close()
+
+        tape = self.open()
+        restored = CalculatorEngine()
+        restored.restore(tape.last.state)
+        self.assertEqual(restored.snapshot(), engine.snapshot())
+        self.assertEqual(restored.feed(["="]), engine.feed(["="]))
+
+        # 取り消した記録の状態に戻して続ける
+        restored.restore(tape.undo().state)
+        self.assertEqual(restored.display, "30")
+        self.assertEqual(restored.feed(["1", "="]), "31")
+        restored.restore(tape.undo().state)
+        self.assertEqual(restored.feed(["+", "1", "="]), "16")
+
+
+if __name__ == "__main__":
+    unittest.main()
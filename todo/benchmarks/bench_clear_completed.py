@@ -0,0 +1,83 @@
+"""「完了済みをクリア」のベンチマーク。
+
+1件ずつ delete_task() を呼ぶ従来の方法と、delete_tasks() による一括削除を比較する。
+従来の方法は件数の2乗に比例するので、--legacy-max より多い件数では計測しない。
+
+実行方法 (todo ディレクトリで):
+
+    python benchmarks/bench_clear_completed.py
+    python benchmarks/bench_clear_completed.py --sizes 10000 100000 --legacy-max 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.main import TodoApp
+from src.storage import JournalStorage
+
+
+class BenchPage:
+    def __init__(self):
+        self.update_count = 0
+
+    def update(self, *controls):
+        self.update_count += 1
+
+
+def make_app(json_path, size):
+    """半分が完了済みの size 件のタスクを持つ TodoApp を作る。"""
+    JournalStorage(json_path).save(
+        [{"task_name": f"Task {i}", "completed": i % 2 == 0} for i in range(size)]
+    )
+    app = TodoApp(json_path=json_path)
+    app.page = BenchPage()
+    app.load_tasks()
+    return app
+
+
+def clear_one_by_one(app):
+    for task in app.tasks.controls[:]:
+        if task.completed:
+            app.delete_task(task)
+
+
+def clear_batch(app):
+    app.clear_clicked(None)
+
+
+def measure(clear, size):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        app = make_app(os.path.join(tmpdir, "todos.json"), size)
+        start = time.perf_counter()
+        clear(app)
+        elapsed = time.perf_counter() - start
+        app.storage.close()
+        assert len(app.tasks.controls) == size // 2
+        return elapsed, app.page.update_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--legacy-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>8} {'one-by-one':>12} {'updates':>8} {'batch':>10} {'updates':>8} {'speedup':>8}")
+    for size in args.sizes:
+        batch_time, batch_updates = measure(clear_batch, size)
+        if size <= args.legacy_max:
+            legacy_time, legacy_updates = measure(clear_one_by_one, size)
+            legacy = f"{legacy_time:>11.3f}s {legacy_updates:>8}"
+            speedup = f"{legacy_time / batch_time:>7.0f}x"
+        else:
+            legacy = f"{'skipped':>12} {'-':>8}"
+            speedup = f"{'-':>8}"
+        print(f"{size:>8} {legacy} {batch_time:>9.3f}s {batch_updates:>8} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""TodoApp のよく使われる処理のベンチマーク。
+
+tests/test_main.py の MockPage で TodoApp を動かし、タスクの件数ごとに
+1回あたりの時間とピークメモリ (tracemalloc) を計る。
+
+    add_clicked, status_changed, delete_task, clear_clicked,
+    update_task_visibility, language_changed, save_tasks, load_tasks
+
+--save-baseline で結果を baselines/hot_paths.json に保存し、--check でその結果と比べる。
+マシンの速さに左右されないように、比べるのは時間そのものではなく、最小の件数に対する
+各件数の時間の比 (件数に対する伸び方) で、基準の比の --threshold 倍を超えたら
+終了コード 1 で終わる。
+
+実行方法 (todo ディレクトリで):
+
+    python benchmarks/bench_hot_paths.py
+    python benchmarks/bench_hot_paths.py --sizes 100 10000 --save-baseline
+    python benchmarks/bench_hot_paths.py --check
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import Mock
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+from src.main import TodoApp
+from src.storage import JournalStorage
+from test_main import MockPage
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "hot_paths.json")
+
+# 時間の比を計算するときの下限 (秒)。これより短い時間の揺らぎは無視する
+TIME_FLOOR = 20e-6
+
+
+def make_app(json_path, size):
+    """半分が完了済みの size 件のタスクを読み込んだ TodoApp を作る。"""
+    app = TodoApp(json_path=json_path)
+    app.page = MockPage()
+    app.page.add(app)
+    app.new_task.page = app.page
+    app.load_tasks()
+    assert len(app.tasks.controls) == size
+    return app
+
+
+def write_tasks(json_path, size):
+    storage = JournalStorage(json_path)
+    storage.save(
+        [{"task_name": f"Task {i}", "completed": i % 2 == 0} for i in range(size)]
+    )
+    storage.close()
+
+
+def add_clicked(app):
+    app.new_task.value = "New task"
+    app.add_clicked(None)
+
+
+def status_changed(app):
+    task = app.tasks.controls[len(app.tasks.controls) // 2]
+    task.completed = not task.completed
+    app.status_changed(task)
+
+
+def delete_task(app):
+    app.delete_task(app.tasks.controls[len(app.tasks.controls) // 2])
+
+
+def update_task_visibility(app):
+    app.filter.selected_index = (app.filter.selected_index + 1) % 3
+    app.tabs_changed(None)
+
+
+def language_changed(app):
+    lang = "en" if app.lang == "ja" else "ja"
+    app.language_changed(Mock(control=Mock(value=lang)))
+
+
+def save_tasks(app):
+    app.save_tasks()
+
+
+def load_tasks(app):
+    fresh = TodoApp(json_path=app.json_path)
+    fresh.page = MockPage()
+    fresh.load_tasks()
+
+
+def clear_clicked(app):
+    app.clear_clicked(None)
+
+
+# (名前, 関数, 1つの TodoApp で繰り返せる回数)。None は毎回 TodoApp を作り直す
+HOT_PATHS = [
+    ("add_clicked", add_clicked, 50),
+    ("status_changed", status_changed, 50),
+    ("update_task_visibility", update_task_visibility, 9),
+    ("language_changed", language_changed, 10),
+    ("delete_task", delete_task, 50),
+    ("save_tasks", save_tasks, 1),
+    ("load_tasks", load_tasks, 1),
+    ("clear_clicked", clear_clicked, None),
+]
+
+
+def time_per_call(func, app, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(app)
+    return (time.perf_counter() - start) / calls
+
+
+def peak_memory(func, app):
+    tracemalloc.start()
+    try:
+        func(app)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def measure(size, repeat):
+    """件数 size での各処理の {名前: {"time": 秒, "peak_kb": KiB}} を返す。"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_path = os.path.join(tmpdir, "todos.json")
+        write_tasks(json_path, size)
+        app = make_app(json_path, size)
+        for name, func, calls in HOT_PATHS:
+            best = float("inf")
+            for _ in range(repeat):
+                if calls is None:
+                    write_tasks(json_path, size)
+                    app = make_app(json_path, size)
+                    best = min(best, time_per_call(func, app, 1))
+                else:
+                    best = min(best, time_per_call(func, app, calls))
+            if calls is None:
+                write_tasks(json_path, size)
+                app = make_app(json_path, size)
+            peak = peak_memory(func, app)
+            results[name] = {"time": best, "peak_kb": peak / 1024}
+        app.storage.close()
+    return results
+
+
+def scaling(results):
+    """各処理の、最小の件数に対する各件数の時間の比を返す。"""
+    sizes = sorted(results, key=int)
+    ratios = {}
+    for name, _, _ in HOT_PATHS:
+        base = max(results[sizes[0]][name]["time"], TIME_FLOOR)
+        ratios[name] = {
+            size: max(results[size][name]["time"], TIME_FLOOR) / base for size in sizes[1:]
+        }
+    return ratios
+
+
+def check(results, baseline, threshold):
+    """基準より伸び方が threshold 倍を超えて悪化した処理のメッセージのリストを返す。"""
+    current = scaling(results)
+    expected = scaling(baseline["results"])
+    failures = []
+    for name, ratios in current.items():
+        for size, ratio in ratios.items():
+            limit = expected.get(name, {}).get(size)
+            if limit is not None and ratio > limit * threshold:
+                failures.append(
+                    f"{name} at {size} tasks: {ratio:.1f}x of the smallest size "
+                    f"(baseline {limit:.1f}x, threshold {threshold}x)"
+                )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="結果を基準として保存する")
+    parser.add_argument("--check", action="store_true", help="基準と比べて悪化していたら失敗する")
+    parser.add_argument("--threshold", type=float, default=3.0)
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'path':<24} {'tasks':>8} {'time':>12} {'peak':>12}")
+    for size in args.sizes:
+        results[str(size)] = measure(size, args.repeat)
+        for name, result in results[str(size)].items():
+            print(
+                f"{name:<24} {size:>8} {result['time'] * 1e6:>10.1f}us "
+                f"{result['peak_kb']:>9.1f}KiB"
+            )
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"sizes": args.sizes, "results": results}, f, indent=4)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}")
+
+    if args.check:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = check(results, baseline, args.threshold)
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            return 1
+        print("no scaling regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""タスク名の検索のベンチマーク。
+
+size 件のタスク名で SearchIndex を作り、英数字と日本語の検索語で検索する時間を計る。
+
+実行方法 (todo ディレクトリで):
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --sizes 100000 --repeat 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search import SearchIndex
+
+WORDS = ["buy", "milk", "report", "meeting", "call", "review", "deploy", "invoice"]
+JA_WORDS = ["牛乳", "会議", "資料", "東京", "京都", "買い物", "報告書", "予約"]
+QUERIES = ["buy", "rep", "milk call", "会議", "東京都", "報告書 review", "存在しない"]
+
+
+def make_names(size):
+    rng = random.Random(0)
+    return [
+        f"{rng.choice(WORDS)} {rng.choice(JA_WORDS)}の{rng.choice(JA_WORDS)} {i}"
+        for i in range(size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        names = make_names(size)
+        index = SearchIndex()
+        start = time.perf_counter()
+        for task_id, name in enumerate(names):
+            index.add(task_id, name)
+        print(f"{size} tasks: index built in {time.perf_counter() - start:.3f}s")
+        for query in QUERIES:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                result = index.search(query)
+                best = min(best, time.perf_counter() - start)
+            print(f"  {query!r:>18} {len(result):>8} hits {best * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""起動時間のベンチマーク。
+
+次の2つを測る:
+
+- import: 新しいプロセスで src.main を import する時間。flet 自体の import を除いた
+  時間 (flet を先に import しておいた場合) も表示する。
+- first frame: main() を呼んでから最初の page.update() までの時間と、
+  タスクを読み込み終えるまでの時間。ページは tests/test_main.py の MockPage を使う。
+
+--max-import / --max-first-frame を指定すると、超えた場合に終了コード 1 で終わるので、
+CI で起動時間の悪化を検出できる。
+
+実行方法 (todo ディレクトリで):
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --tasks 100000 --max-first-frame 0.05
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+IMPORT_SCRIPT = """
+import sys, time
+sys.path.insert(0, {root!r})
+if {preload_flet!r}:
+    import flet
+start = time.perf_counter()
+import src.main
+print(time.perf_counter() - start)
+"""
+
+
+def import_time(repeat, preload_flet=False):
+    """新しいプロセスで src.main を import する時間の最小値を返す。"""
+    script = IMPORT_SCRIPT.format(root=ROOT, preload_flet=preload_flet)
+    best = float("inf")
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", script], check=True, capture_output=True, text=True
+        ).stdout
+        best = min(best, float(output.split()[-1]))
+    return best
+
+
+def first_frame_time(size):
+    """main() から最初の page.update() までの時間と、読み込み終えるまでの時間を返す。"""
+    import src.main
+    from src.models import TaskRecord
+    from src.storage import JournalStorage
+    from test_main import MockPage
+
+    loaded = threading.Event()
+
+    class TimedPage(MockPage):
+        first_update = None
+
+        def update(self, *controls):
+            if self.first_update is None:
+                self.first_update = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, "storage"))
+        JournalStorage(os.path.join(tmpdir, "storage", "todos.json")).save(
+            [TaskRecord(f"Task {i}").to_dict() for i in range(size)]
+        )
+        cwd = os.getcwd()
+        os.chdir(tmpdir)
+        # 読み込み終えたら監視を始めるので、それを読み込みの完了とみなす
+        watch_storage = src.main.TodoApp.watch_storage
+        src.main.TodoApp.watch_storage = lambda app, *args, **kwargs: loaded.set()
+        src.main._shared_storage = None
+        try:
+            page = TimedPage()
+            start = time.perf_counter()
+            src.main.main(page)
+            loaded.wait()
+            end = time.perf_counter()
+        finally:
+            src.main.TodoApp.watch_storage = watch_storage
+            src.main._shared_storage = None
+            os.chdir(cwd)
+    return page.first_update - start, end - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-import", type=float, help="import の時間の上限 (秒)")
+    parser.add_argument("--max-first-frame", type=float, help="最初の描画までの上限 (秒)")
+    args = parser.parse_args()
+
+    total = import_time(args.repeat)
+    own = import_time(args.repeat, preload_flet=True)
+    print(f"import src.main:        {total * 1000:8.1f} ms")
+    print(f"  without flet:         {own * 1000:8.1f} ms")
+
+    first_frame, loaded = min(first_frame_time(args.tasks) for _ in range(args.repeat))
+    print(f"first frame:            {first_frame * 1000:8.1f} ms")
+    print(f"{args.tasks} tasks loaded: {loaded * 1000:8.1f} ms")
+
+    failed = False
+    if args.max_import is not None and total > args.max_import:
+        print(f"FAIL: import took longer than {args.max_import}s")
+        failed = True
+    if args.max_first_frame is not None and first_frame > args.max_first_frame:
+        print(f"FAIL: first frame took longer than {args.max_first_frame}s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""スナップショットの形式 (JSON / バイナリ / mmap) のベンチマーク。
+
+同じタスクのリストをそれぞれの形式で書き出し、ファイルサイズと保存・読み込みの時間を比較する。
+mmap の形式は MappedStorage で読むので、読み込みの時間にタスク名のデコードは含まない。
+
+実行方法 (todo ディレクトリで):
+
+    python benchmarks/bench_storage_format.py
+    python benchmarks/bench_storage_format.py --sizes 1000 100000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import TaskRecord
+from src.storage import JsonStorage, MappedStorage
+
+
+def make_tasks(size):
+    return [
+        TaskRecord(f"タスク {i} - Task {i}", completed=i % 2 == 0).to_dict()
+        for i in range(size)
+    ]
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(snapshot_format, task_list, path, repeat):
+    if snapshot_format == "mapped":
+        storage = MappedStorage(path)
+    else:
+        storage = JsonStorage(path, snapshot_format=snapshot_format)
+    save_time = best_of(repeat, lambda: storage.save(task_list))
+    load_time = best_of(repeat, storage.load)
+    assert storage.load() == task_list
+    return os.path.getsize(path), save_time, load_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>8} {'format':>7} {'size':>12} {'save':>9} {'load':>9}")
+    for size in args.sizes:
+        task_list = make_tasks(size)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results = {}
+            for snapshot_format in ("json", "binary", "mapped"):
+                path = os.path.join(tmpdir, f"todos.{snapshot_format}")
+                results[snapshot_format] = measure(
+                    snapshot_format, task_list, path, args.repeat
+                )
+                file_size, save_time, load_time = results[snapshot_format]
+                print(
+                    f"{size:>8} {snapshot_format:>7} {file_size:>10,}B "
+                    f"{save_time:>8.3f}s {load_time:>8.3f}s"
+                )
+            json_result = results["json"]
+            for snapshot_format in ("binary", "mapped"):
+                result = results[snapshot_format]
+                print(
+                    f"{'':>8} {snapshot_format[:3] + '/js':>7} {result[0] / json_result[0]:>11.2f} "
+                    f"{result[1] / json_result[1]:>8.2f}x {result[2] / json_result[2]:>8.2f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
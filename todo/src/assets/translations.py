@@ -1,28 +1,54 @@
-translations = {
-    "en": {
-        "Todos": "Todos",
-        "What needs to be done?": "What needs to be done?",
-        "Add": "Add",
-        "all": "all",
-        "active": "active",
-        "completed": "completed",
-        "Clear completed": "Clear completed",
-        "item(s) left": "item(s) left",
-        "Edit To-Do": "Edit To-Do",
-        "Delete To-Do": "Delete To-Do",
-        "Update To-Do": "Update To-Do"
-    },
-    "ja": {
-        "Todos": "タスク",
-        "What needs to be done?": "何をしますか？",
-        "Add": "追加",
-        "all": "すべて",
-        "active": "アクティブ",
-        "completed": "完了",
-        "Clear completed": "完了済みをクリア",
-        "item(s) left": "個のアイテムが残っています",
-        "Edit To-Do": "タスクを編集",
-        "Delete To-Do": "タスクを削除",
-        "Update To-Do": "タスクを更新"
-    }
-}
+"""UI の文字列の翻訳。
+
+翻訳は言語ごとに locales/<言語>.json に置き、その言語が初めて必要になったときに
+読み込む。起動時には表示する言語だけを読み、ほかの言語は画面を表示してから
+preload_translations() で読み込んでおく。
+"""
+import json
+import os
+import threading
+
+LOCALE_DIR = os.path.join(os.path.dirname(__file__), "locales")
+
+_loaded = {}
+_lock = threading.Lock()
+
+
+def languages():
+    """翻訳がある言語のリストを返す。"""
+    return sorted(
+        name[:-len(".json")] for name in os.listdir(LOCALE_DIR) if name.endswith(".json")
+    )
+
+
+def get_translations(lang):
+    """lang の翻訳の辞書を返す。
+
+    Raises:
+        KeyError: lang の翻訳が無い場合。
+    """
+    table = _loaded.get(lang)
+    if table is not None:
+        return table
+    with _lock:
+        if lang not in _loaded:
+            try:
+                with open(os.path.join(LOCALE_DIR, f"{lang}.json"), encoding="utf-8") as f:
+                    _loaded[lang] = json.load(f)
+            except (FileNotFoundError, ValueError):
+                # ValueError: パスに使えない文字を含む言語名
+                raise KeyError(lang) from None
+        return _loaded[lang]
+
+
+def preload_translations(langs=None):
+    """langs (省略時はすべての言語) の翻訳を読み込んでおく。"""
+    for lang in langs if langs is not None else languages():
+        get_translations(lang)
+
+
+def __getattr__(name):
+    # 以前の translations 辞書。すべての言語を読み込むので、起動時には使わない
+    if name == "translations":
+        return {lang: get_translations(lang) for lang in languages()}
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,170 @@
+"""イベントハンドラを async にした ToDo アプリ。
+
+保存先の読み書きは AsyncStorage のワーカースレッドで行い、ハンドラは書き込みの
+完了を await する。ディスクやネットワークのファイルシステムが遅くても、
+書き込みを待っている間にほかの入力を処理できる。
+
+実行方法 (todo ディレクトリで):
+
+    flet run src/async_main.py
+"""
+import asyncio
+import os
+import sys
+
+import flet as ft
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.assets.translations import preload_translations
+from src.async_storage import AsyncStorage
+from src.main import (
+    Task,
+    TodoApp,
+    shared_metrics,
+    shared_storage,
+    watch_shared_storage,
+)
+
+
+class AsyncTask(Task):
+    """TodoApp の async なハンドラを await する Task。"""
+
+    async def status_changed(self, e):
+        with self.lock:
+            self.completed = self.display_task.value
+        if self.on_status_changed:
+            await self.on_status_changed(self)
+
+    async def delete_clicked(self, e):
+        if self.on_delete_clicked:
+            await self.on_delete_clicked(self)
+
+    async def save_clicked(self, e):
+        super().save_clicked(e)
+        await self.app.wait_saved()
+
+
+class AsyncTodoApp(TodoApp):
+    """保存先の読み書きをイベントループの外で行う TodoApp。
+
+    画面の変更は TodoApp と同じくその場で行い、保存先への書き込みは
+    AsyncStorage に渡してから、ハンドラの最後でまとめて完了を待つ。
+    イベントループの外 (監視用のスレッドなど) から書き込む場合は、
+    TodoApp と同じくその場で書き込む。
+    """
+
+    task_class = AsyncTask
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.async_storage = AsyncStorage(self.storage)
+        # AsyncStorage に渡して、まだ完了を待っていない書き込み
+        self._writes = []
+
+    async def add_clicked(self, e):
+        super().add_clicked(e)
+        await self.wait_saved()
+
+    async def status_changed(self, task):
+        super().status_changed(task)
+        await self.wait_saved()
+
+    async def delete_task(self, task):
+        super().delete_task(task)
+        await self.wait_saved()
+
+    async def clear_clicked(self, e):
+        super().clear_clicked(e)
+        await self.wait_saved()
+
+    async def load_tasks(self):
+        """ワーカースレッドで保存先からタスクを読み込み、読み込んだ分から表示する。"""
+        await self.async_storage.run(self._load_tasks, 50, 1000)
+        # 最後の分のタスクと件数を送る
+        self.items_left.value = self._items_left_text()
+        self.update()
+
+    async def save_tasks(self):
+        with self.lock:
+            tasks = self.store.to_list()
+        await self.async_storage.save(tasks)
+
+    async def wait_saved(self):
+        """AsyncStorage に渡した書き込みがすべて完了するまで待つ。
+
+        Raises:
+            Exception: 書き込みに失敗した場合は、その例外。
+        """
+        while self._writes:
+            writes, self._writes = self._writes, []
+            for write in writes:
+                await write
+
+    async def lifecycle_changed(self, e):
+        if e.state in (ft.AppLifecycleState.RESUME, ft.AppLifecycleState.SHOW):
+            await self.async_storage.run(self.sync_external_changes)
+
+    async def detach_session(self, e=None):
+        await self.wait_saved()
+        await self.async_storage.run(super().detach_session)
+
+    def _write_ops(self, ops):
+        if _in_event_loop():
+            self._writes.append(self.async_storage.append_many(ops))
+        else:
+            super()._write_ops(ops)
+
+    def _write_deletes(self, task_ids):
+        if _in_event_loop():
+            self._writes.append(self.async_storage.delete_many(task_ids))
+        else:
+            super()._write_deletes(task_ids)
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+async def main(page: ft.Page):
+    page.title = "ToDo App"
+    page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
+    page.scroll = ft.ScrollMode.ADAPTIVE
+
+    metrics = shared_metrics()
+    if metrics is not None:
+        from src.instrumentation import instrument_page
+
+        instrument_page(page, metrics)
+    todo_app = AsyncTodoApp(lang="ja", storage=shared_storage(), metrics=metrics)
+    todo_app.page = page
+    page.add(todo_app)
+    todo_app.attach_session(page.pubsub)
+    page.on_disconnect = todo_app.detach_session
+    page.on_close = todo_app.detach_session
+    page.on_app_lifecycle_state_change = todo_app.lifecycle_changed
+
+    language_dropdown = ft.Dropdown(
+        options=[ft.dropdown.Option("ja"), ft.dropdown.Option("en")],
+        value="ja",
+        on_change=todo_app.language_changed,
+    )
+    page.appbar = ft.AppBar(
+        title=ft.Text("ToDo App"),
+        actions=[language_dropdown],
+    )
+
+    # 画面を先に表示し、タスクはワーカースレッドで読み込む
+    todo_app.update_items_left()
+    page.update()
+    await todo_app.load_tasks()
+    # 読み込みの間にセッションが終わっていたら、監視は始めない
+    if todo_app.pubsub is not None:
+        watch_shared_storage(page.pubsub)
+    await asyncio.get_running_loop().run_in_executor(None, preload_translations)
+
+
+if __name__ == "__main__":
+    ft.app(main)  # pragma: no cover
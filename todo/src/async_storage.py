@@ -0,0 +1,59 @@
+"""TaskStorage をイベントループから使うための非同期のインターフェース。"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncStorage:
+    """TaskStorage の呼び出しを専用のスレッドで行い、イベントループから待てるようにする。
+
+    ファイルや SQLite の読み書きはワーカースレッドで行うので、ディスクが遅くても
+    イベントループは止まらない。ワーカーは1本なので、呼び出しは呼んだ順に実行される。
+    各メソッドは呼んだ時点でワーカーに渡し、結果を待つための asyncio.Future を返す。
+    """
+
+    def __init__(self, storage):
+        """AsyncStorage の初期化メソッド。
+
+        Args:
+            storage (TaskStorage): 包む保存先。
+        """
+        self.storage = storage
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+
+    def run(self, func, *args):
+        """func(*args) をワーカースレッドで実行する。
+
+        保存先の呼び出しと同じスレッドで順に実行されるので、保存先を使う
+        まとまった処理 (読み込みながら画面を作るなど) に使う。
+        イベントループの中から呼ぶこと。
+        """
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def load(self):
+        return self.run(self.storage.load)
+
+    def save(self, task_list):
+        return self.run(self.storage.save, task_list)
+
+    def append(self, op):
+        return self.run(self.storage.append, op)
+
+    def append_many(self, ops):
+        return self.run(self.storage.append_many, ops)
+
+    def delete_many(self, task_ids):
+        return self.run(self.storage.delete_many, task_ids)
+
+    def count_active(self):
+        return self.run(self.storage.count_active)
+
+    def changed(self):
+        return self.run(self.storage.changed)
+
+    def flush(self):
+        return self.run(self.storage.flush)
+
+    async def close(self):
+        """保存先を閉じ、ワーカースレッドを止める。"""
+        await self.run(self.storage.close)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,119 @@
+"""タスクのリストを保存するコンパクトなバイナリ形式。
+
+ファイルの先頭はヘッダー (マジック "TODO", バージョン, 予約, 件数) で、
+その後にタスクが1件ずつ長さ付きのレコードとして並ぶ。
+
+    ヘッダー: <4s B B I   magic, version, reserved, count
+    レコード: <B B I      flags, id の長さ, task_name の長さ
+              id, task_name (UTF-8), created_at / updated_at (<d, flags で有無を示す)
+
+new_task_id() が作る 32 桁の16進数の id は 16 バイトにして保存する。
+"""
+import re
+import struct
+
+MAGIC = b"TODO"
+VERSION = 1
+
+HEADER = struct.Struct("<4sBBI")
+RECORD = struct.Struct("<BBI")
+TIMESTAMP = struct.Struct("<d")
+
+COMPLETED = 0x01
+HAS_CREATED_AT = 0x02
+HAS_UPDATED_AT = 0x04
+HEX_ID = 0x08
+
+_HEX_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class BinaryFormatError(ValueError):
+    """バイナリ形式のファイルが壊れているか、未対応のバージョンの場合の例外。"""
+
+
+def is_binary(head):
+    """ファイルの先頭のバイト列がこの形式かどうかを返す。"""
+    return head.startswith(MAGIC)
+
+
+def encode_tasks(task_list):
+    """タスク辞書のリストをバイト列に変換する。
+
+    Raises:
+        ValueError: id が 255 バイトを超える場合。
+    """
+    parts = [HEADER.pack(MAGIC, VERSION, 0, len(task_list))]
+    append = parts.append
+    for task in task_list:
+        task_id = task["id"]
+        flags = COMPLETED if task["completed"] else 0
+        if _HEX_ID.fullmatch(task_id):
+            flags |= HEX_ID
+            id_bytes = bytes.fromhex(task_id)
+        else:
+            id_bytes = task_id.encode("utf-8")
+            if len(id_bytes) > 255:
+                raise ValueError(f"Task id too long: {task_id!r}")
+        name_bytes = task["task_name"].encode("utf-8")
+        created_at = task.get("created_at")
+        updated_at = task.get("updated_at")
+        if created_at is not None:
+            flags |= HAS_CREATED_AT
+        if updated_at is not None:
+            flags |= HAS_UPDATED_AT
+        append(RECORD.pack(flags, len(id_bytes), len(name_bytes)))
+        append(id_bytes)
+        append(name_bytes)
+        if created_at is not None:
+            append(TIMESTAMP.pack(created_at))
+        if updated_at is not None:
+            append(TIMESTAMP.pack(updated_at))
+    return b"".join(parts)
+
+
+def iter_tasks(data):
+    """バイト列からタスク辞書を先頭から1件ずつ返す。
+
+    Raises:
+        BinaryFormatError: ヘッダーやレコードが壊れている場合。
+    """
+    view = memoryview(data)
+    try:
+        magic, version, _, count = HEADER.unpack_from(view, 0)
+    except struct.error:
+        raise BinaryFormatError("Truncated header") from None
+    if magic != MAGIC:
+        raise BinaryFormatError("Not a binary task file")
+    if version != VERSION:
+        raise BinaryFormatError(f"Unsupported binary format version: {version}")
+
+    pos = HEADER.size
+    for _ in range(count):
+        try:
+            flags, id_length, name_length = RECORD.unpack_from(view, pos)
+            pos += RECORD.size
+            id_bytes = view[pos:pos + id_length]
+            pos += id_length
+            name_bytes = view[pos:pos + name_length]
+            pos += name_length
+            if pos > len(view):
+                raise BinaryFormatError("Truncated record")
+            task_id = (
+                id_bytes.hex() if flags & HEX_ID else str(id_bytes, "utf-8")
+            )
+            task = {
+                "id": task_id,
+                "task_name": str(name_bytes, "utf-8"),
+                "completed": bool(flags & COMPLETED),
+            }
+            if flags & HAS_CREATED_AT:
+                (task["created_at"],) = TIMESTAMP.unpack_from(view, pos)
+                pos += TIMESTAMP.size
+            if flags & HAS_UPDATED_AT:
+                (task["updated_at"],) = TIMESTAMP.unpack_from(view, pos)
+                pos += TIMESTAMP.size
+        except (struct.error, UnicodeDecodeError):
+            raise BinaryFormatError("Truncated record") from None
+        yield task
+    if pos != len(view):
+        raise BinaryFormatError("Trailing data after the last record")
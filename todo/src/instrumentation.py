@@ -0,0 +1,301 @@
+"""ハンドラ・保存先・画面の更新の時間を計る、必要なときだけ有効にする計測。
+
+TodoApp(metrics=Metrics()) のように Metrics を渡したときだけ、TodoApp と Task の
+ハンドラ、保存先の呼び出し、page.update() を包んで時間を記録する。渡さなければ
+何も包まないので、計測しないときの負荷は無い。
+
+記録した値は名前ごとのヒストグラム (2のべき乗の区間) にまとめ、
+Metrics.write() で JSON ファイルに書き出す。tools/show_metrics.py で表示できる。
+"""
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from src.storage import DebouncedWriter, TaskStorage
+
+# 計測する TodoApp と Task のハンドラ
+APP_HANDLERS = (
+    "add_clicked",
+    "status_changed",
+    "rename_task",
+    "delete_task",
+    "delete_tasks",
+    "clear_clicked",
+    "tabs_changed",
+    "search_changed",
+    "language_changed",
+    "edit_clicked",
+    "save_clicked",
+    "save_tasks",
+    "load_tasks",
+    "sync_external_changes",
+    "apply_remote_ops",
+)
+TASK_HANDLERS = ("edit_clicked", "save_clicked", "status_changed", "delete_clicked")
+
+
+class Histogram:
+    """値の件数・合計・最小・最大と、2のべき乗の区間ごとの件数。
+
+    区間 i には 2**(i-1) 以上 2**i 未満の値が入る (区間 0 は 1 未満)。
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.buckets = {}
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        bucket = 0 if value < 1 else math.frexp(value)[1]
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction):
+        """fraction (0 から 1) の位置の値の上限を、区間の上端で返す。"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(2.0 ** bucket, self.max)
+        return self.max
+
+    def to_dict(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            # JSON のキーは区間の上端
+            "buckets": {
+                f"<{2 ** bucket}": count for bucket, count in sorted(self.buckets.items())
+            },
+        }
+
+
+class Metrics:
+    """名前ごとのヒストグラムの集まり。複数のスレッドから記録してよい。
+
+    時間はマイクロ秒で記録する。path を指定すると、記録があってから最大
+    write_interval 秒後に、その時点の内容をファイルに書き出す。
+    """
+
+    def __init__(self, path=None, write_interval=5.0):
+        """Metrics の初期化メソッド。
+
+        Args:
+            path (str): 書き出す JSON ファイルのパス。省略時は書き出さない。
+            write_interval (float): ファイルに書き出す最小間隔 (秒)。
+        """
+        self.path = path
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._writer = DebouncedWriter(self.write, write_interval) if path else None
+
+    def record(self, name, value):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                self._histograms[name] = histogram = Histogram()
+            histogram.add(value)
+        if self._writer is not None:
+            self._writer.mark_dirty()
+
+    @contextmanager
+    def time(self, name):
+        """with ブロックの時間を name に記録する。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1e6)
+
+    def histogram(self, name):
+        return self._histograms.get(name)
+
+    def snapshot(self):
+        """名前 -> ヒストグラムの辞書を返す。"""
+        with self._lock:
+            return {name: h.to_dict() for name, h in sorted(self._histograms.items())}
+
+    def write(self, path=None):
+        """内容を JSON ファイルに書き出す。"""
+        path = path or self.path
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=4)
+        os.replace(tmp_path, path)
+
+    def flush(self):
+        """保留中の書き出しがあれば、すぐに書き出す。"""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        """保留中の書き出しを完了させる。"""
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _timed(method, name, metrics):
+    """method を呼ぶたびに時間を name に記録する関数を返す。"""
+    if inspect.iscoroutinefunction(method):
+
+        @functools.wraps(method)
+        async def timed_async(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                metrics.record(name, (time.perf_counter() - start) * 1e6)
+
+        return timed_async
+
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            metrics.record(name, (time.perf_counter() - start) * 1e6)
+
+    return timed
+
+
+def instrument_handlers(obj, names, metrics):
+    """obj のメソッド names を、時間を計るものに置き換える。
+
+    インスタンスの属性として置き換えるので、ハンドラをコントロールに渡す前に呼ぶ。
+    名前は "handler.<クラス名>.<メソッド名>" になる。
+    """
+    prefix = f"handler.{type(obj).__name__}."
+    for name in names:
+        method = getattr(obj, name, None)
+        if method is not None:
+            setattr(obj, name, _timed(method, prefix + name, metrics))
+
+
+def instrument_page(page, metrics):
+    """page.update() の時間と、1回で送るコントロールの数を記録する。
+
+    flet の Page では、送ったコマンドの数とその JSON のバイト数も記録する。
+    同じ page に2回呼んでも1回分だけ記録する。
+    """
+    if getattr(page, "_metrics", None) is not None:
+        return
+    page._metrics = metrics
+    update = page.update
+
+    @functools.wraps(update)
+    def timed_update(*controls):
+        metrics.record("update.controls", len(controls) or 1)
+        with metrics.time("update"):
+            return update(*controls)
+
+    page.update = timed_update
+    conn = getattr(page, "_Page__conn", None)
+    # ウェブでは複数のセッションが1つの接続を使うので、包むのは1回だけ
+    if conn is not None and getattr(conn, "_metrics", None) is None:
+        from flet.core.protocol import CommandEncoder
+
+        conn._metrics = metrics
+
+        send_commands = conn.send_commands
+
+        def counted_send_commands(session_id, commands):
+            metrics.record("update.commands", len(commands))
+            metrics.record(
+                "update.bytes",
+                len(json.dumps(commands, cls=CommandEncoder, separators=(",", ":"))),
+            )
+            return send_commands(session_id, commands)
+
+        conn.send_commands = counted_send_commands
+
+
+class InstrumentedStorage(TaskStorage):
+    """保存先の呼び出しごとの時間を "storage.<メソッド名>" に記録するラッパー。"""
+
+    def __init__(self, storage, metrics):
+        """InstrumentedStorage の初期化メソッド。
+
+        Args:
+            storage (TaskStorage): 包む保存先。
+            metrics (Metrics): 記録先。
+        """
+        self.storage = storage
+        self.metrics = metrics
+
+    def load_iter(self):
+        # 全件を読み終えるまでの時間 (表示しながら読む時間を含む) を記録する
+        with self.metrics.time("storage.load_iter"):
+            yield from self.storage.load_iter()
+
+    def load(self):
+        with self.metrics.time("storage.load"):
+            return self.storage.load()
+
+    def save(self, task_list):
+        with self.metrics.time("storage.save"):
+            self.storage.save(task_list)
+
+    def append(self, op):
+        with self.metrics.time("storage.append"):
+            self.storage.append(op)
+
+    def append_many(self, ops):
+        with self.metrics.time("storage.append_many"):
+            self.storage.append_many(ops)
+
+    def delete_many(self, task_ids):
+        with self.metrics.time("storage.delete_many"):
+            self.storage.delete_many(task_ids)
+
+    def count_active(self):
+        with self.metrics.time("storage.count_active"):
+            return self.storage.count_active()
+
+    def changed(self):
+        with self.metrics.time("storage.changed"):
+            return self.storage.changed()
+
+    def watch_paths(self):
+        return self.storage.watch_paths()
+
+    def flush(self):
+        with self.metrics.time("storage.flush"):
+            self.storage.flush()
+
+    def close(self):
+        self.storage.close()
+
+
+def format_metrics(snapshot):
+    """Metrics.snapshot() の内容を表の文字列にする。時間の単位はマイクロ秒。"""
+    lines = [f"{'name':<40} {'count':>7} {'mean':>10} {'p50':>10} {'p90':>10} {'p99':>10} {'max':>10}"]
+    for name, h in snapshot.items():
+        if not h["count"]:
+            continue
+        lines.append(
+            f"{name:<40} {h['count']:>7} {h['mean']:>10.1f} {h['p50']:>10.1f} "
+            f"{h['p90']:>10.1f} {h['p99']:>10.1f} {h['max']:>10.1f}"
+        )
+    return "\n".join(lines)
@@ -2,11 +2,31 @@ import flet as ft
 import json
 import sys
 import os
+import threading
+from contextlib import contextmanager, nullcontext
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.assets.translations import translations
+from src.assets.translations import get_translations, preload_translations
+from src.binary_format import BinaryFormatError
+from src.models import TaskRecord, TaskStore
+from src.render import RenderScheduler, coalesce_updates
+from src.storage import (
+    JournalStorage,
+    SharedStorage,
+    diff_tasks,
+    index_tasks,
+    open_storage,
+)
+from src.task_list import VirtualTaskList
 
 
 class Task(ft.Column):
+    """1件の TaskRecord を表示するコントロール。
+
+    タスクの状態は record が持ち、task_id / task_name / completed は record の値を返す。
+    子のコントロール (Checkbox, TextField, Row, IconButton) はページに追加されるときか
+    最初に参照されたときに作るので、表示されていない Task は軽い。
+    """
+
     def __init__(
         self,
         task_name,
@@ -14,25 +34,87 @@ class Task(ft.Column):
         on_delete_clicked,
         on_edit_clicked,
         on_save_clicked,
+        record=None,
     ):
         super().__init__()
-        self.completed = False
-        self.task_name = task_name
+        self.record = record if record is not None else TaskRecord(task_name)
         self.on_status_changed = on_status_changed
         self.on_delete_clicked = on_delete_clicked
         self.on_edit_clicked = on_edit_clicked
         self.on_save_clicked = on_save_clicked
+        # この Task を表示している TodoApp。TodoApp が作るときに設定する
+        self.app = None
+        self._display_task = None
+        self._edit_name = None
+        self._display_view = None
+        self._edit_view = None
+
+    @property
+    def task_id(self):
+        return self.record.id
+
+    @property
+    def lock(self):
+        """record を変更するときに取るロック。TodoApp に属さない Task では何もしない。"""
+        return self.app.lock if self.app is not None else nullcontext()
+
+    @property
+    def task_name(self):
+        return self.record.name
+
+    @task_name.setter
+    def task_name(self, value):
+        self.record.name = value
+
+    @property
+    def completed(self):
+        return self.record.completed
+
+    @completed.setter
+    def completed(self, value):
+        self.record.completed = value
+
+    @property
+    def display_task(self):
+        self.build()
+        return self._display_task
+
+    @property
+    def edit_name(self):
+        self.build()
+        return self._edit_name
+
+    @property
+    def display_view(self):
+        self.build()
+        return self._display_view
 
-        self.display_task = ft.Checkbox(
-            value=False, label=self.task_name, on_change=self.status_changed
+    @property
+    def edit_view(self):
+        self.build()
+        return self._edit_view
+
+    @property
+    def built(self):
+        return self._display_task is not None
+
+    @property
+    def editing(self):
+        return self.built and self._edit_view.visible
+
+    def build(self):
+        if self.built:
+            return
+        self._display_task = ft.Checkbox(
+            value=self.completed, label=self.task_name, on_change=self.status_changed
         )
-        self.edit_name = ft.TextField(expand=1)
+        self._edit_name = ft.TextField(expand=1)
 
-        self.display_view = ft.Row(
+        self._display_view = ft.Row(
             alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
             vertical_alignment=ft.CrossAxisAlignment.CENTER,
             controls=[
-                self.display_task,
+                self._display_task,
                 ft.Row(
                     spacing=0,
                     controls=[
@@ -51,12 +133,12 @@ class Task(ft.Column):
             ],
         )
 
-        self.edit_view = ft.Row(
+        self._edit_view = ft.Row(
             visible=False,
             alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
             vertical_alignment=ft.CrossAxisAlignment.CENTER,
             controls=[
-                self.edit_name,
+                self._edit_name,
                 ft.IconButton(
                     icon=ft.Icons.DONE_OUTLINE_OUTLINED,
                     icon_color=ft.Colors.GREEN,
@@ -66,7 +148,22 @@ class Task(ft.Column):
             ],
         )
 
-        self.controls = [self.display_view, self.edit_view]
+        self.controls = [self._display_view, self._edit_view]
+
+    def update(self):
+        # TodoApp に属する Task は、TodoApp の更新と一緒に送る
+        if self.app is not None:
+            self.app.renderer.mark(self)
+        else:
+            super().update()
+
+    def release(self):
+        """子のコントロールを捨てて、作る前の軽い状態に戻す。"""
+        self._display_task = None
+        self._edit_name = None
+        self._display_view = None
+        self._edit_view = None
+        self.controls = []
 
     def edit_clicked(self, e):
         self.edit_name.value = self.display_task.label
@@ -77,19 +174,22 @@ class Task(ft.Column):
         self.update()
 
     def save_clicked(self, e):
-        self.display_task.label = self.edit_name.value
+        self.task_name = self.edit_name.value
+        self.display_task.label = self.task_name
         self.display_view.visible = True
         self.edit_view.visible = False
         if self.on_save_clicked:
             self.on_save_clicked()
-        global todo_app
-        todo_app.save_tasks()
+        app = self.app if self.app is not None else todo_app
+        app.rename_task(self)
         self.update()
 
     def status_changed(self, e):
-        self.completed = self.display_task.value
-        if self.on_status_changed:
-            self.on_status_changed(self)
+        # 完了の状態は TaskStore の集合も変えるので、TodoApp のロックの中で変える
+        with self.lock:
+            self.completed = self.display_task.value
+            if self.on_status_changed:
+                self.on_status_changed(self)
 
     def delete_clicked(self, e):
         if self.on_delete_clicked:
@@ -97,27 +197,98 @@ class Task(ft.Column):
 
 
 class TodoApp(ft.Column):
-    def __init__(self, lang="en", json_path="storage/todos.json"):
+    # タスクの表示に使う Task のクラス
+    task_class = Task
+
+    def __init__(
+        self,
+        lang="en",
+        json_path="storage/todos.json",
+        storage=None,
+        storage_url=None,
+        virtualized=False,
+        debug=False,
+        metrics=None,
+    ):
         """TodoApp の初期化メソッド。
 
         Args:
             lang (str): アプリの言語設定。デフォルトは "en"。
             json_path (str): タスクを保存する JSON ファイルのパス。デフォルトは "storage/todos.json"。
+            storage (TaskStorage): タスクの保存先。省略時は storage_url か json_path から作成する。
+            storage_url (str): "sqlite:///storage/todos.db" のような保存先の URL。
+                省略時は json_path の JournalStorage を使う。
+            virtualized (bool): True の場合、表示範囲の行だけに Task を作って描画する
+                VirtualTaskList を使う。
+            debug (bool): True の場合、stats を参照するたびに件数を全件の走査で検証する。
+            metrics (Metrics): 指定すると、ハンドラと保存先の呼び出しの時間を記録する。
         """
         super().__init__()
         self.lang = lang
         self.json_path = json_path
-        self.translations = translations[self.lang]
+        if storage is None:
+            if storage_url:
+                storage = open_storage(storage_url)
+            else:
+                storage = JournalStorage(json_path)
+        self.metrics = metrics
+        if metrics is not None:
+            # 計測しないときは読み込まない
+            from src.instrumentation import (
+                APP_HANDLERS,
+                InstrumentedStorage,
+                instrument_handlers,
+            )
+
+            storage = InstrumentedStorage(storage, metrics)
+            # ハンドラをコントロールに渡す前に置き換える
+            instrument_handlers(self, APP_HANDLERS, metrics)
+        self.storage = storage
+        self.store = TaskStore()
+        self._task_controls = {}
+        self._shown_filter = 0
+        self.debug = debug
+        self._batch_depth = 0
+        self._pending_ops = []
+        self._update_pending = False
+        # store・Task・索引を読み書きするときに取るロック。ハンドラ、読み込み用の
+        # スレッド、監視用のスレッド、pubsub がそれぞれのスレッドから変更する
+        self.lock = threading.RLock()
+        # 1回の操作の中の画面の更新を、1回の page.update() にまとめる。
+        # ハンドラ (coalesce_updates) はその間 self.lock を取る
+        self.renderer = RenderScheduler(self, lock=self.lock)
+        self.pubsub = None
+        self.topic = None
+        self.watcher = None
+        self.translations = get_translations(self.lang)
 
         self.new_task = ft.TextField(
             hint_text=self.translations["What needs to be done?"],
             on_submit=self.add_clicked,
             expand=True,
         )
-        self.tasks = ft.Column()
+        self.virtualized = virtualized
+        if virtualized:
+            self.tasks = VirtualTaskList(
+                self.store, self._create_task, self._task_visible, lock=self.lock
+            )
+            # 仮想化したリストでは、Task は表示範囲のレコードの分だけある
+            self._task_controls = self.tasks.built_tasks
+        else:
+            self.tasks = ft.Column()
 
         self.items_left = ft.Text("0 items left")
 
+        # 検索の索引は最初に検索したときに作る
+        self.search_index = None
+        self._query = ""
+        self._matched_ids = None
+        self.search = ft.TextField(
+            hint_text=self.translations["Search"],
+            prefix_icon=ft.Icons.SEARCH,
+            on_change=self.search_changed,
+        )
+
         self.filter = ft.Tabs(
             scrollable=False,
             selected_index=0,
@@ -153,6 +324,7 @@ class TodoApp(ft.Column):
             ft.Column(
                 spacing=25,
                 controls=[
+                    self.search,
                     self.filter,
                     self.tasks,
                     ft.Row(
@@ -170,142 +342,697 @@ class TodoApp(ft.Column):
             ),
         ]
 
+    @coalesce_updates
     def add_clicked(self, e):
         if self.new_task.value:
-            task = Task(
-                task_name=self.new_task.value,
-                on_status_changed=self.status_changed,
-                on_delete_clicked=self.delete_task,
-                on_edit_clicked=self.edit_clicked,
-                on_save_clicked=self.save_clicked,
-            )
-            self.tasks.controls.append(task)
+            record = TaskRecord(self.new_task.value)
+            task = self._add_record(record)
+            if task is not None:
+                self.tasks.controls.append(task)
             self.new_task.value = ""
-            global todo_app
-            todo_app.save_tasks()
-            self.update()
-            self.new_task.focus()
-        else:
-            self.update()
-        self.update_items_left()  # pragma: no cover
+            self._record({"op": "add", **record.to_dict()})
+            self.renderer.mark(self.tasks)
+            self.renderer.focus(self.new_task)
+        self.update_items_left()
 
+    @coalesce_updates
     def status_changed(self, task):
-        global todo_app
-        todo_app.save_tasks()
+        record = task.record
+        record.touch()
+        task.visible = self._task_visible(record)
+        self._send_visibility([task])
+        self._record(
+            {
+                "op": "toggle",
+                "id": record.id,
+                "completed": record.completed,
+                "updated_at": record.updated_at,
+            }
+        )
         self.update_items_left()
 
+    @coalesce_updates
+    def rename_task(self, task):
+        record = task.record
+        record.touch()
+        if self.search_index is not None:
+            self._index_record(record)
+            task.visible = self._task_visible(record)
+            self._send_visibility([task])
+        self._record(
+            {
+                "op": "rename",
+                "id": record.id,
+                "task_name": record.name,
+                "updated_at": record.updated_at,
+            }
+        )
+
+    @coalesce_updates
     def delete_task(self, task):
-        self.tasks.controls.remove(task)
-        global todo_app
-        todo_app.save_tasks()
+        if not self.virtualized:
+            self.tasks.controls.remove(task)
+        self.renderer.mark(self.tasks)
+        self._task_controls.pop(task.task_id, None)
+        self.store.remove(task.task_id)
+        self._unindex_ids((task.task_id,))
+        self._record({"op": "delete", "id": task.task_id})
+        self.update_items_left()
+
+    @coalesce_updates
+    def delete_tasks(self, tasks):
+        """複数のタスクを削除する。
+
+        タスクのリストは1回の走査で作り直し、保存と画面の更新も1回ずつ行う。
+
+        Args:
+            tasks (iterable): 削除する Task。
+        """
+        self._delete_ids({task.task_id for task in tasks})
+
+    def _delete_ids(self, task_ids):
+        if not task_ids:
+            return
+        self._remove_tasks(task_ids)
+        ops = [{"op": "delete", "id": task_id} for task_id in task_ids]
+        if self._batch_depth:
+            self._pending_ops.extend(ops)
+        else:
+            self._write_deletes(task_ids)
+            self._publish(ops)
         self.update_items_left()
 
+    def _remove_tasks(self, task_ids):
+        self.store.remove_many(task_ids)
+        self._unindex_ids(task_ids)
+        for task_id in task_ids:
+            self._task_controls.pop(task_id, None)
+        if not self.virtualized:
+            self.tasks.controls = [
+                task for task in self.tasks.controls if task.task_id not in task_ids
+            ]
+        self.renderer.mark(self.tasks)
+
+    @contextmanager
+    def batch(self):
+        """ブロック内の変更をまとめて、保存と画面の更新を1回ずつにする。
+
+        例:
+            with todo_app.batch():
+                for task in tasks:
+                    todo_app.status_changed(task)
+        """
+        self._batch_depth += 1
+        with self.renderer.render():
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    ops, self._pending_ops = self._pending_ops, []
+                    self._write_ops(ops)
+                    self._publish(ops)
+                    if self._update_pending:
+                        self._update_pending = False
+                        self.update_items_left()
+
+    def update(self):
+        # 全体を送る。render() の中ではブロックの終わりに1回だけ送る
+        self.renderer.mark(self)
+
+    def _record(self, op):
+        if self._batch_depth:
+            self._pending_ops.append(op)
+        else:
+            self._write_ops([op])
+            self._publish([op])
+
+    def _write_ops(self, ops):
+        """操作を保存先に書き込む。"""
+        self.storage.append_many(ops)
+
+    def _write_deletes(self, task_ids):
+        self.storage.delete_many(task_ids)
+
+    def attach_session(self, pubsub, topic="tasks"):
+        """ほかのセッションと変更を送り合うようにする。
+
+        保存先を共有する TodoApp どうしで、保存した操作をそのまま pubsub の
+        topic に送り、受け取った操作は apply_remote_ops() で画面に反映する。
+
+        Args:
+            pubsub: page.pubsub。
+            topic (str): 操作を送り合うトピック。
+        """
+        self.pubsub = pubsub
+        self.topic = topic
+        pubsub.subscribe_topic(topic, self._remote_ops_received)
+
+    def detach_session(self, e=None):
+        """セッションの終了時に購読と監視をやめ、保留中の書き込みを完了させる。"""
+        if self.pubsub is not None:
+            self.pubsub.unsubscribe_topic(self.topic)
+            self.pubsub = None
+        self.stop_watching()
+        self.flush()
+        if self.metrics is not None:
+            self.metrics.flush()
+
+    def _publish(self, ops):
+        if self.pubsub is not None and ops:
+            self.pubsub.send_others_on_topic(self.topic, ops)
+
+    def _remote_ops_received(self, topic, ops):
+        self.apply_remote_ops(ops)
+
+    @coalesce_updates
+    def apply_remote_ops(self, ops):
+        """ほかのセッションで保存された操作を画面に反映する。保存先には書き込まない。
+
+        状態が変わった Task と残りの件数だけを送り、タスクが増減したときだけ
+        リスト全体を更新する。
+        """
+        changed = []
+        updated = False
+        deleted = set()
+        added = False
+        for op in ops:
+            kind = op["op"]
+            record = self.store.get(op["id"])
+            if kind == "add":
+                if record is None:
+                    task = self._add_record(TaskRecord.from_dict(op))
+                    if task is not None:
+                        self.tasks.controls.append(task)
+                    added = True
+                continue
+            if record is None:
+                continue
+            if kind == "delete":
+                deleted.add(record.id)
+                continue
+            # 仮想化したリストでは、表示範囲の外のレコードには Task が無い
+            task = self._task_controls.get(record.id)
+            if kind == "toggle":
+                record.completed = op["completed"]
+                if task is not None and task.built:
+                    task.display_task.value = record.completed
+            elif kind == "rename":
+                record.name = op["task_name"]
+                if task is not None and task.built:
+                    task.display_task.label = record.name
+                if self.search_index is not None:
+                    self._index_record(record)
+            record.updated_at = op.get("updated_at", record.updated_at)
+            updated = True
+            if task is not None:
+                task.visible = self._task_visible(record)
+                changed.append(task)
+        if deleted:
+            self._remove_tasks(deleted)
+        if added:
+            self.renderer.mark(self.tasks)
+        if added or deleted:
+            self.update_items_left()
+            return
+        if not updated:
+            return
+        self.items_left.value = self._items_left_text()
+        if self.virtualized:
+            self.renderer.mark(self.tasks, self.items_left)
+        else:
+            self.renderer.mark(*changed, self.items_left)
+
+    @coalesce_updates
     def tabs_changed(self, e):
-        self.update()
         self.update_task_visibility()
-        self.update_items_left()
 
+    @coalesce_updates
+    def search_changed(self, e):
+        self.search_tasks(self.search.value)
+
+    @coalesce_updates
+    def search_tasks(self, query):
+        """タスク名に query を含むタスクだけを表示する。
+
+        選択中のタブの絞り込みと組み合わせて表示し、表示が変わる Task だけを
+        まとめて1回で送る。query が空なら絞り込みを解除する。
+        """
+        index = self._ensure_search_index()
+        query = query or ""
+        matched = index.search(query)
+        previous = self._matched_ids
+        self._query = query
+        self._matched_ids = matched
+        if previous is None and matched is None:
+            return
+        if self.virtualized:
+            # 表示する行は VirtualTaskList が更新のときに選び直す
+            self.renderer.mark(self.tasks)
+            return
+        if previous is None or matched is None:
+            candidates = list(self._task_controls)
+        else:
+            candidates = previous ^ matched
+        changed = []
+        for task_id in candidates:
+            task = self._task_controls.get(task_id)
+            if task is None:
+                continue
+            visible = self._task_visible(task.record)
+            if task.visible != visible:
+                task.visible = visible
+                changed.append(task)
+        self._send_visibility(changed)
+
+    def _ensure_search_index(self):
+        if self.search_index is None:
+            # 検索を使うまで読み込まない
+            from src.search import SearchIndex
+
+            self.search_index = SearchIndex()
+            for record in self.store:
+                self.search_index.add(record.id, record.name)
+        return self.search_index
+
+    def _index_record(self, record):
+        self.search_index.add(record.id, record.name)
+        if self._matched_ids is not None:
+            if self.search_index.matches(record.id, self._query):
+                self._matched_ids.add(record.id)
+            else:
+                self._matched_ids.discard(record.id)
+
+    def _unindex_ids(self, task_ids):
+        if self.search_index is None:
+            return
+        for task_id in task_ids:
+            self.search_index.remove(task_id)
+        if self._matched_ids is not None:
+            self._matched_ids.difference_update(task_ids)
+
+    @coalesce_updates
     def clear_clicked(self, e):
-        for task in self.tasks.controls[:]:
-            if task.completed:
-                self.delete_task(task)
+        self._delete_ids(self.store.completed_ids())
 
+    @coalesce_updates
     def update_task_visibility(self):
-        for task in self.tasks.controls:
-            if self.filter.selected_index == 0:  # "all" tab
-                task.visible = True
-            elif self.filter.selected_index == 1:  # "active" tab
-                task.visible = not task.completed
-            elif self.filter.selected_index == 2:  # "completed" tab
-                task.visible = task.completed
-            task.update()
+        """選択中のタブに合わせてタスクの表示を切り替える。
+
+        表示は未完了・完了済みのグループ単位で決まるので、表示が変わるグループの
+        Task だけを書き換え、変更はまとめて1回で送る。検索中は検索に一致する
+        Task だけが対象になる。
+        """
+        selected = self.filter.selected_index
+        changed = []
+        for completed in (False, True):
+            visible = self._is_shown(completed, selected)
+            if visible == self._is_shown(completed, self._shown_filter):
+                continue
+            if self.virtualized:
+                # 表示する行は VirtualTaskList が更新のときに選び直す
+                self.renderer.mark(self.tasks)
+                break
+            task_ids = self.store.completed_ids() if completed else self.store.active_ids()
+            if self._matched_ids is not None:
+                task_ids &= self._matched_ids
+            for task_id in task_ids:
+                task = self._task_controls[task_id]
+                task.visible = visible
+                changed.append(task)
+        self._shown_filter = selected
+        self._send_visibility(changed)
         if hasattr(self, "translations"):
             self.update_items_left()
 
+    def _send_visibility(self, changed):
+        if not changed:
+            return
+        if self.virtualized:
+            self.renderer.mark(self.tasks)
+        else:
+            self.renderer.mark(*changed)
+
+    def _task_visible(self, record):
+        return self._is_shown(record.completed, self._shown_filter) and (
+            self._matched_ids is None or record.id in self._matched_ids
+        )
+
+    @staticmethod
+    def _is_shown(completed, selected_index):
+        if selected_index == 1:  # "active" tab
+            return not completed
+        if selected_index == 2:  # "completed" tab
+            return completed
+        return True  # "all" tab
+
     def save_tasks(self):
-        task_list = []
-        for task in self.tasks.controls:
-            task_list.append(
-                {"task_name": task.display_task.label, "completed": task.completed}
-            )
-        with open(self.json_path, "w", encoding="utf-8") as f:
-            json.dump(task_list, f, ensure_ascii=False, indent=4)
+        with self.lock:
+            tasks = self.store.to_list()
+        self.storage.save(tasks)
+
+    def flush(self, e=None):
+        """保留中の書き込みを完了させる。終了時のイベントハンドラとしても使える。"""
+        self.storage.flush()
 
     def edit_clicked(self):
-        self.update()
+        # 編集中の Task は自分を送るので、ここで送るものは無い
+        pass
 
     def save_clicked(self):
-        self.update()
+        pass
 
     def load_tasks(self):
+        self._load_tasks()
+
+    def reload_if_changed(self, e=None):
+        """ほかの書き込み手が保存先を変えていたら、タスクを読み込み直す。
+
+        変わったかどうかはファイルの情報だけで判定するので、頻繁に呼んでもよい。
+
+        Returns:
+            bool: 読み込み直した場合は True。
+        """
+        if not self.storage.changed():
+            return False
+        self.reload_tasks()
+        return True
+
+    def sync_external_changes(self):
+        """ほかの書き込み手が保存先を変えていたら、変わったタスクだけを画面に反映する。
+
+        保存先から読み直したタスクと表示中のタスクの差分を操作にして
+        apply_remote_ops() で反映するので、変わらなかった Task はそのまま残る。
+        自分の書き込みでは changed() が False なので、何もしない。
+        反映した操作はほかのセッションにも送る。
+
+        Returns:
+            bool: 保存先が変わっていた場合は True。
+        """
+        if not self.storage.changed():
+            return False
         try:
-            with open(self.json_path, "r", encoding="utf-8") as f:
-                task_list = json.load(f)
-            for task_data in task_list:
-                task = Task(
-                    task_name=task_data["task_name"],
-                    on_status_changed=self.status_changed,
-                    on_delete_clicked=self.delete_task,
-                    on_edit_clicked=self.edit_clicked,
-                    on_save_clicked=self.save_clicked,
-                )
-                task.completed = task_data["completed"]
-                task.display_task.value = task.completed
-                self.tasks.controls.append(task)
+            new_tasks, _ = index_tasks(self.storage.load())
+        except FileNotFoundError:
+            new_tasks = {}
+        except (json.JSONDecodeError, BinaryFormatError):
+            # 書き込みの途中などで読めない。次の変更で読み直す
+            return False
+        with self.lock:
+            ops = diff_tasks({record.id: record.to_dict() for record in self.store}, new_tasks)
+            if ops:
+                self.apply_remote_ops(ops)
+                self._publish(ops)
+        return True
+
+    def watch_storage(self, interval=1.0, use_inotify=True):
+        """保存先のファイルを監視し、ほかの書き込み手の変更を自動で反映する。
+
+        タスクを読み込んでから呼ぶ。変更は監視用のスレッドで
+        sync_external_changes() を呼んで反映する。shared_storage() を使う
+        セッションでは、代わりに watch_shared_storage() でまとめて監視する。
+
+        Args:
+            interval (float): inotify が使えない場合に、ファイルを調べる間隔 (秒)。
+            use_inotify (bool): False なら常に一定間隔で調べる。
+
+        Returns:
+            FileWatcher: 開始した監視。監視するファイルが無い保存先では None。
+        """
+        from src.watcher import FileWatcher
+
+        self.stop_watching()
+        paths = self.storage.watch_paths()
+        if not paths:
+            return None
+        self.watcher = FileWatcher(
+            paths, self.sync_external_changes, interval=interval, use_inotify=use_inotify
+        )
+        self.watcher.start()
+        return self.watcher
+
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    @coalesce_updates
+    def reload_tasks(self):
+        """表示中のタスクを捨てて、保存先から読み込み直す。"""
+        self._clear_loaded()
+        self._load_tasks()
+        if self._query:
+            self.search_tasks(self._query)
+        self.renderer.mark(self.tasks)
+        self.update_items_left()
+
+    def lifecycle_changed(self, e):
+        # ウィンドウに戻ってきたときに、ほかのウィンドウやプロセスの変更を取り込む
+        if e.state in (ft.AppLifecycleState.RESUME, ft.AppLifecycleState.SHOW):
+            self.sync_external_changes()
+
+    def load_tasks_in_background(self, first_batch=50, batch_size=1000, on_loaded=None):
+        """タスクを別スレッドで読み込み、読み込んだ分から表示する。
+
+        最初の first_batch 件はすぐに表示し、以降は batch_size 件ごとに追加して
+        読み込み済みの件数を items_left に表示する。on_loaded を指定すると、
+        読み込み終えたときに同じスレッドで引数なしで呼ぶ。
+
+        Returns:
+            threading.Thread: 読み込み中のスレッド。
+        """
+        thread = threading.Thread(
+            target=self._load_tasks_and_show,
+            args=(first_batch, batch_size, on_loaded),
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    def _load_tasks_and_show(self, first_batch, batch_size, on_loaded=None):
+        self._load_tasks(first_batch, batch_size)
+        # 最後の分のタスクと件数を送る
+        with self.renderer.render():
+            self.items_left.value = self._items_left_text()
+            self.update()
+        if on_loaded is not None:
+            on_loaded()
+
+    def _load_tasks(self, first_batch=None, batch_size=None):
+        # 読み込みと TaskRecord への変換はロックの外で行い、画面の状態には
+        # まとまった分ずつロックを取って加える。その間もハンドラは動ける
+        records = []
+        limit = first_batch
+        try:
+            for task_data in self.storage.load_iter():
+                records.append(TaskRecord.from_dict(task_data))
+                if limit is not None and len(records) >= limit:
+                    self._show_loaded(records)
+                    records = []
+                    limit = batch_size
         except FileNotFoundError:
             print("File not found")
-            self.tasks.controls = []
+            with self.lock:
+                self._clear_loaded()
             return
         except json.JSONDecodeError:
             print("Invalid JSON file")
-            self.tasks.controls = []
-            self.update_items_left()
+            with self.renderer.render():
+                self._clear_loaded()
+                self.update_items_left()
+            return
+        except BinaryFormatError:
+            print("Invalid binary file")
+            with self.renderer.render():
+                self._clear_loaded()
+                self.update_items_left()
             return
+        with self.lock:
+            self._add_loaded(records)
+
+    def _clear_loaded(self):
+        self.store.clear()
+        self._task_controls.clear()
+        self.tasks.controls = []
+        if self.search_index is not None:
+            self.search_index = None
+            self._matched_ids = None
+
+    def _add_loaded(self, records):
+        tasks = [
+            self._add_record(record)
+            for record in records
+            # 読み込んでいる間に、ほかのセッションから先に届いたタスクは加えない
+            if record.id not in self.store
+        ]
+        self.tasks.controls.extend(task for task in tasks if task is not None)
 
+    def _show_loaded(self, records):
+        with self.renderer.render():
+            self._add_loaded(records)
+            self.items_left.value = (
+                f"{self.translations['Loading tasks...']} {len(self.store)}"
+            )
+            self.update()
+
+    def _add_record(self, record):
+        """レコードを加えて、表示する Task を返す。
+
+        仮想化したリストでは Task は表示範囲に入ったときに作るので、None を返す。
+        """
+        self.store.add(record)
+        if self.search_index is not None:
+            self._index_record(record)
+        if self.virtualized:
+            return None
+        return self._create_task(record)
+
+    def _create_task(self, record):
+        task = self.task_class(
+            # 名前は表示するときに record から読む
+            task_name=None,
+            on_status_changed=self.status_changed,
+            on_delete_clicked=self.delete_task,
+            on_edit_clicked=self.edit_clicked,
+            on_save_clicked=self.save_clicked,
+            record=record,
+        )
+        task.visible = self._task_visible(record)
+        task.app = self
+        if self.metrics is not None:
+            from src.instrumentation import TASK_HANDLERS, instrument_handlers
+
+            instrument_handlers(task, TASK_HANDLERS, self.metrics)
+        self._task_controls[record.id] = task
+        return task
+
+    @coalesce_updates
     def language_changed(self, e):
         if e and hasattr(e, "control") and e.control:
             self.lang = e.control.value
         else:
             self.lang = "ja"
         try:
-            self.translations = translations[self.lang]
+            self.translations = get_translations(self.lang)
         except KeyError:
             self.lang = "ja"
-            self.translations = translations["ja"]
+            self.translations = get_translations("ja")
         self.new_task.hint_text = self.translations["What needs to be done?"]
+        self.search.hint_text = self.translations["Search"]
         self.filter.tabs[0].text = self.translations["all"]
         self.filter.tabs[1].text = self.translations["active"]
         self.filter.tabs[2].text = self.translations["completed"]
-        count = 0
-        for task in self.tasks.controls:
-            if not task.completed:
-                count += 1
-        self.items_left.value = f"{count} active {self.translations['item(s) left']}"
-        self.update()
+        self.items_left.value = self._items_left_text()
+        self.renderer.mark(self.new_task, self.search, self.filter, self.items_left)
+
+    @property
+    def stats(self):
+        """全件・未完了・完了済みの件数 (TaskStats)。"""
+        if self.debug:
+            self.store.verify()
+        return self.store.stats()
 
     def update_items_left(self):
-        count = 0
-        for task in self.tasks.controls:
-            if not task.completed:
-                count += 1
-        self.items_left.value = f"{count} active {self.translations['item(s) left']}"
-        self.update()
+        if self._batch_depth:
+            self._update_pending = True
+            return
+        text = self._items_left_text()
+        if text != self.items_left.value:
+            self.items_left.value = text
+            self.renderer.mark(self.items_left)
 
+    def _items_left_text(self):
+        count = self.stats.active
+        return f"{count} active {self.translations['item(s) left']}"
 
+
+# TodoApp に属さない Task の保存を受け取る TodoApp
 todo_app = None
 
+_shared_storage = None
+_shared_storage_lock = threading.Lock()
 
-def main(page: ft.Page):
-    global todo_app
 
+def shared_storage():
+    """プロセス内のすべてのセッションで共有する保存先を返す。"""
+    global _shared_storage
+    with _shared_storage_lock:
+        if _shared_storage is None:
+            _shared_storage = SharedStorage(JournalStorage("storage/todos.json"))
+        return _shared_storage
+
+
+_shared_watcher = None
+
+
+def watch_shared_storage(pubsub, topic="tasks"):
+    """shared_storage() のファイルを、プロセスで1つの FileWatcher で監視する。
+
+    ほかのプロセスの変更は SharedStorage.sync_changes() で操作にして、pubsub の
+    topic ですべてのセッションに送る。セッションごとに監視すると、スレッドと
+    inotify のインスタンスがセッションの数だけ要り、同じ変更を取り合う。
+    2回目以降の呼び出しは、動いている監視を返す。
+
+    Args:
+        pubsub: いずれかのセッションの page.pubsub。送り先はすべてのセッション。
+        topic (str): 操作を送るトピック。TodoApp.attach_session() と同じにする。
+
+    Returns:
+        FileWatcher: 監視。監視するファイルが無い保存先では None。
+    """
+    global _shared_watcher
+    storage = shared_storage()
+    with _shared_storage_lock:
+        if _shared_watcher is None:
+            from src.watcher import FileWatcher
+
+            paths = storage.watch_paths()
+            if not paths:
+                return None
+            storage.on_external_ops = lambda ops: pubsub.send_all_on_topic(topic, ops)
+            _shared_watcher = FileWatcher(paths, storage.sync_changes)
+            _shared_watcher.start()
+        return _shared_watcher
+
+
+_metrics = None
+
+
+def shared_metrics():
+    """環境変数 TODO_METRICS にファイルのパスがあれば、計測結果を書き出す Metrics を返す。
+
+    計測しない場合は None を返す。
+    """
+    global _metrics
+    path = os.environ.get("TODO_METRICS")
+    if not path:
+        return None
+    with _shared_storage_lock:
+        if _metrics is None:
+            from src.instrumentation import Metrics
+
+            _metrics = Metrics(path)
+        return _metrics
+
+
+def main(page: ft.Page):
     page.title = "ToDo App"
     page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
     page.scroll = ft.ScrollMode.ADAPTIVE
 
-    # 初回起動
-    todo_app = TodoApp(lang="ja")
+    # セッション (page) ごとに TodoApp を作り、保存先はセッション間で共有する
+    metrics = shared_metrics()
+    if metrics is not None:
+        from src.instrumentation import instrument_page
+
+        instrument_page(page, metrics)
+    todo_app = TodoApp(lang="ja", storage=shared_storage(), metrics=metrics)
     todo_app.page = page
     page.add(todo_app)
+    todo_app.attach_session(page.pubsub)
+    page.on_disconnect = todo_app.detach_session
+    page.on_close = todo_app.detach_session
+    page.on_app_lifecycle_state_change = todo_app.lifecycle_changed
 
     language_dropdown = ft.Dropdown(
         options=[ft.dropdown.Option("ja"), ft.dropdown.Option("en")],
@@ -318,11 +1045,20 @@ def main(page: ft.Page):
         actions=[language_dropdown],
     )
 
-    # タスクをロード
-    todo_app.load_tasks()
+    # 画面を先に表示し、タスクは読み込んだ分から表示する。
+    # 読み込み終えたら、ほかのプロセスによるファイルの変更の監視を始め、
+    # 言語の切り替えに備えてほかの言語の翻訳を読み込んでおく
     todo_app.update_items_left()
     page.update()
 
+    def loaded():
+        # 読み込みの間にセッションが終わっていたら、監視は始めない
+        if todo_app.pubsub is not None:
+            watch_shared_storage(page.pubsub)
+        preload_translations()
+
+    todo_app.load_tasks_in_background(on_loaded=loaded)
+
 
 if __name__ == "__main__":
     ft.app(main)  # pragma: no cover
@@ -0,0 +1,285 @@
+"""mmap して読むための、読み出し向けのタスクファイルの形式。
+
+ファイル全体をメモリにマップし、必要な行の必要な値だけをその場で読む。
+行は固定長のインデックスで引けるので、タスク名は表示するときまでデコードしない。
+
+    ヘッダー:     <4s B B 2x I I   magic "TODX", version, 予約, 件数, 完了済みの件数
+    ビットマップ: 件数ビット (8 バイト境界まで 0 で埋める)。i 行目が完了済みなら 1
+    インデックス: 件数 x <I I I I d d
+                  id の位置と長さ, task_name の位置と長さ, created_at, updated_at
+                  (位置は文字列領域の先頭から。日時が無い場合は NaN)
+    文字列領域:   id と task_name の UTF-8 を詰めて並べたもの
+"""
+import math
+import mmap
+import struct
+from collections.abc import Mapping, MutableMapping
+
+from src.binary_format import BinaryFormatError
+
+MAGIC = b"TODX"
+VERSION = 1
+
+HEADER = struct.Struct("<4sBB2xII")
+ENTRY = struct.Struct("<IIIIdd")
+
+
+def is_mapped(head):
+    """ファイルの先頭のバイト列がこの形式かどうかを返す。"""
+    return head.startswith(MAGIC)
+
+
+def _bitmap_size(count):
+    return (count + 63) // 64 * 8
+
+
+def _timestamp(value):
+    return math.nan if value is None else value
+
+
+def encode_tasks(task_list):
+    """タスク辞書のリストをバイト列に変換する。"""
+    count = len(task_list)
+    bitmap = bytearray(_bitmap_size(count))
+    entries = []
+    strings = []
+    offset = 0
+    completed_count = 0
+    for row, task in enumerate(task_list):
+        if task["completed"]:
+            bitmap[row >> 3] |= 1 << (row & 7)
+            completed_count += 1
+        id_bytes = task["id"].encode("utf-8")
+        name_bytes = task["task_name"].encode("utf-8")
+        entries.append(
+            ENTRY.pack(
+                offset,
+                len(id_bytes),
+                offset + len(id_bytes),
+                len(name_bytes),
+                _timestamp(task.get("created_at")),
+                _timestamp(task.get("updated_at")),
+            )
+        )
+        strings.append(id_bytes)
+        strings.append(name_bytes)
+        offset += len(id_bytes) + len(name_bytes)
+    return b"".join(
+        [HEADER.pack(MAGIC, VERSION, 0, count, completed_count), bytes(bitmap)]
+        + entries
+        + strings
+    )
+
+
+class MappedTaskFile:
+    """この形式のファイルを mmap し、行ごとの値を読み出す。
+
+    ファイルを置き換えても、開いている MappedTaskFile は元の内容を読み続ける。
+    ただし Windows ではマップしているファイルを置き換えられないので、置き換える前に
+    detach() でマップを閉じる。
+    """
+
+    def __init__(self, path):
+        """MappedTaskFile の初期化メソッド。
+
+        Raises:
+            FileNotFoundError: ファイルが無い場合。
+            BinaryFormatError: ファイルが壊れているか、未対応のバージョンの場合。
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise BinaryFormatError("Empty mapped task file") from None
+        try:
+            magic, version, _, count, completed_count = HEADER.unpack_from(self._mm, 0)
+        except struct.error:
+            raise BinaryFormatError("Truncated header") from None
+        if magic != MAGIC:
+            raise BinaryFormatError("Not a mapped task file")
+        if version != VERSION:
+            raise BinaryFormatError(f"Unsupported mapped format version: {version}")
+        self.count = count
+        self.completed_count = completed_count
+        self._bitmap_start = HEADER.size
+        self._index_start = self._bitmap_start + _bitmap_size(count)
+        self._strings_start = self._index_start + count * ENTRY.size
+        if self._strings_start > len(self._mm):
+            raise BinaryFormatError("Truncated index")
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def active_count(self):
+        return self.count - self.completed_count
+
+    def completed(self, row):
+        return bool(self._mm[self._bitmap_start + (row >> 3)] >> (row & 7) & 1)
+
+    def task_id(self, row):
+        id_offset, id_length, _, _, _, _ = self._entry(row)
+        return self._string(id_offset, id_length)
+
+    def name(self, row):
+        _, _, name_offset, name_length, _, _ = self._entry(row)
+        return self._string(name_offset, name_length)
+
+    def timestamps(self, row):
+        """(created_at, updated_at) を返す。無い値は None。"""
+        _, _, _, _, created_at, updated_at = self._entry(row)
+        return (
+            None if math.isnan(created_at) else created_at,
+            None if math.isnan(updated_at) else updated_at,
+        )
+
+    def detach(self):
+        """内容をメモリに読み込んでから mmap を閉じる。以降もそのまま読み出せる。"""
+        mm = self._mm
+        if isinstance(mm, mmap.mmap):
+            self._mm = mm[:]
+            mm.close()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+    def _entry(self, row):
+        if not 0 <= row < self.count:
+            raise IndexError(row)
+        return ENTRY.unpack_from(self._mm, self._index_start + row * ENTRY.size)
+
+    def _string(self, offset, length):
+        start = self._strings_start + offset
+        if start + length > len(self._mm):
+            raise BinaryFormatError("Truncated string region")
+        return str(self._mm[start:start + length], "utf-8")
+
+
+class MappedRow(Mapping):
+    """MappedTaskFile の1行。タスク辞書として読めるが、値は参照されたときに読む。"""
+
+    __slots__ = ("file", "row")
+
+    def __init__(self, file, row):
+        self.file = file
+        self.row = row
+
+    @property
+    def id(self):
+        return self.file.task_id(self.row)
+
+    @property
+    def name(self):
+        return self.file.name(self.row)
+
+    @property
+    def completed(self):
+        return self.file.completed(self.row)
+
+    def _keys(self):
+        keys = ["id", "task_name", "completed"]
+        created_at, updated_at = self.file.timestamps(self.row)
+        if created_at is not None:
+            keys.append("created_at")
+        if updated_at is not None:
+            keys.append("updated_at")
+        return keys
+
+    def __getitem__(self, key):
+        if key == "id":
+            return self.id
+        if key == "task_name":
+            return self.name
+        if key == "completed":
+            return self.completed
+        created_at, updated_at = self.file.timestamps(self.row)
+        value = {"created_at": created_at, "updated_at": updated_at}.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __repr__(self):
+        return f"MappedRow({self.file.path!r}, {self.row})"
+
+
+class MappedTaskDict(MutableMapping):
+    """MappedTaskFile を元にした、id をキーとするタスク辞書。
+
+    変更はファイルに書かず、変更された行と追加されたタスクだけを辞書に持つ。
+    ファイルの行を id で引くための索引は、最初に必要になったときに作る。
+    順序は dict と同じく、削除して追加し直したタスクは末尾になる。
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self._rows = None
+        self._patched = {}
+        self._removed = set()
+        self._tail = {}
+
+    def rows(self):
+        """id -> 行番号の辞書を返す。"""
+        if self._rows is None:
+            self._rows = {self.file.task_id(row): row for row in range(self.file.count)}
+        return self._rows
+
+    def _live_row(self, task_id):
+        row = self.rows().get(task_id)
+        if row is None or task_id in self._removed:
+            return None
+        return row
+
+    def __getitem__(self, task_id):
+        if task_id in self._tail:
+            return self._tail[task_id]
+        if task_id in self._patched:
+            return self._patched[task_id]
+        row = self._live_row(task_id)
+        if row is None:
+            raise KeyError(task_id)
+        return MappedRow(self.file, row)
+
+    def __setitem__(self, task_id, task):
+        if task_id not in self._tail and self._live_row(task_id) is not None:
+            self._patched[task_id] = task
+        else:
+            self._tail[task_id] = task
+
+    def __delitem__(self, task_id):
+        if task_id in self._tail:
+            del self._tail[task_id]
+        elif self._live_row(task_id) is not None:
+            self._patched.pop(task_id, None)
+            self._removed.add(task_id)
+        else:
+            raise KeyError(task_id)
+
+    def __iter__(self):
+        removed = self._removed
+        for row in range(self.file.count):
+            task_id = self.file.task_id(row)
+            if task_id not in removed:
+                yield task_id
+        yield from self._tail
+
+    def __len__(self):
+        return self.file.count - len(self._removed) + len(self._tail)
+
+    def active_count(self):
+        """未完了のタスクの件数。ファイルの分はビットマップの件数を使う。"""
+        rows = self.rows() if self._removed or self._patched else {}
+        active = self.file.active_count
+        for task_id in self._removed:
+            active -= not self.file.completed(rows[task_id])
+        for task_id, task in self._patched.items():
+            active += (not task["completed"]) - (not self.file.completed(rows[task_id]))
+        active += sum(1 for task in self._tail.values() if not task["completed"])
+        return active
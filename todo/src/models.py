@@ -0,0 +1,224 @@
+import time
+from collections import namedtuple
+
+from src.mapped_format import MappedRow
+from src.storage import new_task_id
+
+TaskStats = namedtuple("TaskStats", ["total", "active", "completed"])
+
+
+class TaskRecord:
+    """タスクの状態だけを持つ軽いオブジェクト。
+
+    画面の Task コントロールとは独立しているので、集計や保存は
+    ft.Column に触れずに TaskRecord だけで行える。TaskStore に追加された
+    レコードの completed を変えると、TaskStore の件数も更新される。
+    """
+
+    __slots__ = ("id", "name", "_completed", "created_at", "updated_at", "_store")
+
+    def __init__(
+        self, name, completed=False, task_id=None, created_at=None, updated_at=None
+    ):
+        """TaskRecord の初期化メソッド。
+
+        Args:
+            name (str): タスク名。
+            completed (bool): 完了済みかどうか。
+            task_id (str): タスクの ID。省略時は新しい ID を割り当てる。
+            created_at (float): 作成日時 (UNIX 時間)。省略時は現在時刻。
+            updated_at (float): 更新日時 (UNIX 時間)。省略時は created_at。
+        """
+        self._store = None
+        self.id = task_id if task_id is not None else new_task_id()
+        self.name = name
+        self.completed = completed
+        self.created_at = created_at if created_at is not None else time.time()
+        self.updated_at = updated_at if updated_at is not None else self.created_at
+
+    @classmethod
+    def from_dict(cls, task_data):
+        """保存先の辞書から TaskRecord を作る。
+
+        MappedStorage が返す MappedRow からは、名前を遅延して読む MappedTaskRecord を作る。
+        """
+        if isinstance(task_data, MappedRow):
+            return MappedTaskRecord(task_data)
+        return cls(
+            task_data["task_name"],
+            completed=task_data["completed"],
+            task_id=task_data.get("id"),
+            created_at=task_data.get("created_at"),
+            updated_at=task_data.get("updated_at"),
+        )
+
+    def to_dict(self):
+        """保存先に渡す辞書に変換する。"""
+        return {
+            "id": self.id,
+            "task_name": self.name,
+            "completed": self.completed,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+    @property
+    def completed(self):
+        return self._completed
+
+    @completed.setter
+    def completed(self, value):
+        self._completed = value
+        if self._store is not None:
+            self._store._completed_changed(self)
+
+    def touch(self):
+        """更新日時を現在時刻にする。"""
+        self.updated_at = time.time()
+
+    def __repr__(self):
+        return f"TaskRecord({self.name!r}, completed={self.completed!r}, task_id={self.id!r})"
+
+
+_name_slot = TaskRecord.name
+
+
+class MappedTaskRecord(TaskRecord):
+    """MappedRow から作る TaskRecord。
+
+    name は最初に参照されたときにファイルからデコードする。仮想化したリストでは
+    表示範囲に入った行の名前だけがデコードされる。
+    """
+
+    __slots__ = ("_row",)
+
+    def __init__(self, row):
+        self._store = None
+        self._row = row
+        self.id = row.id
+        self._completed = row.completed
+        created_at, updated_at = row.file.timestamps(row.row)
+        self.created_at = created_at if created_at is not None else time.time()
+        self.updated_at = updated_at if updated_at is not None else self.created_at
+
+    @property
+    def name(self):
+        try:
+            return _name_slot.__get__(self)
+        except AttributeError:
+            name = self._row.name
+            _name_slot.__set__(self, name)
+            return name
+
+    @name.setter
+    def name(self, value):
+        _name_slot.__set__(self, value)
+
+    @property
+    def name_loaded(self):
+        """名前をデコード済みかどうか。"""
+        try:
+            _name_slot.__get__(self)
+        except AttributeError:
+            return False
+        return True
+
+
+class TaskStore:
+    """id で引ける、追加順を保った TaskRecord の集まり。
+
+    未完了と完了済みの id の集合を持ち続けるので、件数は全件を数えずに O(1) で返せ、
+    状態ごとのタスクも全件を走査せずに取り出せる。
+    """
+
+    def __init__(self):
+        self._records = {}
+        self._active_ids = set()
+        self._completed_ids = set()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    def __contains__(self, task_id):
+        return task_id in self._records
+
+    def get(self, task_id):
+        return self._records.get(task_id)
+
+    def add(self, record):
+        self.remove(record.id)
+        record._store = self
+        self._records[record.id] = record
+        self._completed_changed(record)
+
+    def remove(self, task_id):
+        """id のレコードを取り除いて返す。無ければ None を返す。"""
+        record = self._records.pop(task_id, None)
+        if record is not None:
+            record._store = None
+            self._active_ids.discard(task_id)
+            self._completed_ids.discard(task_id)
+        return record
+
+    def remove_many(self, task_ids):
+        """複数のレコードを取り除き、取り除いたレコードのリストを返す。"""
+        removed = []
+        for task_id in task_ids:
+            record = self.remove(task_id)
+            if record is not None:
+                removed.append(record)
+        return removed
+
+    def clear(self):
+        for record in self._records.values():
+            record._store = None
+        self._records.clear()
+        self._active_ids.clear()
+        self._completed_ids.clear()
+
+    def to_list(self):
+        """保存先に渡す辞書のリストに変換する。"""
+        return [record.to_dict() for record in self._records.values()]
+
+    def active_ids(self):
+        """未完了のレコードの id の集合を返す。"""
+        return set(self._active_ids)
+
+    def completed_ids(self):
+        """完了済みのレコードの id の集合を返す。"""
+        return set(self._completed_ids)
+
+    @property
+    def completed_count(self):
+        return len(self._completed_ids)
+
+    @property
+    def active_count(self):
+        return len(self._active_ids)
+
+    def stats(self):
+        """全件・未完了・完了済みの件数を返す。"""
+        return TaskStats(len(self._records), self.active_count, self.completed_count)
+
+    def verify(self):
+        """件数を全件の走査で数え直し、保持している件数と一致するか確かめる。
+
+        Raises:
+            AssertionError: 件数が一致しない場合。
+        """
+        completed = sum(1 for record in self._records.values() if record.completed)
+        expected = TaskStats(len(self._records), len(self._records) - completed, completed)
+        actual = self.stats()
+        if actual != expected:
+            raise AssertionError(f"Task counters out of sync: {actual} != {expected}")
+
+    def _completed_changed(self, record):
+        if record.completed:
+            self._active_ids.discard(record.id)
+            self._completed_ids.add(record.id)
+        else:
+            self._completed_ids.discard(record.id)
+            self._active_ids.add(record.id)
@@ -0,0 +1,105 @@
+"""画面の更新をまとめて送るためのスケジューラー。"""
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class RenderScheduler:
+    """変更されたコントロールを覚えておき、1回の page.update() でまとめて送る。
+
+    render() のブロックの中で mark() したコントロールは、ブロックを抜けるときに
+    まとめて送る。ブロックの外で mark() した場合はすぐに送る。ほかのスレッドが
+    ブロックの中にいる間に mark() したコントロールも、そのブロックの終わりに送る。
+
+    先祖のコントロールも変更されている場合、子孫は先祖と一緒に送られるので除く。
+    root (TodoApp) を mark() した場合は root だけを送る。
+
+    lock を指定すると、render() のブロックの間 (最後の送信まで) そのロックを取る。
+    ブロックの中で変更する状態を、ほかのスレッドと取り合わないようにするため。
+    """
+
+    def __init__(self, root, lock=None):
+        """RenderScheduler の初期化メソッド。
+
+        Args:
+            root (ft.Control): 変更を送るコントロールの根。page は root.page を使う。
+            lock (threading.RLock): render() のブロックの間に取るロック。同じスレッドで
+                ブロックを入れ子にできるように、再入できるロックにする。
+        """
+        self.root = root
+        self.lock = lock if lock is not None else nullcontext()
+        # page.update() を呼んだ回数
+        self.update_count = 0
+        self._dirty = {}
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def render(self):
+        """ブロックの中の変更を、ブロックを抜けるときの1回の page.update() にまとめる。"""
+        with self.lock:
+            with self._lock:
+                self._depth += 1
+            try:
+                yield self
+            finally:
+                with self._lock:
+                    self._depth -= 1
+                    done = self._depth == 0
+                if done:
+                    self.flush()
+
+    def mark(self, *controls):
+        """controls を送る必要があることを記録する。"""
+        with self._lock:
+            for control in controls:
+                self._dirty[id(control)] = control
+            if self._depth:
+                return
+        self.flush()
+
+    def focus(self, control):
+        """control にフォーカスを移す。
+
+        control.focus() はその場で control を送るので、代わりにフォーカスの
+        属性だけを設定して、ほかの変更と一緒に送る。
+        """
+        control._set_attr_json("focus", str(time.time()))
+        self.mark(control)
+
+    def flush(self):
+        """記録したコントロールを送る。"""
+        with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, {}
+        page = self.root.page
+        if page is None:
+            # まだページに追加されていない。追加するときに全体が送られる
+            return
+        self.update_count += 1
+        page.update(*self._minimal(dirty))
+
+    def _minimal(self, dirty):
+        if id(self.root) in dirty:
+            return [self.root]
+        controls = []
+        for control in dirty.values():
+            parent = control.parent
+            while parent is not None and id(parent) not in dirty:
+                parent = parent.parent
+            if parent is None:
+                controls.append(control)
+        return controls
+
+
+def coalesce_updates(method):
+    """メソッドの中の画面の更新を、self.renderer で1回にまとめるデコレーター。"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.renderer.render():
+            return method(self, *args, **kwargs)
+
+    return wrapper
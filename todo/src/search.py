@@ -0,0 +1,157 @@
+import bisect
+import re
+import unicodedata
+
+# ひらがな・カタカナ・漢字・ハングル。分かち書きしないので n-gram で索引を作る
+_CJK_CHARS = "぀-ヿ㐀-䶿一-鿿豈-﫿가-힯"
+_TOKEN = re.compile(rf"([{_CJK_CHARS}]+)|([^\W_{_CJK_CHARS}]+)")
+
+
+def normalize(text):
+    """全角・半角と大文字・小文字の違いをなくした文字列を返す。"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def tokenize(text):
+    """正規化済みの文字列から、索引に入れるトークンの集合を返す。
+
+    英数字は単語ごと、CJK の文字は1文字と2文字の n-gram にする。
+    """
+    tokens = set()
+    for cjk, word in _TOKEN.findall(text):
+        if word:
+            tokens.add(word)
+            continue
+        tokens.update(cjk)
+        tokens.update(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+
+def _query_tokens(term):
+    """検索語の1語から、(トークン, 前方一致かどうか) のリストを返す。"""
+    tokens = []
+    for cjk, word in _TOKEN.findall(term):
+        if word:
+            tokens.append((word, True))
+        elif len(cjk) == 1:
+            tokens.append((cjk, False))
+        else:
+            tokens.extend((cjk[i:i + 2], False) for i in range(len(cjk) - 1))
+    return tokens
+
+
+class SearchIndex:
+    """タスク名の転置インデックス。
+
+    トークンからタスクの id の集合を引く。英数字の検索語は単語の前方一致、
+    CJK の検索語は n-gram の積集合で候補を絞り、必要なら部分文字列で確かめる。
+    空白で区切った検索語はすべてを含むタスクに一致する。
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._texts = {}
+        self._words = None
+
+    def __len__(self):
+        return len(self._texts)
+
+    def __contains__(self, task_id):
+        return task_id in self._texts
+
+    def add(self, task_id, name):
+        """タスクを索引に加える。同じ id があれば置き換える。"""
+        self.remove(task_id)
+        text = normalize(name)
+        self._texts[task_id] = text
+        for token in tokenize(text):
+            ids = self._postings.get(token)
+            if ids is None:
+                self._postings[token] = ids = set()
+                self._words = None
+            ids.add(task_id)
+
+    def remove(self, task_id):
+        text = self._texts.pop(task_id, None)
+        if text is None:
+            return
+        for token in tokenize(text):
+            ids = self._postings[token]
+            ids.discard(task_id)
+            if not ids:
+                del self._postings[token]
+                self._words = None
+
+    def matches(self, task_id, query):
+        """索引に入っているタスクが query に一致するかどうかを返す。
+
+        search() と同じ規則で、1つのタスクだけを確かめる。
+        """
+        text = self._texts.get(task_id)
+        if text is None:
+            return False
+        words = tokenize(text)
+        for term in normalize(query).split():
+            tokens = _query_tokens(term)
+            for token, prefix in tokens:
+                if prefix:
+                    if not any(word.startswith(token) for word in words):
+                        return False
+                elif token not in words:
+                    return False
+            exact = len(tokens) == 1 and len(tokens[0][0]) == len(term)
+            if not exact and term not in text:
+                return False
+        return True
+
+    def search(self, query):
+        """query に一致するタスクの id の集合を返す。検索語が無ければ None を返す。"""
+        terms = normalize(query).split()
+        if not terms:
+            return None
+        result = None
+        unverified = []
+        for term in terms:
+            ids, exact = self._candidates(term)
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+            if not exact:
+                unverified.append(term)
+        if unverified:
+            # 候補を絞り込んでから、部分文字列として含むかを確かめる
+            texts = self._texts
+            result = {
+                task_id
+                for task_id in result
+                if all(term in texts[task_id] for term in unverified)
+            }
+        return set(result)
+
+    def _candidates(self, term):
+        """検索語の1語に一致しうる id の集合と、それがすべて一致するかどうかを返す。"""
+        tokens = _query_tokens(term)
+        if not tokens:
+            # 記号だけの検索語は索引で絞り込めない
+            return set(self._texts), False
+        candidates = None
+        for token, prefix in sorted(tokens, key=lambda item: item[1]):
+            ids = self._prefix_ids(token) if prefix else self._postings.get(token, set())
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                break
+        # 検索語がそのまま1つのトークンなら、候補はすべて一致している
+        return candidates, len(tokens) == 1 and len(tokens[0][0]) == len(term)
+
+    def _prefix_ids(self, prefix):
+        if self._words is None:
+            self._words = sorted(self._postings)
+        words = self._words
+        start = bisect.bisect_left(words, prefix)
+        end = bisect.bisect_left(words, prefix + "\U0010ffff", start)
+        if end - start == 1:
+            return self._postings[words[start]]
+        ids = set()
+        for word in words[start:end]:
+            ids |= self._postings[word]
+        return ids
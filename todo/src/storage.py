@@ -0,0 +1,1205 @@
+import io
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from urllib.parse import parse_qsl
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from src import binary_format, mapped_format
+
+
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+
+def new_task_id():
+    """タスクに割り当てる安定した ID を生成する。"""
+    return uuid.uuid4().hex
+
+
+def _copy_timestamps(task, source):
+    for field in TIMESTAMP_FIELDS:
+        if source.get(field) is not None:
+            task[field] = source[field]
+    return task
+
+
+def normalize_task(task_data):
+    """保存されていた辞書を、id を持つタスク辞書に揃える。
+
+    旧形式のファイルには id が無いため、その場合は新しい id を割り当てる。
+    """
+    task_id = task_data.get("id")
+    if task_id is None:
+        task_id = new_task_id()
+    return _copy_timestamps(
+        {
+            "id": task_id,
+            "task_name": task_data["task_name"],
+            "completed": task_data["completed"],
+        },
+        task_data,
+    )
+
+
+def index_tasks(task_list):
+    """タスクのリストを id をキーとする辞書に変換する。
+
+    Args:
+        task_list (list): {"task_name", "completed"} を持つ辞書のリスト。
+
+    Returns:
+        tuple: (id -> タスク辞書, id を割り当てたかどうか)
+    """
+    tasks = {}
+    migrated = False
+    for task_data in task_list:
+        migrated = migrated or task_data.get("id") is None
+        task = normalize_task(task_data)
+        tasks[task["id"]] = task
+    return tasks, migrated
+
+
+def iter_json_array(f, chunk_size=65536):
+    """ファイルの JSON 配列を、全体を読み込まずに先頭の要素から順に返す。
+
+    Args:
+        f: テキストモードで開いたファイル。
+        chunk_size (int): 1回に読み込む文字数。
+
+    Raises:
+        json.JSONDecodeError: JSON 配列として読めない場合。
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def skip_whitespace():
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+    skip_whitespace()
+    if buffer[pos:pos + 1] != "[":
+        raise json.JSONDecodeError("Expecting '['", buffer, pos)
+    pos += 1
+    skip_whitespace()
+    if buffer[pos:pos + 1] == "]":
+        return
+    while True:
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                value = end = None
+            # 値がバッファの末尾で終わるときは、続きがあるかもしれないので読み足す
+            if end is not None and (end < len(buffer) or eof):
+                break
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+        yield value
+        pos = end
+        skip_whitespace()
+        separator = buffer[pos:pos + 1]
+        pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos - 1)
+        skip_whitespace()
+
+
+def apply_op(tasks, op):
+    """操作レコードを id -> タスク辞書に適用する。
+
+    タスク辞書は書き換えずに差し替えるので、取得済みのスナップショットは
+    別スレッドからそのまま読める。存在しない id への操作は無視する。
+
+    Args:
+        tasks (dict): id -> タスク辞書。
+        op (dict): "op" が add / toggle / rename / delete の操作レコード。
+    """
+    kind = op["op"]
+    task_id = op["id"]
+    if kind == "add":
+        tasks[task_id] = _copy_timestamps(
+            {
+                "id": task_id,
+                "task_name": op["task_name"],
+                "completed": op.get("completed", False),
+            },
+            op,
+        )
+    elif kind == "toggle":
+        if task_id in tasks:
+            tasks[task_id] = _copy_timestamps(
+                {**tasks[task_id], "completed": op["completed"]}, op
+            )
+    elif kind == "rename":
+        if task_id in tasks:
+            tasks[task_id] = _copy_timestamps(
+                {**tasks[task_id], "task_name": op["task_name"]}, op
+            )
+    elif kind == "delete":
+        tasks.pop(task_id, None)
+    else:
+        raise ValueError(f"Unknown operation: {kind}")
+
+
+def diff_tasks(old, new):
+    """id -> タスク辞書の old を new にするための操作のリストを返す。"""
+    ops = [{"op": "delete", "id": task_id} for task_id in old if task_id not in new]
+    for task_id, task in new.items():
+        before = old.get(task_id)
+        if before is None:
+            ops.append({"op": "add", **task})
+            continue
+        if before["completed"] != task["completed"]:
+            ops.append(
+                _copy_timestamps(
+                    {"op": "toggle", "id": task_id, "completed": task["completed"]},
+                    {"updated_at": task.get("updated_at")},
+                )
+            )
+        if before["task_name"] != task["task_name"]:
+            ops.append(
+                _copy_timestamps(
+                    {"op": "rename", "id": task_id, "task_name": task["task_name"]},
+                    {"updated_at": task.get("updated_at")},
+                )
+            )
+    return ops
+
+
+@contextmanager
+def file_lock(path):
+    """path をロックファイルにした助言ロック。
+
+    ほかのプロセスとも、同じプロセスのほかのスレッドとも排他になる。
+    ロックを取っている間に同じ path のロックを取り直してはいけない。
+    """
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_etag(*paths):
+    """ファイルの (inode, サイズ, 更新時刻) の組を返す。
+
+    内容を読まずに、ほかの書き込み手がファイルを変えたかを判定するのに使う。
+    無いファイルは None になる。
+    """
+    etag = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            etag.append(None)
+            continue
+        etag.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+    return tuple(etag)
+
+
+def write_json(path, task_list):
+    """一時ファイルに書き出してから置き換え、途中までの書き込みを残さない。"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(task_list, f, ensure_ascii=False, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_binary(path, task_list):
+    """write_json() と同じ手順で、バイナリ形式のファイルを書き出す。"""
+    data = binary_format.encode_tasks(task_list)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_mapped(path, task_list):
+    """write_json() と同じ手順で、mmap して読む形式のファイルを書き出す。"""
+    data = mapped_format.encode_tasks(task_list)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+SNAPSHOT_WRITERS = {
+    "json": write_json,
+    "binary": write_binary,
+    "mapped": write_mapped,
+}
+
+
+def snapshot_writer(snapshot_format):
+    """形式の名前から書き込み関数を返す。
+
+    Raises:
+        ValueError: 未対応の形式の場合。
+    """
+    try:
+        return SNAPSHOT_WRITERS[snapshot_format]
+    except KeyError:
+        raise ValueError(f"Unsupported snapshot format: {snapshot_format}") from None
+
+
+def iter_snapshot(path):
+    """スナップショットのタスクを1件ずつ返す。形式は先頭のバイト列で判定する。
+
+    Raises:
+        FileNotFoundError: ファイルが無い場合。
+        json.JSONDecodeError: JSON 形式のファイルが壊れている場合。
+        binary_format.BinaryFormatError: バイナリ形式のファイルが壊れている場合。
+    """
+    with open(path, "rb") as f:
+        yield from iter_snapshot_file(f)
+
+
+def iter_snapshot_file(f):
+    """バイナリモードで開いたスナップショットのタスクを1件ずつ返す。"""
+    head = f.read(len(binary_format.MAGIC))
+    if binary_format.is_binary(head):
+        yield from binary_format.iter_tasks(head + f.read())
+        return
+    if mapped_format.is_mapped(head):
+        mapped = mapped_format.MappedTaskFile(f.name)
+        try:
+            for row in range(mapped.count):
+                yield dict(mapped_format.MappedRow(mapped, row))
+        finally:
+            mapped.close()
+        return
+    f.seek(0)
+    yield from iter_json_array(io.TextIOWrapper(f, encoding="utf-8"))
+
+
+def convert_snapshot(src_path, dst_path, snapshot_format="binary"):
+    """保存されたタスクを別の形式のスナップショットに書き出す。
+
+    src_path の操作ログも反映してから書き出す。src_path と dst_path が同じ場合は
+    その場で書き換え、反映済みの操作ログを削除する。
+
+    Returns:
+        int: 書き出したタスクの件数。
+    """
+    task_list = JournalStorage(src_path).load()
+    JournalStorage(dst_path, snapshot_format=snapshot_format).save(task_list)
+    return len(task_list)
+
+
+class DebouncedWriter:
+    """変更通知をまとめて、interval 秒に最大1回だけ書き込むバックグラウンドライター。
+
+    mark_dirty() は印を付けるだけですぐに戻る。書き込みは別スレッドで行い、
+    待っている間に届いた通知は1回の書き込みにまとめられる。
+    """
+
+    def __init__(self, write, interval):
+        """DebouncedWriter の初期化メソッド。
+
+        Args:
+            write (callable): 最新の状態を書き込む関数。
+            interval (float): 書き込みの最小間隔 (秒)。
+        """
+        self.write = write
+        self.interval = interval
+        self.write_count = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def mark_dirty(self):
+        with self._lock:
+            self._dirty = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def flush(self):
+        """保留中の変更があれば、呼び出し元のスレッドですぐに書き込む。"""
+        with self._write_lock:
+            with self._lock:
+                dirty = self._dirty
+                self._dirty = False
+            if not dirty:
+                return
+            try:
+                self.write()
+            except Exception:
+                with self._lock:
+                    self._dirty = True
+                raise
+            self.write_count += 1
+
+    def close(self):
+        """バックグラウンドスレッドを止め、残っている変更を書き込む。"""
+        self._stopped.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # 待っている間に届いた変更も次の書き込みにまとめる
+            if self._stopped.wait(self.interval):
+                return
+            self._wake.clear()
+            self.flush()
+
+
+class TaskStorage:
+    """タスクの保存先のインターフェース。
+
+    load() と save() はタスク全体を読み書きし、append() は
+    add / toggle / rename / delete の操作を1件ずつ記録する。
+    """
+
+    def load(self):
+        """保存されたタスクのリストを返す。
+
+        Raises:
+            FileNotFoundError: 保存されたデータが無い場合。
+            json.JSONDecodeError: データが壊れている場合。
+        """
+        return list(self.load_iter())
+
+    def load_iter(self):
+        """保存されたタスクを先頭から1件ずつ返す。
+
+        全件を読み終える前に最初のタスクを返せるので、大きなリストでも
+        読み込みながら表示できる。例外は load() と同じ。
+        """
+        raise NotImplementedError
+
+    def save(self, task_list):
+        """タスク全体を保存する。"""
+        raise NotImplementedError
+
+    def append(self, op):
+        """1件の操作を保存する。"""
+        raise NotImplementedError
+
+    def append_many(self, ops):
+        """複数の操作をまとめて保存する。"""
+        for op in ops:
+            self.append(op)
+
+    def delete_many(self, task_ids):
+        """複数のタスクをまとめて削除する。"""
+        self.append_many([{"op": "delete", "id": task_id} for task_id in task_ids])
+
+    def count_active(self):
+        """未完了のタスク数を返す。"""
+        raise NotImplementedError
+
+    def changed(self):
+        """最後に読み込んでから、ほかの書き込み手が保存先を変えたかどうかを返す。
+
+        内容は読まずに判定するので、頻繁に呼んでもよい。
+        """
+        return False
+
+    def watch_paths(self):
+        """ほかの書き込み手による変更を監視するときに、監視するファイルのパスのリスト。"""
+        return []
+
+    def flush(self):
+        """保留中の書き込みを完了させる。"""
+
+    def close(self):
+        """実行中のバックグラウンド処理を待つ。"""
+
+
+class JsonStorage(TaskStorage):
+    """変更のたびに JSON ファイル全体を書き直す保存先。
+
+    save_interval を指定すると書き込みを DebouncedWriter に任せ、
+    その間隔の中で起きた変更を1回の書き込みにまとめる。
+
+    書き込みは json_path + ".lock" のロックを取って行う。最後に読み書きしてから
+    ほかの書き込み手がファイルを変えていた場合は、その内容にこちらの変更を
+    重ねて書き込み、changed() が True を返すようにする。
+    """
+
+    def __init__(self, json_path, save_interval=None, snapshot_format="json"):
+        """JsonStorage の初期化メソッド。
+
+        Args:
+            json_path (str): JSON ファイルのパス。
+            save_interval (float): 書き込みの最小間隔 (秒)。省略時は変更のたびに書き込む。
+            snapshot_format (str): 書き込む形式 ("json" または "binary")。
+                読み込むときは形式を自動で判定する。
+        """
+        self.json_path = json_path
+        self.lock_path = json_path + ".lock"
+        self._write_snapshot = snapshot_writer(snapshot_format)
+        self._tasks = {}
+        # 呼び出し側が知っているタスク。ほかの書き込み手の内容を取り込むまでは _tasks と同じ
+        self._view = self._tasks
+        # 最後に読み書きしたときのファイルの内容と etag
+        self._base = {}
+        self._etag = None
+        self._external = False
+        self._lock = threading.Lock()
+        self._writer = None
+        if save_interval:
+            self._writer = DebouncedWriter(self._write, save_interval)
+
+    def load_iter(self):
+        self.flush()
+        tasks = {}
+        with open(self.json_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            etag = ((stat.st_ino, stat.st_size, stat.st_mtime_ns),)
+            for task_data in iter_snapshot_file(f):
+                task = normalize_task(task_data)
+                tasks[task["id"]] = task
+                yield task
+        with self._lock:
+            self._tasks = self._view = tasks
+            self._base = dict(tasks)
+            self._etag = etag
+            self._external = False
+
+    def save(self, task_list):
+        tasks, _ = index_tasks(task_list)
+        with self._lock:
+            if self._view is self._tasks:
+                self._tasks = self._view = tasks
+            else:
+                # 取り込んだほかの書き込み手のタスクを削除とみなさないよう、
+                # 呼び出し側が知っている内容からの差分だけを重ねる
+                for op in diff_tasks(self._view, tasks):
+                    apply_op(self._tasks, op)
+                self._view = tasks
+        self._changed()
+
+    def append(self, op):
+        self.append_many([op])
+
+    def append_many(self, ops):
+        if not ops:
+            return
+        with self._lock:
+            for op in ops:
+                apply_op(self._tasks, op)
+                if self._view is not self._tasks:
+                    apply_op(self._view, op)
+        self._changed()
+
+    def count_active(self):
+        return sum(1 for task in self._tasks.values() if not task["completed"])
+
+    def changed(self):
+        return self._external or file_etag(self.json_path) != self._etag
+
+    def watch_paths(self):
+        return [self.json_path]
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def _changed(self):
+        if self._writer is None:
+            self._write()
+        else:
+            self._writer.mark_dirty()
+
+    def _write(self):
+        with file_lock(self.lock_path):
+            with self._lock:
+                # 読み書きする前の保存は、従来どおりファイル全体を置き換える
+                if self._etag is not None and file_etag(self.json_path) != self._etag:
+                    self._merge_external()
+                task_list = list(self._tasks.values())
+            self._write_snapshot(self.json_path, task_list)
+            with self._lock:
+                self._base = {task["id"]: task for task in task_list}
+                self._etag = file_etag(self.json_path)
+
+    def _merge_external(self):
+        """ほかの書き込み手の内容に、最後の読み書きからのこちらの変更を重ねる。"""
+        try:
+            theirs, _ = index_tasks(list(iter_snapshot(self.json_path)))
+        except FileNotFoundError:
+            theirs = {}
+        for op in diff_tasks(self._base, self._tasks):
+            apply_op(theirs, op)
+        self._tasks = theirs
+        self._external = True
+
+
+class JournalStorage(TaskStorage):
+    """スナップショットと追記専用の操作ログからなる保存先。
+
+    操作は json_path + ".log" に JSON Lines として1行ずつ追記されるので、
+    1回の変更で書き込む量はリストの長さに依存しない。ログが
+    compact_threshold 件に達すると、ログを ".log.1" に退避してから
+    バックグラウンドでスナップショット (json_path) を書き直す。
+    スナップショットは従来の todos.json と同じ形式か、snapshot_format="binary"
+    を指定した場合はバイナリ形式。
+
+    複数のプロセスから同じ json_path を使えるように、書き込みは json_path + ".lock"
+    のロックを取って行う。ほかのプロセスが書き込んでいた場合は、追記の前に
+    手元のタスクを読み直し、save() ではほかのプロセスの内容にこちらの変更を重ねる。
+    """
+
+    def __init__(self, json_path, compact_threshold=1000, snapshot_format="json"):
+        """JournalStorage の初期化メソッド。
+
+        Args:
+            json_path (str): スナップショットのパス。
+            compact_threshold (int): コンパクションを始めるログの件数。
+            snapshot_format (str): スナップショットを書き込む形式 ("json" または "binary")。
+                読み込むときは形式を自動で判定する。
+        """
+        self.json_path = json_path
+        self._write_snapshot = snapshot_writer(snapshot_format)
+        self.log_path = json_path + ".log"
+        self.rotated_log_path = json_path + ".log.1"
+        self.lock_path = json_path + ".lock"
+        self.compact_threshold = compact_threshold
+        self._tasks = {}
+        # 呼び出し側が知っているタスク。ほかのプロセスの内容を取り込むまでは _tasks と同じ
+        self._view = self._tasks
+        self._log_count = 0
+        self._etag = None
+        self._external = False
+        self._lock = threading.Lock()
+        self._compactor = None
+
+    def load_iter(self):
+        """スナップショットを読みながら、ログの操作を当てたタスクを返す。
+
+        ログは compact_threshold 件程度なので先に読んでおき、id ごとにまとめる。
+        ログで変更されただけのタスクはスナップショットの位置のまま返し、
+        ログで追加されたタスクと、削除後に追加し直されたタスクは最後に返す。
+        """
+        self.close()
+        # ログとスナップショットが同じ時点のものになるよう、ロックを取って開く
+        with file_lock(self.lock_path):
+            ops, found_log, found_rotated = self._read_log()
+            etag = self._etag_now()
+            try:
+                snapshot = open(self.json_path, "rb")
+            except FileNotFoundError:
+                if not found_log:
+                    raise
+                snapshot = None
+        ops_by_id = {}
+        for op in ops:
+            ops_by_id.setdefault(op["id"], []).append(op)
+
+        tasks = {}
+        patched_ids = set()
+        migrated = False
+        try:
+            for task_data in iter_snapshot_file(snapshot) if snapshot else ():
+                migrated = migrated or task_data.get("id") is None
+                task = normalize_task(task_data)
+                task_ops = ops_by_id.get(task["id"])
+                if task_ops is not None:
+                    if any(op["op"] == "delete" for op in task_ops):
+                        # 削除されたか末尾に追加し直されたので、ログの再生に任せる
+                        continue
+                    patched = {task["id"]: task}
+                    for op in task_ops:
+                        apply_op(patched, op)
+                    task = patched[task["id"]]
+                    patched_ids.add(task["id"])
+                tasks[task["id"]] = task
+                yield task
+        finally:
+            if snapshot is not None:
+                snapshot.close()
+
+        tail = {}
+        for op in ops:
+            if op["id"] not in patched_ids:
+                apply_op(tail, op)
+        for task in tail.values():
+            tasks[task["id"]] = task
+            yield task
+
+        with self._lock:
+            self._tasks = self._view = tasks
+            self._log_count = len(ops)
+            self._etag = etag
+            self._external = False
+        if migrated or found_rotated:
+            # 割り当てた id や中断されたコンパクションの結果をここで確定する
+            self.save(list(tasks.values()))
+
+    def save(self, task_list):
+        self.close()
+        tasks, _ = index_tasks(task_list)
+        merged = tasks
+        with file_lock(self.lock_path), self._lock:
+            # 読み書きする前の保存は、従来どおりファイル全体を置き換える
+            stale = self._etag is not None and self._etag_now() != self._etag
+            if stale or self._view is not self._tasks:
+                # ファイルの現在の内容に、呼び出し側が知っている内容からの差分だけを重ねる。
+                # 呼び出し側が知らないほかのプロセスのタスクは削除とみなさない
+                if stale:
+                    merged, _ = self._read_tasks()
+                else:
+                    merged = dict(self._tasks)
+                for op in diff_tasks(self._view, tasks):
+                    apply_op(merged, op)
+                self._external = True
+            self._tasks = merged
+            self._view = tasks
+            self._write_snapshot(self.json_path, list(merged.values()))
+            for path in (self.log_path, self.rotated_log_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._log_count = 0
+            self._etag = self._etag_now()
+
+    def append(self, op):
+        self.append_many([op])
+
+    def append_many(self, ops):
+        if not ops:
+            return
+        lines = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops)
+        with file_lock(self.lock_path), self._lock:
+            if self._etag_now() != self._etag:
+                # ほかのプロセスの書き込みを取り込んでから追記する
+                self._tasks, self._log_count = self._read_tasks()
+                self._external = self._etag is not None
+                if not self._external:
+                    self._view = self._tasks
+            for op in ops:
+                apply_op(self._tasks, op)
+                if self._view is not self._tasks:
+                    apply_op(self._view, op)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+            self._log_count += len(ops)
+            if (
+                self._log_count >= self.compact_threshold
+                and self._compactor is None
+                # ほかの書き込み手のコンパクションが終わるまでは、その退避したログを残す
+                and not os.path.exists(self.rotated_log_path)
+            ):
+                os.replace(self.log_path, self.rotated_log_path)
+                self._log_count = 0
+                self._compactor = threading.Thread(
+                    target=self._compact, args=(list(self._tasks.values()),)
+                )
+                self._compactor.start()
+            self._etag = self._etag_now()
+
+    def count_active(self):
+        return sum(1 for task in self._tasks.values() if not task["completed"])
+
+    def changed(self):
+        return self._external or self._etag_now() != self._etag
+
+    def watch_paths(self):
+        return [self.json_path, self.log_path, self.rotated_log_path]
+
+    def close(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def _compact(self, task_list):
+        try:
+            with file_lock(self.lock_path):
+                with self._lock:
+                    stale = self._etag_now() != self._etag
+                if stale:
+                    # 退避してからほかのプロセスが書き込んだので、ファイルから作り直す
+                    tasks, _ = self._read_tasks()
+                    task_list = list(tasks.values())
+                self._write_snapshot(self.json_path, task_list)
+                if os.path.exists(self.rotated_log_path):
+                    os.remove(self.rotated_log_path)
+                with self._lock:
+                    if stale:
+                        self._external = True
+                    else:
+                        self._etag = self._etag_now()
+        finally:
+            with self._lock:
+                self._compactor = None
+
+    def _etag_now(self):
+        return file_etag(self.json_path, self.log_path, self.rotated_log_path)
+
+    def _read_log(self):
+        """退避したログと現在のログの操作を読み、(操作, ログがあったか, 退避したログがあったか) を返す。"""
+        ops = []
+        found_rotated = False
+        found_log = False
+        for path in (self.rotated_log_path, self.log_path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            ops.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            # 書き込み途中で終了した末尾の行
+                            continue
+            except FileNotFoundError:
+                continue
+            found_log = True
+            found_rotated = found_rotated or path == self.rotated_log_path
+        return ops, found_log, found_rotated
+
+    def _read_tasks(self):
+        """ロックを取った状態で、ファイルの現在のタスクと、ログの件数を読む。"""
+        try:
+            tasks, _ = index_tasks(list(iter_snapshot(self.json_path)))
+        except FileNotFoundError:
+            tasks = {}
+        ops, _, _ = self._read_log()
+        for op in ops:
+            apply_op(tasks, op)
+        return tasks, len(ops)
+
+
+class MappedStorage(JournalStorage):
+    """読み出しが中心のリスト向けに、スナップショットを mmap して読む保存先。
+
+    load() はタスクを辞書にせず、ファイルの行を指す MappedRow を返す。
+    TaskRecord.from_dict() はそこから名前を表示するときまでデコードしない
+    レコードを作り、未完了の件数はファイルのビットマップの件数から求める。
+    変更は JournalStorage と同じく操作ログに追記し、コンパクションで書き直す。
+    読み込むときに操作ログが残っているか、スナップショットがほかの形式の場合は、
+    先に取り込んでこの形式で書き直してから mmap する。
+    """
+
+    def __init__(self, json_path, compact_threshold=1000):
+        """MappedStorage の初期化メソッド。
+
+        Args:
+            json_path (str): スナップショットのパス。
+            compact_threshold (int): コンパクションを始めるログの件数。
+        """
+        super().__init__(json_path, compact_threshold, snapshot_format="mapped")
+        # load_iter() でマップしたファイル
+        self._mapped = None
+
+    def load_iter(self):
+        if self._needs_rewrite():
+            self.save(list(super().load_iter()))
+        with file_lock(self.lock_path):
+            self._detach()
+            mapped = mapped_format.MappedTaskFile(self.json_path)
+            etag = self._etag_now()
+        with self._lock:
+            self._mapped = mapped
+            self._tasks = self._view = mapped_format.MappedTaskDict(mapped)
+            self._log_count = 0
+            self._etag = etag
+            self._external = False
+        for row in range(mapped.count):
+            yield mapped_format.MappedRow(mapped, row)
+
+    def count_active(self):
+        if isinstance(self._tasks, mapped_format.MappedTaskDict):
+            return self._tasks.active_count()
+        return super().count_active()
+
+    def close(self):
+        super().close()
+        self._detach()
+
+    def _compact(self, task_list):
+        self._detach()
+        super()._compact(task_list)
+
+    def _detach(self):
+        """スナップショットを書き直す前に、マップを閉じる。
+
+        読み込んだ MappedRow や MappedTaskRecord はファイルを参照し続けるので、
+        閉じる前に内容をメモリに読み込んでおく。
+        """
+        with self._lock:
+            mapped, self._mapped = self._mapped, None
+        if mapped is not None:
+            mapped.detach()
+
+    def _needs_rewrite(self):
+        self.close()
+        if os.path.exists(self.log_path) or os.path.exists(self.rotated_log_path):
+            return True
+        try:
+            with open(self.json_path, "rb") as f:
+                return not mapped_format.is_mapped(f.read(len(mapped_format.MAGIC)))
+        except FileNotFoundError:
+            raise FileNotFoundError(self.json_path) from None
+
+
+class SqliteStorage(TaskStorage):
+    """SQLite に保存する保存先。
+
+    WAL モードで開き、completed にインデックスを張るので、未完了数の集計や
+    完了済みの削除はリストの走査ではなく1回のクエリで済む。SQL は定数にして
+    sqlite3 のステートメントキャッシュで使い回す。複数のプロセスからの書き込みは
+    SQLite のトランザクションで排他され、ほかの接続の変更は PRAGMA data_version で検出する。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            task_name TEXT NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            created_at REAL,
+            updated_at REAL
+        );
+        CREATE INDEX IF NOT EXISTS tasks_completed ON tasks (completed);
+    """
+    SELECT_ALL = (
+        "SELECT id, task_name, completed, created_at, updated_at FROM tasks ORDER BY seq"
+    )
+    INSERT = (
+        "INSERT INTO tasks (id, task_name, completed, created_at, updated_at) "
+        "VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET "
+        "task_name = excluded.task_name, completed = excluded.completed, "
+        "created_at = excluded.created_at, updated_at = excluded.updated_at"
+    )
+    UPDATE_COMPLETED = (
+        "UPDATE tasks SET completed = ?, updated_at = COALESCE(?, updated_at) "
+        "WHERE id = ?"
+    )
+    UPDATE_NAME = (
+        "UPDATE tasks SET task_name = ?, updated_at = COALESCE(?, updated_at) "
+        "WHERE id = ?"
+    )
+    DELETE = "DELETE FROM tasks WHERE id = ?"
+    DELETE_ALL = "DELETE FROM tasks"
+    COUNT_ACTIVE = "SELECT COUNT(*) FROM tasks WHERE completed = 0"
+    DATA_VERSION = "PRAGMA data_version"
+
+    def __init__(self, db_path):
+        """SqliteStorage の初期化メソッド。
+
+        Args:
+            db_path (str): データベースファイルのパス。
+        """
+        self.db_path = db_path
+        self._conn = None
+        self._data_version = None
+
+    def load_iter(self):
+        if self._conn is None and not os.path.exists(self.db_path):
+            raise FileNotFoundError(self.db_path)
+        conn = self._connect()
+        (self._data_version,) = conn.execute(self.DATA_VERSION).fetchone()
+        for task_id, task_name, completed, created_at, updated_at in conn.execute(
+            self.SELECT_ALL
+        ):
+            yield _copy_timestamps(
+                {"id": task_id, "task_name": task_name, "completed": bool(completed)},
+                {"created_at": created_at, "updated_at": updated_at},
+            )
+
+    def save(self, task_list):
+        tasks, _ = index_tasks(task_list)
+        conn = self._connect()
+        with conn:
+            conn.execute(self.DELETE_ALL)
+            conn.executemany(
+                self.INSERT,
+                [
+                    (
+                        task["id"],
+                        task["task_name"],
+                        task["completed"],
+                        task.get("created_at"),
+                        task.get("updated_at"),
+                    )
+                    for task in tasks.values()
+                ],
+            )
+
+    def append(self, op):
+        self.append_many([op])
+
+    def append_many(self, ops):
+        if not ops:
+            return
+        conn = self._connect()
+        with conn:
+            for op in ops:
+                self._execute_op(conn, op)
+
+    def delete_many(self, task_ids):
+        conn = self._connect()
+        with conn:
+            conn.executemany(self.DELETE, [(task_id,) for task_id in task_ids])
+
+    def count_active(self):
+        return self._connect().execute(self.COUNT_ACTIVE).fetchone()[0]
+
+    def changed(self):
+        # data_version はほかの接続がコミットしたときだけ変わる
+        if self._conn is None or self._data_version is None:
+            return False
+        (data_version,) = self._conn.execute(self.DATA_VERSION).fetchone()
+        return data_version != self._data_version
+
+    def watch_paths(self):
+        # WAL モードではコミットは -wal ファイルに書かれる
+        return [self.db_path, self.db_path + "-wal"]
+
+    def _execute_op(self, conn, op):
+        kind = op["op"]
+        if kind == "add":
+            conn.execute(
+                self.INSERT,
+                (
+                    op["id"],
+                    op["task_name"],
+                    op.get("completed", False),
+                    op.get("created_at"),
+                    op.get("updated_at"),
+                ),
+            )
+        elif kind == "toggle":
+            conn.execute(
+                self.UPDATE_COMPLETED, (op["completed"], op.get("updated_at"), op["id"])
+            )
+        elif kind == "rename":
+            conn.execute(
+                self.UPDATE_NAME, (op["task_name"], op.get("updated_at"), op["id"])
+            )
+        elif kind == "delete":
+            conn.execute(self.DELETE, (op["id"],))
+        else:
+            raise ValueError(f"Unknown operation: {kind}")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            # SQLite を使わない場合に読み込まないよう、ここで import する
+            import sqlite3
+
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+            for field in TIMESTAMP_FIELDS:
+                if field not in columns:
+                    # 作成日時・更新日時が無かった頃のデータベース
+                    conn.execute(f"ALTER TABLE tasks ADD COLUMN {field} REAL")
+            self._conn = conn
+        return self._conn
+
+
+class SharedStorage(TaskStorage):
+    """1つのプロセスの複数のセッションで、1つの保存先を共有するためのラッパー。
+
+    最初の load() で保存先から読み込んだタスクをメモリに持ち続け、以降の
+    セッションは保存先を読まずにメモリから読み込む。書き込みはロックで
+    1つずつ保存先に渡すので、セッションごとのスレッドから呼んでよい。
+
+    ほかのプロセスが保存先に書き込んだ変更は sync_changes() で取り込み、
+    メモリとの差分の操作を on_external_ops に渡す。
+    """
+
+    def __init__(self, storage):
+        """SharedStorage の初期化メソッド。
+
+        Args:
+            storage (TaskStorage): 共有する保存先。
+        """
+        self.storage = storage
+        self._tasks = None
+        self._missing = False
+        self._lock = threading.Lock()
+        # ほかのプロセスの変更を取り込んだときに、その操作のリストを渡して呼ぶ関数
+        self.on_external_ops = None
+
+    def load_iter(self):
+        # ほかのプロセスが書き込んでいたら読み直す
+        self.sync_changes()
+        with self._lock:
+            self._ensure_loaded()
+            if self._missing:
+                raise FileNotFoundError("No saved tasks")
+            task_list = list(self._tasks.values())
+        return iter(task_list)
+
+    def save(self, task_list):
+        with self._lock:
+            self._tasks, _ = index_tasks(task_list)
+            self._missing = False
+            self.storage.save(list(self._tasks.values()))
+
+    def append(self, op):
+        self.append_many([op])
+
+    def append_many(self, ops):
+        if not ops:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            for op in ops:
+                apply_op(self._tasks, op)
+            self._missing = False
+            self.storage.append_many(ops)
+
+    def delete_many(self, task_ids):
+        if not task_ids:
+            return
+        with self._lock:
+            self._ensure_loaded()
+            for task_id in task_ids:
+                self._tasks.pop(task_id, None)
+            self._missing = False
+            self.storage.delete_many(task_ids)
+
+    def count_active(self):
+        with self._lock:
+            self._ensure_loaded()
+            return sum(1 for task in self._tasks.values() if not task["completed"])
+
+    def changed(self):
+        return self.storage.changed()
+
+    def sync_changes(self):
+        """ほかのプロセスが保存先に書き込んだ変更を取り込み、その操作のリストを返す。
+
+        読み直したタスクとメモリのタスクの差分を操作にして、on_external_ops にも渡す。
+        まだ読み込んでいないか保存先が変わっていない場合や、書き込みの途中などで
+        読めない場合は空のリストを返す。読めなかった変更は次の呼び出しで読み直す。
+        """
+        with self._lock:
+            if self._tasks is None or not self.storage.changed():
+                return []
+            try:
+                new_tasks, _ = index_tasks(self.storage.load())
+                missing = False
+            except FileNotFoundError:
+                new_tasks = {}
+                missing = True
+            except (json.JSONDecodeError, binary_format.BinaryFormatError):
+                return []
+            ops = diff_tasks(self._tasks, new_tasks)
+            self._tasks = new_tasks
+            self._missing = missing
+        on_external_ops = self.on_external_ops
+        if ops and on_external_ops is not None:
+            on_external_ops(ops)
+        return ops
+
+    def watch_paths(self):
+        return self.storage.watch_paths()
+
+    def flush(self):
+        self.storage.flush()
+
+    def close(self):
+        self.storage.close()
+
+    def _ensure_loaded(self):
+        if self._tasks is not None:
+            return
+        try:
+            self._tasks, _ = index_tasks(self.storage.load())
+        except FileNotFoundError:
+            self._tasks = {}
+            self._missing = True
+
+
+STORAGE_SCHEMES = {
+    "json": JsonStorage,
+    "journal": JournalStorage,
+    "mapped": MappedStorage,
+    "sqlite": SqliteStorage,
+}
+
+
+def open_storage(storage_url):
+    """URL から保存先を作成する。
+
+    "sqlite:///storage/todos.db" のようにスキームの後のスラッシュを1つ除いた
+    部分をパスとして扱う ("sqlite:////tmp/todos.db" は絶対パス)。
+    "json:///storage/todos.json?save_interval=0.5" のようなクエリは
+    キーワード引数として保存先に渡す (数値に変換できる値は数値にする)。
+
+    Args:
+        storage_url (str): "json://", "journal://", "mapped://", "sqlite://" で始まる URL。
+
+    Returns:
+        TaskStorage: 作成した保存先。
+
+    Raises:
+        ValueError: 未対応のスキームの場合。
+    """
+    scheme, sep, path = storage_url.partition("://")
+    if not sep or scheme not in STORAGE_SCHEMES:
+        raise ValueError(f"Unsupported storage URL: {storage_url}")
+    path, _, query = path.partition("?")
+    if path.startswith("/"):
+        path = path[1:]
+    options = {}
+    for key, value in parse_qsl(query):
+        for convert in (int, float, str):
+            try:
+                options[key] = convert(value)
+                break
+            except ValueError:
+                continue
+    return STORAGE_SCHEMES[scheme](path, **options)
@@ -0,0 +1,121 @@
+from contextlib import nullcontext
+
+import flet as ft
+
+
+class VirtualTaskList(ft.ListView):
+    """表示範囲のタスクだけを Task にしてクライアントに送る ListView。
+
+    タスクは TaskStore のレコードの順に並べ、表示中の行と前後 overscan 行の
+    レコードにだけ、更新の直前 (before_update) に Task を割り当てる。それより
+    前後の行の高さは padding で確保する。行の高さは item_extent で固定なので、
+    スクロール位置から表示範囲が決まる。範囲から外れた Task は release() で
+    子のコントロールを捨て、次に範囲に入ったレコードの表示に使い回す。
+    controls は表示範囲の Task だけになる。
+
+    store を読むのは before_update() の中なので、ほかのスレッドも store を変更する
+    場合は、lock を取ってから更新する。スクロールで自分を更新するときは lock を取る。
+    """
+
+    def __init__(
+        self,
+        store,
+        create_task,
+        is_visible=None,
+        item_extent=56,
+        overscan=10,
+        height=600,
+        lock=None,
+    ):
+        """VirtualTaskList の初期化メソッド。
+
+        Args:
+            store (TaskStore): 表示するレコード。
+            create_task (callable): レコードを受け取って Task を作る関数。
+            is_visible (callable): レコードを表示するかどうかを返す関数。省略時はすべて表示する。
+            item_extent (int): 1行の高さ (px)。
+            overscan (int): 表示範囲の前後に余分に作る行数。
+            height (int): リストの高さ (px)。最初のスクロールまでの表示範囲にも使う。
+            lock (threading.RLock): store を変更するほかのスレッドと共有するロック。
+        """
+        super().__init__(
+            item_extent=item_extent,
+            height=height,
+            on_scroll=self.scrolled,
+            on_scroll_interval=50,
+        )
+        self.store = store
+        self.create_task = create_task
+        self.is_visible = is_visible
+        self.overscan = overscan
+        self.lock = lock if lock is not None else nullcontext()
+        self.scroll_offset = 0.0
+        self.viewport_height = height
+        # レコードの id -> 割り当て中の Task。範囲の Task と、範囲から外れた編集中の Task
+        self.built_tasks = {}
+        # 使い回すために取っておく、子のコントロールを捨てた Task
+        self._spare_tasks = []
+        self._shown_count = 0
+        self._window = (0, 0)
+
+    def visible_range(self, count):
+        """count 行のうち、クライアントに送る行の範囲 (first, last) を返す。"""
+        first = int(self.scroll_offset // self.item_extent) - self.overscan
+        last = (
+            int((self.scroll_offset + self.viewport_height) // self.item_extent)
+            + 1
+            + self.overscan
+        )
+        last = min(count, last)
+        first = min(max(0, first), last)
+        return first, last
+
+    def scrolled(self, e):
+        with self.lock:
+            self.scroll_offset = e.pixels
+            if e.viewport_dimension:
+                self.viewport_height = e.viewport_dimension
+            if self.visible_range(self._shown_count) != self._window:
+                self.update()
+
+    def before_update(self):
+        is_visible = self.is_visible
+        if is_visible is None:
+            shown = list(self.store)
+        else:
+            shown = [record for record in self.store if is_visible(record)]
+        first, last = self.visible_range(len(shown))
+        records = shown[first:last]
+
+        built = self.built_tasks
+        window_ids = {record.id for record in records}
+        for task_id, task in list(built.items()):
+            if task_id not in window_ids and not task.editing:
+                del built[task_id]
+                task.release()
+                self._spare_tasks.append(task)
+        window = []
+        for record in records:
+            task = built.get(record.id)
+            if task is None:
+                if self._spare_tasks:
+                    task = self._spare_tasks.pop()
+                    task.record = record
+                    # 前の表示のまま送られないように、新しいレコードで作り直す
+                    task.build()
+                else:
+                    task = self.create_task(record)
+                built[record.id] = task
+            task.visible = True
+            window.append(task)
+        # 使い回しきれなかった分は、範囲の行数を超えて持たない
+        del self._spare_tasks[len(window):]
+
+        self._shown_count = len(shown)
+        self._window = (first, last)
+        self.controls = window
+        self.padding = ft.padding.only(
+            top=first * self.item_extent,
+            bottom=(len(shown) - last) * self.item_extent,
+        )
+        super().before_update()
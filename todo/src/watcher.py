@@ -0,0 +1,189 @@
+"""保存先のファイルの変更を監視する。
+
+Linux では inotify でファイルのあるディレクトリを監視する。保存先は一時ファイルを
+os.replace() で置き換えるので、ファイルそのものではなくディレクトリを監視し、
+イベントのファイル名で絞り込む。inotify が使えない環境では一定間隔で
+ファイルの情報 (inode, サイズ, 更新時刻) を比べる。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+from src.storage import file_etag
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+EVENT = struct.Struct("iIII")
+
+
+def _load_libc():
+    """inotify の関数を持つ libc を返す。使えない環境では None を返す。"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """paths のいずれかのファイルが変わったら callback を呼ぶ。
+
+    続けて届いたイベントは debounce 秒待ってまとめ、callback は1回だけ呼ぶ。
+    callback は監視用のスレッドから呼ばれる。自分で書き込んだ場合も呼ばれるので、
+    呼ばれた側で TaskStorage.changed() などを使って区別する。
+    """
+
+    def __init__(self, paths, callback, interval=1.0, debounce=0.05, use_inotify=True):
+        """FileWatcher の初期化メソッド。
+
+        Args:
+            paths (list[str]): 監視するファイルのパス。まだ無いファイルでもよい。
+            callback (callable): 変更があったときに引数なしで呼ぶ関数。
+            interval (float): inotify を使わない場合に、ファイルを調べる間隔 (秒)。
+            debounce (float): イベントをまとめるために待つ時間 (秒)。
+            use_inotify (bool): False なら常に一定間隔で調べる。
+        """
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.callback = callback
+        self.interval = interval
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        # 実際に使っている方式 ("inotify" または "polling")。start() で決まる
+        self.backend = None
+        self._stopped = threading.Event()
+        self._thread = None
+        self._fd = None
+        self._watched = {}
+        self._wake_r = None
+        self._wake_w = None
+
+    def start(self):
+        """監視用のスレッドを開始する。"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        if self.use_inotify and self._open_inotify():
+            self.backend = "inotify"
+            target = self._run_inotify
+        else:
+            self.backend = "polling"
+            target = self._run_polling
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """監視をやめ、スレッドの終了を待つ。"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopped.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"\0")
+        if thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+        self._close_inotify()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def _notify(self):
+        try:
+            self.callback()
+        except Exception as e:
+            # 監視は続ける
+            print(f"File watcher callback failed: {e!r}")
+
+    def _run_polling(self):
+        etag = file_etag(*self.paths)
+        while not self._stopped.wait(self.interval):
+            current = file_etag(*self.paths)
+            if current != etag:
+                etag = current
+                self._notify()
+
+    def _open_inotify(self):
+        libc = _load_libc()
+        if libc is None:
+            return False
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return False
+        watches = {}
+        for path in self.paths:
+            directory, name = os.path.split(path)
+            if directory not in watches:
+                wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+                if wd < 0:
+                    # ディレクトリが無いなどで監視できない
+                    os.close(fd)
+                    return False
+                watches[directory] = (wd, set())
+            watches[directory][1].add(os.fsencode(name))
+        # watch descriptor -> 監視するファイル名の集合
+        self._watched = dict(watches.values())
+        self._fd = fd
+        self._wake_r, self._wake_w = os.pipe()
+        return True
+
+    def _close_inotify(self):
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._fd = self._wake_r = self._wake_w = None
+
+    def _run_inotify(self):
+        while not self._stopped.is_set():
+            select.select([self._fd, self._wake_r], [], [])
+            if self._stopped.is_set():
+                return
+            if not self._read_events():
+                continue
+            # 置き換えや追記が続くので、静かになるまで待ってから1回だけ知らせる
+            while True:
+                readable, _, _ = select.select(
+                    [self._fd, self._wake_r], [], [], self.debounce
+                )
+                if self._stopped.is_set():
+                    return
+                if not readable:
+                    break
+                self._read_events()
+            self._notify()
+
+    def _read_events(self):
+        """届いているイベントを読み、監視しているファイルのものがあれば True を返す。"""
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return False
+        matched = False
+        pos = 0
+        while pos + EVENT.size <= len(data):
+            wd, _, _, length = EVENT.unpack_from(data, pos)
+            pos += EVENT.size
+            name = data[pos:pos + length].rstrip(b"\0")
+            pos += length
+            names = self._watched.get(wd)
+            if names is not None and name in names:
+                matched = True
+        return matched
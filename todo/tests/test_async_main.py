@@ -0,0 +1,125 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.async_main import AsyncTask, AsyncTodoApp
+from src.storage import JournalStorage
+from test_main import MockPage
+
+
+class SlowStorage(JournalStorage):
+    """書き込みが終わるまで止まる保存先。"""
+
+    def __init__(self, json_path):
+        super().__init__(json_path)
+        self.release = threading.Event()
+
+    def append_many(self, ops):
+        self.release.wait(5)
+        super().append_many(ops)
+
+
+class TestAsyncTodoApp(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "todos.json")
+        self.app = AsyncTodoApp(storage=JournalStorage(self.path))
+        self.page = MockPage()
+        self.page.update = Mock()
+        self.page.add(self.app)
+        self.app.new_task.page = self.page
+
+    async def asyncTearDown(self):
+        await self.app.detach_session()
+        await self.app.async_storage.close()
+        self.tmpdir.cleanup()
+
+    def saved(self):
+        return [
+            (task["task_name"], task["completed"])
+            for task in JournalStorage(self.path).load()
+        ]
+
+    async def add(self, name):
+        self.app.new_task.value = name
+        await self.app.add_clicked(None)
+
+    async def test_handlers_save_through_async_storage(self):
+        await self.add("Task 1")
+        await self.add("Task 2")
+        task = self.app.tasks.controls[0]
+        self.assertIsInstance(task, AsyncTask)
+        task.display_task.value = True
+        await task.status_changed(None)
+        self.assertEqual(self.saved(), [("Task 1", True), ("Task 2", False)])
+
+        task.page = self.page
+        task.edit_clicked(None)
+        task.edit_name.value = "Renamed"
+        await task.save_clicked(None)
+        self.assertEqual(self.saved(), [("Renamed", True), ("Task 2", False)])
+
+        await self.app.clear_clicked(None)
+        await self.app.tasks.controls[0].delete_clicked(None)
+        self.assertEqual(self.saved(), [])
+        self.assertEqual(self.app.stats, (0, 0, 0))
+
+    async def test_load_tasks(self):
+        JournalStorage(self.path).save(
+            [{"id": "a", "task_name": "A", "completed": False}]
+        )
+        await self.app.load_tasks()
+        self.assertEqual([task.task_name for task in self.app.tasks.controls], ["A"])
+        self.assertEqual(self.app.items_left.value, "1 active item(s) left")
+
+    async def test_load_tasks_sends_all_tasks(self):
+        for count in (3, 120):
+            with self.subTest(count=count):
+                JournalStorage(self.path).save(
+                    [{"task_name": f"Task {i}", "completed": False} for i in range(count)]
+                )
+                self.app._clear_loaded()
+                self.page.update.reset_mock()
+                await self.app.load_tasks()
+                # 最後の分のタスクも、途中の分の後に送られる
+                sent = self.page.update.call_args.args
+                self.assertIn(self.app, sent)
+                self.assertEqual(len(self.app.tasks.controls), count)
+                self.assertEqual(self.app.items_left.value, f"{count} active item(s) left")
+
+    async def test_slow_write_does_not_block_the_loop(self):
+        await self.app.async_storage.save([])
+        storage = SlowStorage(self.path)
+        self.app.storage = self.app.async_storage.storage = storage
+        self.app.new_task.value = "Slow"
+        adding = asyncio.ensure_future(self.app.add_clicked(None))
+        # 書き込みを待っている間も、イベントループはほかの処理を進められる
+        await asyncio.sleep(0.05)
+        self.assertFalse(adding.done())
+        self.assertEqual(len(self.app.tasks.controls), 1)
+        storage.release.set()
+        await adding
+        self.assertEqual(self.saved(), [("Slow", False)])
+
+    async def test_write_errors_are_raised_by_the_handler(self):
+        self.app.async_storage.storage = Mock(append_many=Mock(side_effect=OSError("disk")))
+        with self.assertRaises(OSError):
+            await self.add("Task")
+
+    def test_writes_outside_the_loop_are_synchronous(self):
+        self.app.new_task.value = "Task"
+        asyncio.run(self.app.add_clicked(None))
+        record = self.app.tasks.controls[0].record
+        self.app.rename_task(self.app.tasks.controls[0])
+        self.assertEqual(self.app._writes, [])
+        self.assertEqual(self.saved(), [(record.name, False)])
+
+
+if __name__ == "__main__":
+    unittest.main()
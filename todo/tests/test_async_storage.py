@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.async_storage import AsyncStorage
+from src.storage import JournalStorage
+
+
+class TestAsyncStorage(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = AsyncStorage(
+            JournalStorage(os.path.join(self.tmpdir.name, "todos.json"))
+        )
+
+    async def asyncTearDown(self):
+        await self.storage.close()
+        self.tmpdir.cleanup()
+
+    async def test_round_trip(self):
+        task = {"id": "a", "task_name": "A", "completed": False}
+        await self.storage.save([task])
+        await self.storage.append({"op": "toggle", "id": "a", "completed": True})
+        self.assertEqual(await self.storage.load(), [{**task, "completed": True}])
+        self.assertEqual(await self.storage.count_active(), 0)
+        self.assertFalse(await self.storage.changed())
+
+    async def test_calls_run_in_order_without_awaiting(self):
+        await self.storage.save([])
+        futures = [
+            self.storage.append({"op": "add", "id": str(i), "task_name": str(i), "completed": False})
+            for i in range(20)
+        ]
+        futures.append(self.storage.delete_many(["0", "1"]))
+        tasks = await self.storage.load()
+        self.assertEqual([task["id"] for task in tasks], [str(i) for i in range(2, 20)])
+        for future in futures:
+            self.assertTrue(future.done())
+
+    async def test_runs_off_the_event_loop_thread(self):
+        thread = await self.storage.run(threading.current_thread)
+        self.assertIsNot(thread, threading.current_thread())
+
+    async def test_errors_are_raised_when_awaited(self):
+        with self.assertRaises(FileNotFoundError):
+            await self.storage.load()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.binary_format import (
+    HEADER,
+    BinaryFormatError,
+    encode_tasks,
+    is_binary,
+    iter_tasks,
+)
+from src.storage import new_task_id
+
+
+class TestBinaryFormat(unittest.TestCase):
+    def setUp(self):
+        self.task_list = [
+            {"id": new_task_id(), "task_name": "タスク 1", "completed": False},
+            {
+                "id": "legacy",
+                "task_name": "Task 2",
+                "completed": True,
+                "created_at": 1700000000.5,
+                "updated_at": 1700000100.25,
+            },
+            {"id": "c", "task_name": "", "completed": False, "created_at": 1.0},
+        ]
+
+    def test_round_trip(self):
+        data = encode_tasks(self.task_list)
+        self.assertTrue(is_binary(data))
+        self.assertEqual(list(iter_tasks(data)), self.task_list)
+
+    def test_hex_ids_are_packed(self):
+        task = {"id": new_task_id(), "task_name": "", "completed": False}
+        self.assertEqual(len(encode_tasks([task])), HEADER.size + 6 + 16)
+
+    def test_empty(self):
+        self.assertEqual(list(iter_tasks(encode_tasks([]))), [])
+
+    def test_truncated(self):
+        data = encode_tasks(self.task_list)
+        for length in (2, HEADER.size + 3, len(data) - 1):
+            with self.assertRaises(BinaryFormatError):
+                list(iter_tasks(data[:length]))
+
+    def test_trailing_data(self):
+        with self.assertRaises(BinaryFormatError):
+            list(iter_tasks(encode_tasks(self.task_list) + b"\0"))
+
+    def test_unsupported_version(self):
+        data = bytearray(encode_tasks(self.task_list))
+        data[4] = 99
+        with self.assertRaises(BinaryFormatError):
+            list(iter_tasks(bytes(data)))
+
+    def test_id_too_long(self):
+        with self.assertRaises(ValueError):
+            encode_tasks([{"id": "x" * 256, "task_name": "", "completed": False}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.instrumentation import (
+    Histogram,
+    InstrumentedStorage,
+    Metrics,
+    format_metrics,
+    instrument_handlers,
+    instrument_page,
+)
+from src.main import TodoApp
+from src.storage import JournalStorage
+from test_main import MockPage
+
+
+class TestHistogram(unittest.TestCase):
+    def test_buckets(self):
+        histogram = Histogram()
+        for value in (0.5, 1, 3, 3, 100):
+            histogram.add(value)
+        data = histogram.to_dict()
+        self.assertEqual(data["count"], 5)
+        self.assertEqual(data["min"], 0.5)
+        self.assertEqual(data["max"], 100)
+        self.assertAlmostEqual(data["mean"], 21.5)
+        self.assertEqual(data["buckets"], {"<1": 1, "<2": 1, "<4": 2, "<128": 1})
+        self.assertEqual(data["p50"], 4)
+        self.assertEqual(data["p99"], 100)
+
+    def test_empty(self):
+        self.assertEqual(Histogram().to_dict(), {"count": 0})
+        self.assertIsNone(Histogram().percentile(0.5))
+
+
+class TestMetrics(unittest.TestCase):
+    def test_time_and_write(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "metrics.json")
+            metrics = Metrics(path, write_interval=60)
+            with metrics.time("work"):
+                pass
+            metrics.record("work", 10)
+            metrics.flush()
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            metrics.close()
+        self.assertEqual(data["work"]["count"], 2)
+        self.assertIn("work", format_metrics(data))
+
+    def test_handlers(self):
+        metrics = Metrics()
+
+        class Handlers:
+            def sync(self, value):
+                return value * 2
+
+            async def run_async(self):
+                await asyncio.sleep(0)
+                return "done"
+
+        handlers = Handlers()
+        instrument_handlers(handlers, ("sync", "run_async", "missing"), metrics)
+        self.assertEqual(handlers.sync(2), 4)
+        self.assertEqual(asyncio.run(handlers.run_async()), "done")
+        self.assertEqual(metrics.histogram("handler.Handlers.sync").count, 1)
+        self.assertEqual(metrics.histogram("handler.Handlers.run_async").count, 1)
+
+    def test_page(self):
+        metrics = Metrics()
+        page = MockPage()
+        instrument_page(page, metrics)
+        instrument_page(page, metrics)
+        page.update()
+        page.update(Mock(), Mock(), Mock())
+        self.assertEqual(metrics.histogram("update").count, 2)
+        self.assertEqual(metrics.histogram("update.controls").total, 4)
+
+
+class TestInstrumentedApp(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.metrics = Metrics()
+        self.app = TodoApp(
+            storage=JournalStorage(os.path.join(self.tmpdir.name, "todos.json")),
+            metrics=self.metrics,
+        )
+        self.page = MockPage()
+        instrument_page(self.page, self.metrics)
+        self.page.add(self.app)
+        self.app.new_task.page = self.page
+
+    def tearDown(self):
+        self.app.storage.close()
+        self.tmpdir.cleanup()
+
+    def count(self, name):
+        histogram = self.metrics.histogram(name)
+        return 0 if histogram is None else histogram.count
+
+    def test_handlers_storage_and_updates_are_recorded(self):
+        self.assertIsInstance(self.app.storage, InstrumentedStorage)
+        # コントロールには計測するハンドラが渡されている
+        self.assertIs(self.app.new_task.on_submit, self.app.add_clicked)
+        self.app.new_task.value = "Task"
+        self.app.new_task.on_submit(None)
+        task = self.app.tasks.controls[0]
+        task.display_task.value = True
+        task.display_task.on_change(None)
+        self.app.clear_clicked(None)
+
+        self.assertEqual(self.count("handler.TodoApp.add_clicked"), 1)
+        self.assertEqual(self.count("handler.Task.status_changed"), 1)
+        self.assertEqual(self.count("handler.TodoApp.status_changed"), 1)
+        self.assertEqual(self.count("handler.TodoApp.clear_clicked"), 1)
+        self.assertEqual(self.count("storage.append_many"), 2)
+        self.assertEqual(self.count("storage.delete_many"), 1)
+        self.assertGreater(self.count("update"), 0)
+
+        app = TodoApp(
+            storage=JournalStorage(self.app.storage.storage.json_path), metrics=self.metrics
+        )
+        app.load_tasks()
+        self.assertEqual(self.count("storage.load_iter"), 1)
+        self.assertEqual(self.count("handler.TodoApp.load_tasks"), 1)
+
+    def test_disabled_by_default(self):
+        app = TodoApp(storage=JournalStorage(os.path.join(self.tmpdir.name, "other.json")))
+        self.assertNotIsInstance(app.storage, InstrumentedStorage)
+        self.assertNotIn("add_clicked", vars(app))
+
+
+if __name__ == "__main__":
+    unittest.main()
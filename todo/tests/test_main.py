@@ -1,9 +1,12 @@
 import unittest
 import flet as ft
-from unittest.mock import Mock
+from unittest.mock import Mock, call, patch
 import sys
 import os
 import json
+import tempfile
+import threading
+import time
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -11,18 +14,55 @@ from src.assets.translations import translations
 import src.main
 
 from src.main import Task, TodoApp
+from src.storage import JournalStorage, SharedStorage
 
 
-class MockPage:
+class MockPubSubHub:
+    """ハンドラーをその場で呼ぶ、Flet の PubSubHub の代わり。"""
+
     def __init__(self):
+        self.handlers = {}
+
+    def send_others_on_topic(self, session_id, topic, message):
+        for (other_id, other_topic), handler in list(self.handlers.items()):
+            if other_topic == topic and other_id != session_id:
+                handler(topic, message)
+
+    def send_all_on_topic(self, topic, message):
+        for (_, other_topic), handler in list(self.handlers.items()):
+            if other_topic == topic:
+                handler(topic, message)
+
+
+class MockPubSub:
+    def __init__(self, hub=None, session_id="session"):
+        self.hub = hub if hub is not None else MockPubSubHub()
+        self.session_id = session_id
+
+    def subscribe_topic(self, topic, handler):
+        self.hub.handlers[(self.session_id, topic)] = handler
+
+    def unsubscribe_topic(self, topic):
+        self.hub.handlers.pop((self.session_id, topic), None)
+
+    def send_others_on_topic(self, topic, message):
+        self.hub.send_others_on_topic(self.session_id, topic, message)
+
+    def send_all_on_topic(self, topic, message):
+        self.hub.send_all_on_topic(topic, message)
+
+
+class MockPage:
+    def __init__(self, pubsub=None):
         self.controls = []
         self.appbar = MockAppBar()
+        self.pubsub = pubsub if pubsub is not None else MockPubSub()
 
     def add(self, control):
         self.controls.append(control)
         control.page = self
 
-    def update(self, control=None):
+    def update(self, *controls):
         self.focus_called = False
 
     def remove(self, control):
@@ -54,7 +94,8 @@ class MockLanguageDropdown:
 class TodoAppTestBase(unittest.TestCase):
     def setUp(self):
         self.page = MockPage()
-        self.app = TodoApp(json_path="storage/test_todos.json")
+        # debug=True: 件数を参照するたびに全件の走査と突き合わせる
+        self.app = TodoApp(json_path="storage/test_todos.json", debug=True)
         src.main.todo_app = self.app
         self.app.page = self.page
         self.page.add(self.app)
@@ -62,8 +103,9 @@ class TodoAppTestBase(unittest.TestCase):
 
         # テストファイルの存在を確認し、存在する場合は削除
         test_file_path = self.app.json_path
-        if os.path.exists(test_file_path):
-            os.remove(test_file_path)
+        for path in (test_file_path, test_file_path + ".log", test_file_path + ".log.1"):
+            if os.path.exists(path):
+                os.remove(path)
 
         self.app.update()
 
@@ -258,6 +300,46 @@ class TestTodoApp(TodoAppTestBase):
         self.app.clear_clicked(None)
         self.assertEqual(len(self.app.tasks.controls), 0)
 
+    def test_delete_tasks(self):
+        for i in range(5):
+            self.app.new_task.value = f"Task {i}"
+            self.app.add_clicked(None)
+        tasks = self.app.tasks.controls
+        self.app.delete_tasks([tasks[0], tasks[2], tasks[4]])
+        self.assertEqual(
+            [task.task_name for task in self.app.tasks.controls], ["Task 1", "Task 3"]
+        )
+        self.assertEqual(self.app.items_left.value, "2 active item(s) left")
+
+        app = TodoApp(json_path=self.app.json_path)
+        app.load_tasks()
+        self.assertEqual([task.task_name for task in app.tasks.controls], ["Task 1", "Task 3"])
+
+    def test_batch(self):
+        for i in range(3):
+            self.app.new_task.value = f"Task {i}"
+            self.app.add_clicked(None)
+
+        updated = []
+        self.page.update = lambda *controls: updated.append(controls)
+        appended = []
+        self.app.storage.append_many = appended.append
+        self.app.storage.append = Mock()
+        with self.app.batch():
+            for task in self.app.tasks.controls:
+                task.completed = True
+                self.app.status_changed(task)
+            self.app.clear_clicked(None)
+            self.assertEqual(updated, [])
+
+        # 変わった Task・リスト・件数を1回で送る
+        self.assertEqual(len(updated), 1)
+        self.assertIn(self.app.items_left, updated[0])
+        self.assertEqual(len(appended), 1)
+        self.assertEqual([op["op"] for op in appended[0]], ["toggle"] * 3 + ["delete"] * 3)
+        self.app.storage.append.assert_not_called()
+        self.assertEqual(len(self.app.tasks.controls), 0)
+
     def test_before_update(self):
         self.page.focus_called = False
         self.app.new_task.value = "New Task"
@@ -396,16 +478,16 @@ class TestTodoApp(TodoAppTestBase):
         self.assertTrue(save_called)
 
     def test_task_save_clicked_save_tasks(self):
-        # Test that save_clicked calls todo_app.save_tasks
+        # Test that save_clicked records the rename through todo_app
         save_tasks_called = False
 
-        def set_save_tasks_called():
+        def set_save_tasks_called(task):
             nonlocal save_tasks_called
             save_tasks_called = True
 
-        # Mock todo_app and its save_tasks method
+        # Mock todo_app and its rename_task method
         src.main.todo_app = Mock()
-        src.main.todo_app.save_tasks = set_save_tasks_called
+        src.main.todo_app.rename_task = set_save_tasks_called
 
         task = Task(
             "Test Task",
@@ -525,6 +607,368 @@ class TestTodoApp(TodoAppTestBase):
         # タスクがロードされないことを確認
         self.assertEqual(len(self.app.tasks.controls), 0)
 
+    def test_load_tasks_replays_journal(self):
+        self.app.new_task.value = "Task 1"
+        self.app.add_clicked(None)
+        self.app.new_task.value = "Task 2"
+        self.app.add_clicked(None)
+        task = self.app.tasks.controls[0]
+        task.completed = True
+        self.app.status_changed(task)
+        task.task_name = "Task 1 (renamed)"
+        self.app.rename_task(task)
+        self.app.delete_task(self.app.tasks.controls[1])
+
+        # 操作はログに追記され、スナップショットは書き直されない
+        self.assertFalse(os.path.exists(self.app.json_path))
+
+        app = TodoApp(json_path=self.app.json_path)
+        app.load_tasks()
+        self.assertEqual(len(app.tasks.controls), 1)
+        self.assertEqual(app.tasks.controls[0].task_id, task.task_id)
+        self.assertEqual(app.tasks.controls[0].task_name, "Task 1 (renamed)")
+        self.assertTrue(app.tasks.controls[0].completed)
+
+    def test_load_tasks_in_background(self):
+        self.app.storage.save(
+            [{"task_name": f"Task {i}", "completed": i % 3 == 0} for i in range(120)]
+        )
+        progress = []
+        original_update = self.app.update
+
+        def update():
+            progress.append((len(self.app.tasks.controls), self.app.items_left.value))
+            original_update()
+
+        self.app.update = update
+        self.app.load_tasks_in_background(first_batch=10, batch_size=50).join()
+
+        # 最初の 10 件、以降は 50 件ごとに表示し、最後に件数を表示する
+        self.assertEqual(
+            [count for count, _ in progress[:-1]],
+            [10, 60, 110],
+        )
+        self.assertEqual(progress[0][1], "Loading tasks... 10")
+        self.assertEqual(progress[-1], (120, "80 active item(s) left"))
+        self.assertEqual(len(self.app.store), 120)
+
+    def test_sqlite_storage_url(self):
+        db_path = "storage/test_todos.db"
+        for path in (db_path, db_path + "-wal", db_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        app = TodoApp(json_path=self.app.json_path, storage_url=f"sqlite:///{db_path}")
+        app.page = self.page
+        app.new_task.page = self.page
+        app.new_task.value = "Task 1"
+        app.add_clicked(None)
+        app.new_task.value = "Task 2"
+        app.add_clicked(None)
+        task = app.tasks.controls[0]
+        task.completed = True
+        app.status_changed(task)
+        self.assertEqual(app.items_left.value, "1 active item(s) left")
+        app.clear_clicked(None)
+        app.storage.close()
+
+        app = TodoApp(json_path=self.app.json_path, storage_url=f"sqlite:///{db_path}")
+        app.load_tasks()
+        self.assertEqual([task.task_name for task in app.tasks.controls], ["Task 2"])
+        app.storage.close()
+
+    def test_flush(self):
+        app = TodoApp(storage_url=f"json:///{self.app.json_path}?save_interval=60")
+        app.page = self.page
+        app.new_task.page = self.page
+        app.new_task.value = "Task 1"
+        app.add_clicked(None)
+        self.assertFalse(os.path.exists(self.app.json_path))
+        app.flush()
+        with open(self.app.json_path, "r", encoding="utf-8") as f:
+            self.assertEqual(len(json.load(f)), 1)
+        app.storage.close()
+
+    def test_virtualized_load_tasks(self):
+        test_tasks = [
+            {"task_name": f"Task {i}", "completed": i % 2 == 0} for i in range(1000)
+        ]
+        with open(self.app.json_path, "w", encoding="utf-8") as f:
+            json.dump(test_tasks, f, ensure_ascii=False, indent=4)
+
+        app = TodoApp(json_path=self.app.json_path, virtualized=True)
+        app.page = self.page
+        app.tasks.page = self.page
+        app.load_tasks()
+        self.assertEqual(len(app.store), 1000)
+        # Task は表示するときに作る
+        self.assertEqual(app.tasks.controls, [])
+        self.assertEqual(app._task_controls, {})
+
+        app.tasks.before_update()
+        shown = app.tasks._get_children()
+        self.assertEqual([task.task_name for task in shown[:2]], ["Task 0", "Task 1"])
+        self.assertEqual(set(app._task_controls.values()), set(shown))
+
+        app.filter.selected_index = 1  # "active" tab
+        app.update_task_visibility()
+        app.tasks.before_update()
+        shown = app.tasks._get_children()
+        self.assertEqual(shown[0].task_name, "Task 1")
+        self.assertTrue(all(not task.completed for task in shown))
+        self.assertEqual(len(app._task_controls), len(shown))
+
+    def test_virtualized_changes_outside_window(self):
+        app = TodoApp(json_path=self.app.json_path, virtualized=True)
+        app.page = self.page
+        app.tasks.page = self.page
+        for i in range(100):
+            app.new_task.value = f"Task {i}"
+            app.add_clicked(None)
+        app.tasks.before_update()
+        self.assertEqual(len(app._task_controls), len(app.tasks.controls))
+        last = list(app.store)[-1]
+        self.assertNotIn(last.id, app._task_controls)
+
+        # 表示範囲の外のレコードへの操作も反映する
+        app.apply_remote_ops(
+            [
+                {"op": "toggle", "id": last.id, "completed": True},
+                {"op": "delete", "id": list(app.store)[-2].id},
+            ]
+        )
+        self.assertTrue(last.completed)
+        self.assertEqual(app.stats, (99, 98, 1))
+
+        app.search_tasks("99")
+        app.tasks.before_update()
+        self.assertEqual([task.record for task in app.tasks.controls], [last])
+
+        app.search_tasks("")
+        app.filter.selected_index = 2  # "completed" tab
+        app.update_task_visibility()
+        app.tasks.before_update()
+        self.assertEqual([task.record for task in app.tasks.controls], [last])
+        app.delete_task(app.tasks.controls[0])
+        app.tasks.before_update()
+        self.assertEqual(app.tasks.controls, [])
+        self.assertEqual(app._task_controls, {})
+        app.storage.close()
+
+    def test_mapped_storage_decodes_visible_names_only(self):
+        JournalStorage(self.app.json_path).save(
+            [{"task_name": f"Task {i}", "completed": i % 2 == 0} for i in range(1000)]
+        )
+        app = TodoApp(storage_url=f"mapped:///{self.app.json_path}", virtualized=True)
+        app.page = self.page
+        app.tasks.page = self.page
+        app.load_tasks()
+        self.assertEqual(app.stats, (1000, 500, 500))
+        self.assertEqual(app.storage.count_active(), 500)
+
+        app.tasks.before_update()
+        shown = app.tasks._get_children()
+        for task in shown:
+            task.build()
+        self.assertEqual(shown[0].display_task.label, "Task 0")
+        self.assertEqual(
+            sum(task.record.name_loaded for task in app.tasks.controls), len(shown)
+        )
+
+        task = app.tasks.controls[1]
+        task.completed = True
+        app.status_changed(task)
+        self.assertEqual(app.storage.count_active(), 499)
+        app.storage.close()
+
+    def add_tasks(self, *names):
+        for name in names:
+            self.app.new_task.value = name
+            self.app.add_clicked(None)
+        return self.app.tasks.controls[-len(names):]
+
+    def visible_names(self):
+        return [task.task_name for task in self.app.tasks.controls if task.visible]
+
+    def test_search_tasks(self):
+        self.add_tasks("Buy milk", "牛乳を買う", "Write report")
+        self.app.search.value = "buy"
+        self.app.search_changed(None)
+        self.assertEqual(self.visible_names(), ["Buy milk"])
+
+        self.app.search_tasks("牛乳")
+        self.assertEqual(self.visible_names(), ["牛乳を買う"])
+
+        self.app.search_tasks("")
+        self.assertEqual(len(self.visible_names()), 3)
+
+    def test_search_combines_with_tabs(self):
+        milk, tea, report = self.add_tasks("Buy milk", "Buy tea", "Write report")
+        milk.completed = True
+        self.app.status_changed(milk)
+        self.app.search_tasks("buy")
+
+        self.app.filter.selected_index = 1  # "active" tab
+        self.app.tabs_changed(None)
+        self.assertEqual(self.visible_names(), ["Buy tea"])
+        self.assertFalse(report.visible)
+
+        self.app.filter.selected_index = 2  # "completed" tab
+        self.app.tabs_changed(None)
+        self.assertEqual(self.visible_names(), ["Buy milk"])
+
+        # 完了にしたタスクは「未完了」タブでは表示しない
+        tea.completed = True
+        self.app.status_changed(tea)
+        self.assertEqual(self.visible_names(), ["Buy milk", "Buy tea"])
+
+    def test_search_index_follows_changes(self):
+        milk, report = self.add_tasks("Buy milk", "Write report")
+        self.app.search_tasks("buy")
+
+        # 追加したタスクは検索に一致するときだけ表示する
+        self.add_tasks("Buy bread", "Call mom")
+        self.assertEqual(self.visible_names(), ["Buy milk", "Buy bread"])
+
+        report.page = self.page
+        report.edit_name.value = "Buy paper"
+        report.save_clicked(None)
+        self.assertTrue(report.visible)
+        self.assertEqual(self.app.search_index.search("report"), set())
+
+        self.app.delete_task(milk)
+        self.app.delete_tasks([report])
+        self.assertEqual(self.visible_names(), ["Buy bread"])
+        self.assertEqual(self.app.search_index.search("buy"), {self.app.tasks.controls[0].task_id})
+        self.assertEqual(len(self.app.search_index), 2)
+
+    def test_added_task_follows_search_rules(self):
+        self.add_tasks("Buy milk", "東京と京都")
+        self.app.search_tasks("ilk")
+        self.assertEqual(self.visible_names(), [])
+        # 途中の文字列は単語の前方一致ではないので、追加したタスクも表示しない
+        self.add_tasks("Buy milk")
+        self.assertEqual(self.visible_names(), [])
+
+        self.app.search_tasks("東京都")
+        self.add_tasks("東京と京都", "東京都庁")
+        self.assertEqual(self.visible_names(), ["東京都庁"])
+
+    def test_stats(self):
+        self.assertEqual(self.app.stats, (0, 0, 0))
+        for i in range(4):
+            self.app.new_task.value = f"Task {i}"
+            self.app.add_clicked(None)
+        self.assertEqual(self.app.stats, (4, 4, 0))
+
+        tasks = self.app.tasks.controls
+        for task in tasks[:3]:
+            task.completed = True
+            self.app.status_changed(task)
+        self.assertEqual(self.app.stats, (4, 1, 3))
+
+        tasks[0].completed = False
+        self.app.status_changed(tasks[0])
+        self.app.delete_task(tasks[3])
+        self.assertEqual(self.app.stats, (3, 1, 2))
+
+        self.app.clear_clicked(None)
+        self.assertEqual(self.app.stats, (1, 1, 0))
+        self.assertEqual(self.app.stats.active, 1)
+
+        app = TodoApp(json_path=self.app.json_path, debug=True)
+        app.load_tasks()
+        self.assertEqual(app.stats, (1, 1, 0))
+
+    def test_stats_debug_detects_drift(self):
+        self.app.new_task.value = "Task"
+        self.app.add_clicked(None)
+        self.app.store._completed_ids.add("missing")
+        with self.assertRaises(AssertionError):
+            self.app.stats
+        self.app.store._completed_ids.discard("missing")
+
+    def test_update_task_visibility_only_touches_changed_tasks(self):
+        for i in range(6):
+            self.app.new_task.value = f"Task {i}"
+            self.app.add_clicked(None)
+        tasks = self.app.tasks.controls
+        for task in tasks[:2]:
+            task.completed = True
+            self.app.status_changed(task)
+
+        updates = []
+        self.page.update = lambda *controls: updates.append(controls)
+
+        def switch_tab(index):
+            updates.clear()
+            self.app.filter.selected_index = index
+            self.app.tabs_changed(None)
+            return [task.task_name for task in tasks if task.visible]
+
+        # "all" -> "completed": 未完了の4件だけを隠す
+        self.assertEqual(switch_tab(2), ["Task 0", "Task 1"])
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(len(updates[0]), 4)
+        # "completed" -> "active": 全件が入れ替わる
+        self.assertEqual(switch_tab(1), ["Task 2", "Task 3", "Task 4", "Task 5"])
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(len(updates[0]), 6)
+        # "active" -> "all": 完了済みの2件だけを表示する
+        self.assertEqual(switch_tab(0), [f"Task {i}" for i in range(6)])
+        self.assertEqual(len(updates[0]), 2)
+        # 変化が無いタブへの切り替えでは何も送らない
+        self.assertEqual(len(switch_tab(0)), 6)
+        self.assertEqual(updates, [])
+
+    def test_filter_applies_to_changed_and_new_tasks(self):
+        self.app.new_task.value = "Task 1"
+        self.app.add_clicked(None)
+        self.app.filter.selected_index = 1  # "active" tab
+        self.app.tabs_changed(None)
+
+        task = self.app.tasks.controls[0]
+        task.completed = True
+        self.app.status_changed(task)
+        self.assertFalse(task.visible)
+
+        self.app.filter.selected_index = 2  # "completed" tab
+        self.app.tabs_changed(None)
+        self.assertTrue(task.visible)
+        self.app.new_task.value = "Task 2"
+        self.app.add_clicked(None)
+        self.assertFalse(self.app.tasks.controls[1].visible)
+
+    def test_tasks_render_records(self):
+        self.app.new_task.value = "Task 1"
+        self.app.add_clicked(None)
+        task = self.app.tasks.controls[0]
+        record = self.app.store.get(task.task_id)
+        self.assertIs(task.record, record)
+
+        task.completed = True
+        self.assertTrue(record.completed)
+        self.app.status_changed(task)
+        self.assertGreaterEqual(record.updated_at, record.created_at)
+
+        self.app.save_tasks()
+        with open(self.app.json_path, "r", encoding="utf-8") as f:
+            task_list = json.load(f)
+        self.assertEqual(task_list, [record.to_dict()])
+
+    def test_load_tasks_from_binary_snapshot(self):
+        storage = JournalStorage(self.app.json_path, snapshot_format="binary")
+        storage.save([{"task_name": "Task 1", "completed": True}])
+        self.app.load_tasks()
+        self.assertEqual(self.app.tasks.controls[0].task_name, "Task 1")
+        self.assertTrue(self.app.tasks.controls[0].completed)
+
+    def test_load_tasks_from_invalid_binary(self):
+        with open(self.app.json_path, "wb") as f:
+            f.write(b"TODO\x01\x00\x05\x00\x00\x00")
+        self.app.load_tasks()
+        self.assertEqual(len(self.app.tasks.controls), 0)
+        self.assertEqual(len(self.app.store), 0)
+
     def test_load_tasks_from_invalid_json(self):
         # JSONファイルにJSON形式ではない内容を書き込む
         with open(self.app.json_path, "w", encoding="utf-8") as f:
@@ -537,6 +981,415 @@ class TestTodoApp(TodoAppTestBase):
         self.assertEqual(len(self.app.tasks.controls), 0)
 
 
+class TestSessions(unittest.TestCase):
+    """保存先を共有する2つのセッション。"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = SharedStorage(
+            JournalStorage(os.path.join(self.tmpdir.name, "todos.json"))
+        )
+        hub = MockPubSubHub()
+        self.apps = []
+        for session_id in ("a", "b"):
+            page = MockPage(MockPubSub(hub, session_id))
+            page.update = Mock()
+            app = TodoApp(storage=self.storage)
+            app.page = page
+            page.add(app)
+            app.new_task.page = page
+            app.load_tasks()
+            app.attach_session(page.pubsub)
+            self.apps.append(app)
+        self.app_a, self.app_b = self.apps
+
+    def tearDown(self):
+        for app in self.apps:
+            app.detach_session()
+        self.storage.close()
+        self.tmpdir.cleanup()
+
+    def names(self, app):
+        return [(task.task_name, task.completed) for task in app.tasks.controls]
+
+    def test_changes_are_broadcast(self):
+        self.app_a.new_task.value = "Task 1"
+        self.app_a.add_clicked(None)
+        self.app_a.new_task.value = "Task 2"
+        self.app_a.add_clicked(None)
+        self.assertEqual(self.names(self.app_b), [("Task 1", False), ("Task 2", False)])
+
+        task = self.app_b.tasks.controls[0]
+        task.build()
+        task.completed = True
+        self.app_b.status_changed(task)
+        # 送るのは変わった Task と残りの件数だけ
+        page_a = self.app_a.page
+        page_a.update.assert_called_with(
+            self.app_a.tasks.controls[0], self.app_a.items_left
+        )
+        self.assertEqual(self.app_a.items_left.value, "1 active item(s) left")
+
+        task.page = self.app_b.page
+        task.edit_name.value = "Renamed"
+        task.save_clicked(None)
+        self.assertEqual(self.names(self.app_a), [("Renamed", True), ("Task 2", False)])
+
+        self.app_a.clear_clicked(None)
+        self.assertEqual(self.names(self.app_b), [("Task 2", False)])
+        self.assertEqual(self.app_b.stats, (1, 1, 0))
+
+    def test_renames_go_to_own_session(self):
+        self.app_a.new_task.value = "Task"
+        self.app_a.add_clicked(None)
+        src.main.todo_app = Mock()
+        task = self.app_b.tasks.controls[0]
+        task.page = self.app_b.page
+        task.edit_name.value = "Renamed"
+        task.save_clicked(None)
+        src.main.todo_app.rename_task.assert_not_called()
+        self.assertEqual(self.names(self.app_a), [("Renamed", False)])
+
+    def test_new_session_loads_from_memory(self):
+        self.app_a.new_task.value = "Task"
+        self.app_a.add_clicked(None)
+        self.storage.storage.load = Mock(side_effect=AssertionError)
+        app = TodoApp(storage=self.storage)
+        app.load_tasks()
+        self.assertEqual(self.names(app), [("Task", False)])
+
+    def test_batch_is_broadcast_once(self):
+        for i in range(3):
+            self.app_a.new_task.value = f"Task {i}"
+            self.app_a.add_clicked(None)
+        received = []
+        self.app_b.apply_remote_ops = received.append
+        with self.app_a.batch():
+            for task in self.app_a.tasks.controls:
+                task.completed = True
+                self.app_a.status_changed(task)
+        self.assertEqual(len(received), 1)
+        self.assertEqual(len(received[0]), 3)
+
+    def test_shared_watcher(self):
+        self.addCleanup(setattr, src.main, "_shared_storage", src.main._shared_storage)
+        self.addCleanup(setattr, src.main, "_shared_watcher", src.main._shared_watcher)
+        src.main._shared_storage = self.storage
+        src.main._shared_watcher = None
+        watcher = src.main.watch_shared_storage(self.app_a.page.pubsub)
+        self.addCleanup(watcher.stop)
+        # セッションがいくつあっても、監視は1つ
+        self.assertIs(src.main.watch_shared_storage(self.app_b.page.pubsub), watcher)
+
+        other = JournalStorage(os.path.join(self.tmpdir.name, "todos.json"))
+        with self.assertRaises(FileNotFoundError):
+            other.load()
+        other.append({"op": "add", "id": "x", "task_name": "Theirs", "completed": False})
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and not all(len(app.store) for app in self.apps):
+            time.sleep(0.01)
+        for app in self.apps:
+            self.assertEqual(self.names(app), [("Theirs", False)])
+        self.assertEqual(self.storage.sync_changes(), [])
+        other.close()
+
+    def test_remote_add_during_load_is_not_duplicated(self):
+        self.app_a.new_task.value = "Task"
+        self.app_a.add_clicked(None)
+        app = TodoApp(storage=self.storage)
+        records = [record for record in self.app_a.store]
+        # 読み込んだタスクを加える前に、同じタスクの操作が届いた
+        app.apply_remote_ops([{"op": "add", **records[0].to_dict()}])
+        app.load_tasks()
+        self.assertEqual(self.names(app), [("Task", False)])
+
+
+class TestUpdateCounts(unittest.TestCase):
+    """ユーザーの1回の操作で page.update() を何回呼ぶか。"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.app = TodoApp(storage=JournalStorage(os.path.join(self.tmpdir.name, "todos.json")))
+        self.page = MockPage()
+        self.page.add(self.app)
+        self.app.new_task.page = self.page
+        self.updates = []
+        self.page.update = lambda *controls: self.updates.append(controls)
+        for name in ("Task 1", "Task 2"):
+            self.app.new_task.value = name
+            self.app.add_clicked(None)
+
+    def tearDown(self):
+        self.app.storage.close()
+        self.tmpdir.cleanup()
+
+    def action(self, func, *args):
+        self.updates.clear()
+        func(*args)
+        return self.updates
+
+    def test_one_update_per_action(self):
+        app = self.app
+        task = app.tasks.controls[0]
+        task.page = self.page
+
+        app.new_task.value = "Task 3"
+        updates = self.action(app.add_clicked, None)
+        # 追加したタスクを含むリスト・入力欄 (フォーカス)・件数だけを送る
+        self.assertEqual(updates, [(app.tasks, app.new_task, app.items_left)])
+
+        task.display_task.value = True
+        self.assertEqual(self.action(task.status_changed, None), [(task, app.items_left)])
+
+        self.assertEqual(self.action(task.edit_clicked, None), [(task,)])
+        task.edit_name.value = "Renamed"
+        self.assertEqual(self.action(task.save_clicked, None), [(task,)])
+
+        app.filter.selected_index = 1
+        self.assertEqual(self.action(app.tabs_changed, None), [(task,)])
+
+        app.search.value = "Task 3"
+        self.assertEqual(len(self.action(app.search_changed, None)), 1)
+        # 表示が変わらない検索では送らない
+        app.search.value = "Task 3"
+        self.assertEqual(self.action(app.search_changed, None), [])
+
+        self.assertEqual(
+            self.action(app.language_changed, Mock(control=Mock(value="ja"))),
+            [(app.new_task, app.search, app.filter, app.items_left)],
+        )
+
+        self.assertEqual(self.action(app.clear_clicked, None), [(app.tasks,)])
+
+        updates = self.action(app.tasks.controls[0].delete_clicked, None)
+        self.assertEqual(updates, [(app.tasks, app.items_left)])
+        self.assertEqual(app.renderer.update_count, 11)
+
+
+class TestExternalChanges(unittest.TestCase):
+    """ほかのプロセスが同じファイルに書き込んだ場合。"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "todos.json")
+        self.app = TodoApp(storage=JournalStorage(self.path))
+        self.app.page = MockPage()
+        self.app.page.update = Mock()
+        self.app.page.add(self.app)
+        self.app.new_task.page = self.app.page
+        self.app.new_task.value = "Mine"
+        self.app.add_clicked(None)
+
+    def tearDown(self):
+        self.app.storage.close()
+        self.tmpdir.cleanup()
+
+    def test_reload_if_changed(self):
+        self.assertFalse(self.app.reload_if_changed())
+        other = JournalStorage(self.path)
+        other.load()
+        other.append({"op": "add", "id": "x", "task_name": "Theirs", "completed": True})
+        self.assertTrue(self.app.reload_if_changed())
+        self.assertEqual(
+            [(task.task_name, task.completed) for task in self.app.tasks.controls],
+            [("Mine", False), ("Theirs", True)],
+        )
+        self.assertEqual(self.app.stats, (2, 1, 1))
+        self.assertFalse(self.app.reload_if_changed())
+
+    def test_sync_applies_only_changed_rows(self):
+        for name in ("Second", "Third"):
+            self.app.new_task.value = name
+            self.app.add_clicked(None)
+        mine, second, third = self.app.tasks.controls
+        other = JournalStorage(self.path)
+        tasks = other.load()
+        tasks[1]["completed"] = True
+        tasks[2]["task_name"] = "Third renamed"
+        del tasks[0]
+        tasks.append({"id": "x", "task_name": "Theirs", "completed": False})
+        other.save(tasks)
+
+        self.app.page.update.reset_mock()
+        self.app.load_tasks = Mock(side_effect=AssertionError)
+        self.assertTrue(self.app.sync_external_changes())
+        controls = self.app.tasks.controls
+        # 残ったタスクは同じ Task のまま更新される
+        self.assertIs(controls[0], second)
+        self.assertIs(controls[1], third)
+        self.assertEqual(
+            [(task.task_name, task.completed) for task in controls],
+            [("Second", True), ("Third renamed", False), ("Theirs", False)],
+        )
+        self.assertEqual(self.app.stats, (3, 2, 1))
+        self.assertFalse(self.app.sync_external_changes())
+
+    def test_sync_ignores_own_writes(self):
+        self.app.storage.load = Mock(side_effect=AssertionError)
+        self.app.new_task.value = "Another"
+        self.app.add_clicked(None)
+        self.app.save_tasks()
+        self.assertFalse(self.app.sync_external_changes())
+
+    def test_save_tasks_keeps_rows_it_has_not_synced(self):
+        JournalStorage(self.path).append(
+            {"op": "add", "id": "x", "task_name": "Theirs", "completed": False}
+        )
+        task = self.app.tasks.controls[0]
+        task.completed = True
+        self.app.status_changed(task)
+        self.app.save_tasks()
+        self.assertEqual(
+            [(row["task_name"], row["completed"]) for row in JournalStorage(self.path).load()],
+            [("Mine", True), ("Theirs", False)],
+        )
+
+    def test_sync_is_sent_to_other_sessions(self):
+        received = []
+        self.app.pubsub = Mock(
+            send_others_on_topic=lambda topic, ops: received.append(ops)
+        )
+        task_id = self.app.tasks.controls[0].task_id
+        JournalStorage(self.path).append({"op": "delete", "id": task_id})
+        self.assertTrue(self.app.sync_external_changes())
+        self.assertEqual(self.app.tasks.controls, [])
+        self.assertEqual(received, [[{"op": "delete", "id": task_id}]])
+        self.app.pubsub = None
+
+    def test_watch_storage(self):
+        synced = threading.Event()
+        sync = self.app.sync_external_changes
+
+        def sync_and_notify():
+            result = sync()
+            if result:
+                synced.set()
+            return result
+
+        self.app.sync_external_changes = sync_and_notify
+        watcher = self.app.watch_storage(interval=0.02)
+        try:
+            self.assertIsNotNone(watcher)
+            # 自分の書き込みでは反映しない
+            self.app.new_task.value = "Another"
+            self.app.add_clicked(None)
+            self.assertFalse(synced.wait(0.3))
+            JournalStorage(self.path).append(
+                {"op": "add", "id": "x", "task_name": "Theirs", "completed": False}
+            )
+            self.assertTrue(synced.wait(2))
+            self.assertEqual(self.app.tasks.controls[-1].task_name, "Theirs")
+        finally:
+            self.app.detach_session()
+        self.assertIsNone(self.app.watcher)
+
+    def test_lifecycle_resume_reloads(self):
+        JournalStorage(self.path).append(
+            {"op": "add", "id": "x", "task_name": "Theirs", "completed": False}
+        )
+        self.app.lifecycle_changed(Mock(state=ft.AppLifecycleState.INACTIVE))
+        self.assertEqual(len(self.app.tasks.controls), 1)
+        self.app.lifecycle_changed(Mock(state=ft.AppLifecycleState.RESUME))
+        self.assertEqual(len(self.app.tasks.controls), 2)
+
+
+class PausingStorage(JournalStorage):
+    """load_iter() が pause_at 件目を返す前に、resume されるまで止まる保存先。"""
+
+    def __init__(self, json_path, pause_at):
+        super().__init__(json_path)
+        self.pause_at = pause_at
+        self.paused = threading.Event()
+        self.resume = threading.Event()
+
+    def load_iter(self):
+        for i, task_data in enumerate(super().load_iter()):
+            if i == self.pause_at:
+                self.paused.set()
+                self.resume.wait(5)
+            yield task_data
+
+
+class TestBackgroundLoad(unittest.TestCase):
+    """読み込み用のスレッドがタスクを加えている間の操作。"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "todos.json")
+
+    def tearDown(self):
+        self.app.storage.close()
+        self.tmpdir.cleanup()
+
+    def open(self, storage, count, completed=lambda i: False):
+        JournalStorage(self.path).save(
+            [{"task_name": f"Task {i}", "completed": completed(i)} for i in range(count)]
+        )
+        self.app = TodoApp(storage=storage, debug=True)
+        self.app.page = MockPage()
+        self.app.page.update = Mock()
+        self.app.page.add(self.app)
+        self.app.new_task.page = self.app.page
+        return self.app
+
+    def assertConsistent(self, app):
+        self.assertEqual(
+            [task.task_id for task in app.tasks.controls],
+            [record.id for record in app.store],
+        )
+        self.assertEqual(set(app._task_controls), {record.id for record in app.store})
+        if app._query:
+            self.assertEqual(app._matched_ids, app.search_index.search(app._query))
+        # debug=True: 件数を全件の走査と突き合わせる
+        app.stats
+
+    def test_handlers_during_load(self):
+        storage = PausingStorage(self.path, pause_at=100)
+        app = self.open(storage, 200, completed=lambda i: i % 2 == 0)
+        thread = app.load_tasks_in_background(first_batch=10, batch_size=50)
+        self.assertTrue(storage.paused.wait(5))
+        # 60 件を表示したところで、読み込み用のスレッドは次の分を変換している
+        self.assertEqual(len(app.store), 60)
+        app.search_tasks("Task 1")
+        app.clear_clicked(None)
+        app.new_task.value = "New"
+        app.add_clicked(None)
+        task = app.tasks.controls[0]
+        task.display_task.value = True
+        task.status_changed(None)
+        storage.resume.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+        self.assertEqual(len(app.store), 200 - 30 + 1)
+        self.assertConsistent(app)
+        self.assertIn("Task 150", [record.name for record in app.store])
+        self.assertEqual(app.stats.completed, 1 + 70)
+        self.assertEqual(app.items_left.value, f"{200 - 30 + 1 - 71} active item(s) left")
+
+    def test_search_while_loading(self):
+        app = self.open(JournalStorage(self.path), 20000)
+        errors = []
+        thread = app.load_tasks_in_background(
+            first_batch=10, batch_size=500, on_loaded=lambda: None
+        )
+        n = 0
+        while thread.is_alive():
+            try:
+                app.search_tasks(f"Task {n % 10}")
+                app.filter.selected_index = n % 3
+                app.update_task_visibility()
+                app.clear_clicked(None)
+            except RuntimeError as e:
+                errors.append(e)
+                break
+            n += 1
+        thread.join(5)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(app.store), 20000)
+        self.assertConsistent(app)
+
+
 class TestMain(unittest.TestCase):
     def setUp(self):
         self.mock_page = MockPage()
@@ -557,6 +1410,22 @@ class TestMain(unittest.TestCase):
         self.assertEqual(len(self.mock_page.controls), 1)
         self.assertIsInstance(self.mock_page.controls[0], TodoApp)
 
+    def test_watch_starts_only_for_attached_sessions(self):
+        for detached in (False, True):
+            with self.subTest(detached=detached), patch.object(
+                TodoApp, "load_tasks_in_background"
+            ) as load, patch.object(src.main, "watch_shared_storage") as watch:
+                page = MockPage()
+                src.main.main(page)
+                app = page.controls[0]
+                if detached:
+                    # 読み込みが終わる前にセッションが終わった
+                    app.detach_session()
+                load.call_args.kwargs["on_loaded"]()
+                # ほかのテストの main() の読み込みが終わって呼ぶ分は数えない
+                calls = [c for c in watch.call_args_list if c == call(page.pubsub)]
+                self.assertEqual(len(calls), 0 if detached else 1)
+
 
 if __name__ == "__main__":
     unittest.main()
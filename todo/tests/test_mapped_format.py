@@ -0,0 +1,110 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.binary_format import BinaryFormatError
+from src.mapped_format import MappedRow, MappedTaskDict, MappedTaskFile, encode_tasks
+
+
+class MappedFormatTestBase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "todos.tdx")
+        self.task_list = [
+            {
+                "id": f"id{i}",
+                "task_name": f"タスク {i}",
+                "completed": i % 3 == 0,
+                "created_at": 1000.0 + i,
+                "updated_at": 2000.0 + i,
+            }
+            for i in range(20)
+        ]
+        self.task_list[1].pop("updated_at")
+        self.file = self.open(self.task_list)
+
+    def tearDown(self):
+        self.file.close()
+        self.tmpdir.cleanup()
+
+    def open(self, task_list):
+        with open(self.path, "wb") as f:
+            f.write(encode_tasks(task_list))
+        return MappedTaskFile(self.path)
+
+
+class TestMappedTaskFile(MappedFormatTestBase):
+    def test_rows(self):
+        self.assertEqual(len(self.file), 20)
+        self.assertEqual(self.file.completed_count, 7)
+        self.assertEqual(self.file.active_count, 13)
+        for row, task in enumerate(self.task_list):
+            self.assertEqual(self.file.task_id(row), task["id"])
+            self.assertEqual(self.file.name(row), task["task_name"])
+            self.assertEqual(self.file.completed(row), task["completed"])
+        self.assertEqual(self.file.timestamps(1), (1001.0, None))
+        with self.assertRaises(IndexError):
+            self.file.name(20)
+
+    def test_mapped_row_is_a_task_dict(self):
+        self.assertEqual([MappedRow(self.file, row) for row in range(20)], self.task_list)
+        self.assertEqual({**MappedRow(self.file, 1)}, self.task_list[1])
+
+    def test_detach(self):
+        self.file.detach()
+        self.file.detach()
+        # マップを閉じても、メモリに読み込んだ内容から読み出せる
+        os.remove(self.path)
+        self.assertEqual([MappedRow(self.file, row) for row in range(20)], self.task_list)
+
+    def test_empty(self):
+        self.file.close()
+        self.file = self.open([])
+        self.assertEqual(len(self.file), 0)
+
+    def test_invalid(self):
+        for data in (b"", b"TODX", b"TODO" + bytes(20), encode_tasks(self.task_list)[:40]):
+            with open(self.path, "wb") as f:
+                f.write(data)
+            with self.assertRaises(BinaryFormatError):
+                MappedTaskFile(self.path)
+
+
+class TestMappedTaskDict(MappedFormatTestBase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = MappedTaskDict(self.file)
+        self.expected = {task["id"]: task for task in self.task_list}
+
+    def assertMatches(self):
+        self.assertEqual(list(self.tasks), list(self.expected))
+        self.assertEqual(len(self.tasks), len(self.expected))
+        self.assertEqual(dict(self.tasks), self.expected)
+        self.assertEqual(
+            self.tasks.active_count(),
+            sum(1 for task in self.expected.values() if not task["completed"]),
+        )
+
+    def test_unchanged(self):
+        self.assertMatches()
+        self.assertIn("id3", self.tasks)
+        self.assertNotIn("missing", self.tasks)
+
+    def test_changes_keep_dict_semantics(self):
+        for tasks in (self.tasks, self.expected):
+            tasks["id1"] = {"id": "id1", "task_name": "x", "completed": True}
+            tasks["new"] = {"id": "new", "task_name": "new", "completed": False}
+            del tasks["id0"]
+            tasks.pop("id2")
+            tasks["id2"] = {"id": "id2", "task_name": "again", "completed": False}
+            self.assertIsNone(tasks.pop("missing", None))
+        self.assertMatches()
+        with self.assertRaises(KeyError):
+            del self.tasks["id0"]
+
+
+if __name__ == "__main__":
+    unittest.main()
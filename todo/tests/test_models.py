@@ -0,0 +1,140 @@
+import unittest
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.mapped_format import MappedRow, MappedTaskFile, encode_tasks
+from src.models import MappedTaskRecord, TaskRecord, TaskStore
+
+
+class TestTaskRecord(unittest.TestCase):
+    def test_defaults(self):
+        record = TaskRecord("Task")
+        self.assertEqual(record.name, "Task")
+        self.assertFalse(record.completed)
+        self.assertIsNotNone(record.id)
+        self.assertEqual(record.created_at, record.updated_at)
+
+    def test_slots(self):
+        record = TaskRecord("Task")
+        self.assertFalse(hasattr(record, "__dict__"))
+        with self.assertRaises(AttributeError):
+            record.label = "Task"
+
+    def test_dict_round_trip(self):
+        record = TaskRecord("Task", completed=True, task_id="a", created_at=1.0)
+        record.touch()
+        copy = TaskRecord.from_dict(record.to_dict())
+        self.assertEqual(copy.to_dict(), record.to_dict())
+        self.assertGreater(copy.updated_at, copy.created_at)
+
+    def test_from_legacy_dict(self):
+        record = TaskRecord.from_dict({"task_name": "Task", "completed": False})
+        self.assertIsNotNone(record.id)
+        self.assertIsNotNone(record.created_at)
+
+
+class TestMappedTaskRecord(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmpdir.name, "todos.tdx")
+        with open(path, "wb") as f:
+            f.write(
+                encode_tasks(
+                    [
+                        {
+                            "id": "a",
+                            "task_name": "Task",
+                            "completed": True,
+                            "created_at": 1.0,
+                            "updated_at": 2.0,
+                        }
+                    ]
+                )
+            )
+        self.file = MappedTaskFile(path)
+
+    def tearDown(self):
+        self.file.close()
+        self.tmpdir.cleanup()
+
+    def test_name_is_decoded_lazily(self):
+        record = TaskRecord.from_dict(MappedRow(self.file, 0))
+        self.assertIsInstance(record, MappedTaskRecord)
+        self.assertEqual((record.id, record.completed), ("a", True))
+        self.assertEqual((record.created_at, record.updated_at), (1.0, 2.0))
+        self.assertFalse(record.name_loaded)
+        self.assertEqual(record.name, "Task")
+        self.assertTrue(record.name_loaded)
+        record.name = "Renamed"
+        self.assertEqual(record.to_dict()["task_name"], "Renamed")
+
+    def test_counted_by_store(self):
+        store = TaskStore()
+        store.add(TaskRecord.from_dict(MappedRow(self.file, 0)))
+        store.get("a").completed = False
+        self.assertEqual(store.stats(), (1, 1, 0))
+
+
+class TestTaskStore(unittest.TestCase):
+    def test_store(self):
+        store = TaskStore()
+        records = [TaskRecord(f"Task {i}", task_id=str(i)) for i in range(5)]
+        for record in records:
+            store.add(record)
+        self.assertEqual(len(store), 5)
+        self.assertIn("3", store)
+        self.assertIs(store.get("3"), records[3])
+        self.assertIs(store.remove("3"), records[3])
+        self.assertIsNone(store.remove("3"))
+        self.assertEqual(store.remove_many(["0", "3", "4"]), [records[0], records[4]])
+        self.assertEqual([record.id for record in store], ["1", "2"])
+        self.assertEqual(
+            [task["task_name"] for task in store.to_list()], ["Task 1", "Task 2"]
+        )
+        store.clear()
+        self.assertEqual(len(store), 0)
+
+    def test_counters(self):
+        store = TaskStore()
+        records = [TaskRecord(f"Task {i}", completed=i < 2) for i in range(5)]
+        for record in records:
+            store.add(record)
+        self.assertEqual(store.stats(), (5, 3, 2))
+
+        records[4].completed = True
+        records[0].completed = False
+        self.assertEqual(store.stats(), (5, 3, 2))
+        self.assertEqual(store.completed_ids(), {records[1].id, records[4].id})
+        self.assertEqual(
+            store.active_ids(), {records[0].id, records[2].id, records[3].id}
+        )
+
+        store.remove(records[1].id)
+        store.remove_many([records[2].id, records[3].id])
+        self.assertEqual(store.stats(), (2, 1, 1))
+        store.verify()
+
+        # 取り除いたレコードの変更は件数に影響しない
+        records[1].completed = False
+        self.assertEqual(store.stats(), (2, 1, 1))
+
+    def test_add_replaces_record_with_same_id(self):
+        store = TaskStore()
+        store.add(TaskRecord("Task", completed=True, task_id="a"))
+        store.add(TaskRecord("Task", completed=False, task_id="a"))
+        self.assertEqual(store.stats(), (1, 1, 0))
+
+    def test_verify(self):
+        store = TaskStore()
+        store.add(TaskRecord("Task"))
+        store.verify()
+        store._completed_ids.add("missing")
+        with self.assertRaises(AssertionError):
+            store.verify()
+
+
+if __name__ == "__main__":
+    unittest.main()
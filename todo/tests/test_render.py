@@ -0,0 +1,112 @@
+import os
+import sys
+import threading
+import unittest
+
+import flet as ft
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.render import RenderScheduler, coalesce_updates
+from test_main import MockPage
+
+
+class RecordingPage(MockPage):
+    def __init__(self):
+        super().__init__()
+        self.updates = []
+
+    def update(self, *controls):
+        self.updates.append(controls)
+
+
+class TestRenderScheduler(unittest.TestCase):
+    def setUp(self):
+        self.root = ft.Column()
+        self.page = RecordingPage()
+        self.root.page = self.page
+        self.renderer = RenderScheduler(self.root)
+        self.a = ft.Text("a")
+        self.b = ft.Text("b")
+
+    def test_mark_outside_render_is_sent_immediately(self):
+        self.renderer.mark(self.a)
+        self.renderer.mark(self.b)
+        self.assertEqual(self.page.updates, [(self.a,), (self.b,)])
+        self.assertEqual(self.renderer.update_count, 2)
+
+    def test_render_coalesces_updates(self):
+        with self.renderer.render():
+            self.renderer.mark(self.a)
+            with self.renderer.render():
+                self.renderer.mark(self.b, self.a)
+            self.assertEqual(self.page.updates, [])
+        self.assertEqual(self.page.updates, [(self.a, self.b)])
+
+    def test_root_replaces_other_controls(self):
+        with self.renderer.render():
+            self.renderer.mark(self.a, self.root, self.b)
+        self.assertEqual(self.page.updates, [(self.root,)])
+
+    def test_descendants_of_marked_controls_are_dropped(self):
+        row = ft.Row([self.a])
+        row.parent = self.root
+        self.a.parent = row
+        with self.renderer.render():
+            self.renderer.mark(self.a, row, self.b)
+        self.assertEqual(self.page.updates, [(row, self.b)])
+
+    def test_focus_is_sent_with_other_changes(self):
+        field = ft.TextField()
+        with self.renderer.render():
+            self.renderer.focus(field)
+            self.renderer.mark(self.a)
+        self.assertEqual(self.page.updates, [(field, self.a)])
+        self.assertIsNotNone(field._get_attr("focus"))
+
+    def test_nothing_is_sent_without_changes_or_page(self):
+        with self.renderer.render():
+            pass
+        self.root.page = None
+        self.renderer.mark(self.a)
+        self.assertEqual(self.page.updates, [])
+
+    def test_decorator(self):
+        renderer = self.renderer
+
+        class Owner:
+            def __init__(self):
+                self.renderer = renderer
+
+            @coalesce_updates
+            def action(self, *controls):
+                for control in controls:
+                    renderer.mark(control)
+                return len(controls)
+
+        self.assertEqual(Owner().action(self.a, self.b), 2)
+        self.assertEqual(self.page.updates, [(self.a, self.b)])
+
+
+    def test_lock_is_held_until_flush(self):
+        lock = threading.RLock()
+        renderer = RenderScheduler(self.root, lock=lock)
+        held = []
+        self.page.update = lambda *controls: held.append(lock._is_owned())
+
+        def other_thread():
+            # ブロックの間は、ほかのスレッドはロックを取れない
+            held.append(lock.acquire(blocking=False))
+
+        with renderer.render():
+            with renderer.render():
+                renderer.mark(self.a)
+            thread = threading.Thread(target=other_thread)
+            thread.start()
+            thread.join()
+        self.assertEqual(held, [False, True])
+        self.assertTrue(lock.acquire(blocking=False))
+        lock.release()
+
+if __name__ == "__main__":
+    unittest.main()
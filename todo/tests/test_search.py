@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search import SearchIndex, normalize, tokenize
+
+
+class TestTokenize(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize("ＢＵＹ Milk ｶﾀｶﾅ"), "buy milk カタカナ")
+
+    def test_words_and_ngrams(self):
+        self.assertEqual(tokenize("buy 牛乳 x2"), {"buy", "牛", "乳", "牛乳", "x2"})
+        self.assertEqual(tokenize("メモ_v2"), {"メ", "モ", "メモ", "v2"})
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        for task_id, name in {
+            "a": "Buy milk",
+            "b": "牛乳を買う",
+            "c": "東京都の会議資料",
+            "d": "京都旅行の計画",
+            "e": "Buying ＭＩＬＫ tea",
+            "f": "C++ の勉強",
+            "g": "東京と京都",
+        }.items():
+            self.index.add(task_id, name)
+
+    def test_word_prefix(self):
+        self.assertEqual(self.index.search("buy"), {"a", "e"})
+        self.assertEqual(self.index.search("BUYI"), {"e"})
+        self.assertEqual(self.index.search("uy"), set())
+
+    def test_cjk(self):
+        self.assertEqual(self.index.search("牛乳"), {"b"})
+        self.assertEqual(self.index.search("京都"), {"c", "d", "g"})
+        # g は bigram の「東京」「京都」を含むが、「東京都」は含まない
+        self.assertEqual(self.index.search("東京都"), {"c"})
+        self.assertEqual(self.index.search("の"), {"c", "d", "f"})
+
+    def test_terms_are_combined(self):
+        self.assertEqual(self.index.search("milk buy"), {"a", "e"})
+        self.assertEqual(self.index.search("milk tea"), {"e"})
+        self.assertEqual(self.index.search("c++ 勉強"), {"f"})
+        self.assertEqual(self.index.search("++"), {"f"})
+
+    def test_empty_query(self):
+        self.assertIsNone(self.index.search(""))
+        self.assertIsNone(self.index.search("   "))
+
+    def test_incremental_updates(self):
+        self.index.add("a", "Sell bread")
+        self.assertEqual(self.index.search("buy"), {"e"})
+        self.assertEqual(self.index.search("bread"), {"a"})
+        self.index.remove("e")
+        self.index.remove("missing")
+        self.assertEqual(self.index.search("buy"), set())
+        self.assertEqual(len(self.index), 6)
+        self.assertNotIn("e", self.index)
+        self.assertFalse(self.index._postings.get("tea"))
+
+    def test_matches(self):
+        self.assertTrue(self.index.matches("b", "牛乳"))
+        self.assertFalse(self.index.matches("a", "牛乳"))
+        self.assertFalse(self.index.matches("missing", "buy"))
+
+    def test_matches_agrees_with_search(self):
+        for query in ("buy", "BUYI", "uy", "ilk", "milk buy", "牛乳", "京都", "東京都",
+                      "の", "c++ 勉強", "++", "乳を", "tea 京"):
+            found = self.index.search(query)
+            for task_id in "abcdefg":
+                with self.subTest(query=query, task_id=task_id):
+                    self.assertEqual(self.index.matches(task_id, query), task_id in found)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import call, patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.main
+from src.assets import translations
+from src.storage import JournalStorage
+from test_main import MockPage
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_import_skips_optional_modules(self):
+        script = (
+            f"import sys; sys.path.insert(0, {ROOT!r}); import src.main; "
+            "from src.assets import translations; "
+            "print(sorted(m for m in ('sqlite3', 'src.search', 'src.watcher') "
+            "if m in sys.modules)); print(sorted(translations._loaded))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script], check=True, capture_output=True, text=True
+        ).stdout.splitlines()
+        self.assertEqual(output, ["[]", "[]"])
+
+
+class TestTranslations(unittest.TestCase):
+    def test_get_translations(self):
+        self.assertEqual(translations.get_translations("ja")["Search"], "検索")
+        self.assertIs(translations.get_translations("ja"), translations.get_translations("ja"))
+        for lang in ("xx", "../ja"):
+            with self.assertRaises(KeyError):
+                translations.get_translations(lang)
+
+    def test_languages(self):
+        self.assertEqual(translations.languages(), ["en", "ja"])
+        translations.preload_translations()
+        self.assertEqual(sorted(translations.translations), ["en", "ja"])
+
+
+class TestFirstFrame(unittest.TestCase):
+    def test_first_frame_is_sent_before_tasks_are_loaded(self):
+        release = threading.Event()
+        updates = []
+
+        class SlowStorage(JournalStorage):
+            def load_iter(self):
+                release.wait(5)
+                return super().load_iter()
+
+        class RecordingPage(MockPage):
+            def update(self, *controls):
+                updates.append(release.is_set())
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = SlowStorage(os.path.join(tmpdir, "todos.json"))
+            storage.save([{"id": "a", "task_name": "A", "completed": False}])
+            with patch.object(src.main, "shared_storage", return_value=storage), patch.object(
+                src.main, "watch_shared_storage"
+            ) as watch_shared_storage:
+                page = RecordingPage()
+                src.main.main(page)
+                # main() は読み込みを待たずに最初の画面を送る
+                self.assertTrue(updates)
+                self.assertNotIn(True, updates)
+                release.set()
+                app = page.controls[0]
+                watched = call(page.pubsub)
+                for _ in range(100):
+                    if watched in watch_shared_storage.call_args_list:
+                        break
+                    threading.Event().wait(0.02)
+                self.assertEqual(watch_shared_storage.call_args_list.count(watched), 1)
+                self.assertEqual([task.task_name for task in app.tasks.controls], ["A"])
+
+
+if __name__ == "__main__":
+    unittest.main()
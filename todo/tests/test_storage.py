@@ -0,0 +1,713 @@
+import unittest
+import io
+import json
+import mmap
+import os
+import sys
+import tempfile
+import threading
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.storage import (
+    DebouncedWriter,
+    JsonStorage,
+    JournalStorage,
+    MappedStorage,
+    SharedStorage,
+    SqliteStorage,
+    apply_op,
+    convert_snapshot,
+    diff_tasks,
+    iter_json_array,
+    iter_snapshot,
+    open_storage,
+)
+from src.mapped_format import MappedTaskFile
+
+
+class TestApplyOp(unittest.TestCase):
+    def test_apply_op(self):
+        tasks = {}
+        apply_op(tasks, {"op": "add", "id": "a", "task_name": "Task", "completed": False})
+        apply_op(tasks, {"op": "toggle", "id": "a", "completed": True})
+        apply_op(tasks, {"op": "rename", "id": "a", "task_name": "Renamed"})
+        self.assertEqual(tasks["a"], {"id": "a", "task_name": "Renamed", "completed": True})
+        apply_op(tasks, {"op": "delete", "id": "a"})
+        self.assertEqual(tasks, {})
+
+    def test_apply_op_unknown_id(self):
+        tasks = {}
+        apply_op(tasks, {"op": "toggle", "id": "missing", "completed": True})
+        apply_op(tasks, {"op": "delete", "id": "missing"})
+        self.assertEqual(tasks, {})
+
+    def test_apply_op_unknown_operation(self):
+        with self.assertRaises(ValueError):
+            apply_op({}, {"op": "unknown", "id": "a"})
+
+
+class TestDiffTasks(unittest.TestCase):
+    def test_diff_tasks(self):
+        old = {
+            "a": {"id": "a", "task_name": "A", "completed": False},
+            "b": {"id": "b", "task_name": "B", "completed": False},
+        }
+        new = {
+            "a": {"id": "a", "task_name": "A2", "completed": True, "updated_at": 2.0},
+            "c": {"id": "c", "task_name": "C", "completed": False},
+        }
+        ops = diff_tasks(old, new)
+        self.assertEqual(
+            ops,
+            [
+                {"op": "delete", "id": "b"},
+                {"op": "toggle", "id": "a", "completed": True, "updated_at": 2.0},
+                {"op": "rename", "id": "a", "task_name": "A2", "updated_at": 2.0},
+                {"op": "add", "id": "c", "task_name": "C", "completed": False},
+            ],
+        )
+        for op in ops:
+            apply_op(old, op)
+        self.assertEqual(old, new)
+        self.assertEqual(diff_tasks(new, new), [])
+
+
+class TestIterJsonArray(unittest.TestCase):
+    def test_matches_json_load_across_chunks(self):
+        items = [
+            {"id": str(i), "task_name": f"タスク {i} [a, b] \"x\"", "completed": i % 2 == 0}
+            for i in range(50)
+        ]
+        text = json.dumps(items, ensure_ascii=False, indent=4)
+        for chunk_size in (1, 7, 64, 65536):
+            self.assertEqual(
+                list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)), items
+            )
+
+    def test_number_split_at_chunk_boundary(self):
+        self.assertEqual(list(iter_json_array(io.StringIO("[12345, 6]"), chunk_size=3)), [12345, 6])
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array(io.StringIO(" [ ] "))), [])
+
+    def test_yields_before_reading_everything(self):
+        items = iter_json_array(io.StringIO('[{"a": 1}, {"b": 2}, broken'), chunk_size=4)
+        self.assertEqual(next(items), {"a": 1})
+        self.assertEqual(next(items), {"b": 2})
+        with self.assertRaises(json.JSONDecodeError):
+            next(items)
+
+    def test_invalid(self):
+        for text in ("", "invalid json", "{}", "[1 2]", "[1,"):
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_json_array(io.StringIO(text)))
+
+
+class StorageTestBase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmpdir.name, "todos.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_snapshot(self):
+        with open(self.json_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+class TestJsonStorage(StorageTestBase):
+    def test_append_rewrites_file(self):
+        storage = JsonStorage(self.json_path)
+        storage.append({"op": "add", "id": "a", "task_name": "Task", "completed": False})
+        self.assertEqual(
+            self.read_snapshot(), [{"id": "a", "task_name": "Task", "completed": False}]
+        )
+
+    def test_load_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            JsonStorage(self.json_path).load()
+
+
+class TestDebouncedWriter(unittest.TestCase):
+    def test_coalesces_writes(self):
+        written = threading.Event()
+        writer = DebouncedWriter(written.set, interval=0.05)
+        for _ in range(1000):
+            writer.mark_dirty()
+        self.assertTrue(written.wait(5))
+        writer.close()
+        self.assertLessEqual(writer.write_count, 2)
+
+    def test_flush(self):
+        calls = []
+        writer = DebouncedWriter(lambda: calls.append(1), interval=60)
+        writer.flush()
+        self.assertEqual(calls, [])
+        writer.mark_dirty()
+        writer.mark_dirty()
+        writer.flush()
+        self.assertEqual(calls, [1])
+        writer.close()
+        self.assertEqual(calls, [1])
+
+    def test_failed_write_stays_dirty(self):
+        calls = []
+
+        def write():
+            calls.append(1)
+            if len(calls) == 1:
+                raise OSError("disk full")
+
+        writer = DebouncedWriter(write, interval=60)
+        writer.mark_dirty()
+        with self.assertRaises(OSError):
+            writer.flush()
+        writer.close()
+        self.assertEqual(len(calls), 2)
+
+
+class TestDebouncedJsonStorage(StorageTestBase):
+    def test_bulk_changes_cost_one_write(self):
+        storage = JsonStorage(self.json_path, save_interval=60)
+        for i in range(5000):
+            storage.append(
+                {"op": "add", "id": str(i), "task_name": f"Task {i}", "completed": True}
+            )
+        storage.delete_many([str(i) for i in range(5000)])
+        self.assertFalse(os.path.exists(self.json_path))
+        storage.flush()
+        self.assertEqual(self.read_snapshot(), [])
+        self.assertEqual(storage._writer.write_count, 1)
+        storage.close()
+
+    def test_load_flushes_pending_changes(self):
+        storage = JsonStorage(self.json_path, save_interval=60)
+        storage.append({"op": "add", "id": "a", "task_name": "A", "completed": False})
+        self.assertEqual(len(storage.load()), 1)
+        storage.close()
+
+
+class TestJournalStorage(StorageTestBase):
+    def test_load_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            JournalStorage(self.json_path).load()
+
+    def test_append_only_writes_log(self):
+        storage = JournalStorage(self.json_path)
+        storage.append({"op": "add", "id": "a", "task_name": "Task", "completed": False})
+        self.assertFalse(os.path.exists(self.json_path))
+        with open(storage.log_path, "r", encoding="utf-8") as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+    def test_load_replays_snapshot_and_log(self):
+        storage = JournalStorage(self.json_path)
+        storage.save([{"id": "a", "task_name": "A", "completed": False}])
+        storage.append({"op": "add", "id": "b", "task_name": "B", "completed": False})
+        storage.append({"op": "toggle", "id": "a", "completed": True})
+
+        task_list = JournalStorage(self.json_path).load()
+        self.assertEqual(
+            task_list,
+            [
+                {"id": "a", "task_name": "A", "completed": True},
+                {"id": "b", "task_name": "B", "completed": False},
+            ],
+        )
+
+    def test_load_iter_keeps_snapshot_order(self):
+        storage = JournalStorage(self.json_path)
+        storage.save(
+            [{"id": task_id, "task_name": task_id, "completed": False} for task_id in "abc"]
+        )
+        storage.append({"op": "rename", "id": "b", "task_name": "B"})
+        storage.append({"op": "delete", "id": "a"})
+        storage.append({"op": "add", "id": "d", "task_name": "d", "completed": False})
+        storage.append({"op": "delete", "id": "c"})
+        storage.append({"op": "add", "id": "c", "task_name": "C", "completed": True})
+
+        task_list = list(JournalStorage(self.json_path).load_iter())
+        self.assertEqual(
+            task_list,
+            [
+                {"id": "b", "task_name": "B", "completed": False},
+                {"id": "d", "task_name": "d", "completed": False},
+                {"id": "c", "task_name": "C", "completed": True},
+            ],
+        )
+
+        # 読み込んだ内容に続けて追記できる
+        storage = JournalStorage(self.json_path)
+        storage.load()
+        self.assertEqual(storage.count_active(), 2)
+
+    def test_load_ignores_truncated_line(self):
+        storage = JournalStorage(self.json_path)
+        storage.append({"op": "add", "id": "a", "task_name": "A", "completed": False})
+        with open(storage.log_path, "a", encoding="utf-8") as f:
+            f.write('{"op": "delete", "i')
+        self.assertEqual(len(JournalStorage(self.json_path).load()), 1)
+
+    def test_load_assigns_ids_to_legacy_file(self):
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump([{"task_name": "Task", "completed": False}], f)
+        task_list = JournalStorage(self.json_path).load()
+        # 割り当てた id はスナップショットに書き戻される
+        self.assertEqual(self.read_snapshot(), task_list)
+        self.assertIsNotNone(task_list[0]["id"])
+
+    def test_compaction(self):
+        storage = JournalStorage(self.json_path, compact_threshold=10)
+        for i in range(15):
+            storage.append(
+                {"op": "add", "id": str(i), "task_name": f"Task {i}", "completed": False}
+            )
+        storage.close()
+        self.assertEqual(len(self.read_snapshot()), 10)
+        self.assertFalse(os.path.exists(storage.rotated_log_path))
+        self.assertEqual(len(JournalStorage(self.json_path).load()), 15)
+
+    def test_load_finishes_interrupted_compaction(self):
+        storage = JournalStorage(self.json_path)
+        storage.append({"op": "add", "id": "a", "task_name": "A", "completed": False})
+        os.replace(storage.log_path, storage.rotated_log_path)
+        storage.append({"op": "add", "id": "b", "task_name": "B", "completed": False})
+
+        task_list = JournalStorage(self.json_path).load()
+        self.assertEqual([task["id"] for task in task_list], ["a", "b"])
+        self.assertEqual(self.read_snapshot(), task_list)
+        self.assertFalse(os.path.exists(storage.log_path))
+        self.assertFalse(os.path.exists(storage.rotated_log_path))
+
+
+class TestBinarySnapshot(StorageTestBase):
+    def test_json_storage_writes_binary(self):
+        storage = JsonStorage(self.json_path, snapshot_format="binary")
+        storage.append({"op": "add", "id": "a", "task_name": "A", "completed": False})
+        with open(self.json_path, "rb") as f:
+            self.assertEqual(f.read(4), b"TODO")
+        self.assertEqual(
+            JsonStorage(self.json_path).load(),
+            [{"id": "a", "task_name": "A", "completed": False}],
+        )
+
+    def test_journal_compacts_to_binary(self):
+        storage = JournalStorage(self.json_path, compact_threshold=10, snapshot_format="binary")
+        for i in range(15):
+            storage.append(
+                {"op": "add", "id": str(i), "task_name": f"Task {i}", "completed": False}
+            )
+        storage.close()
+        self.assertEqual(len(JournalStorage(self.json_path).load()), 15)
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            JsonStorage(self.json_path, snapshot_format="xml")
+
+    def test_convert_snapshot(self):
+        storage = JournalStorage(self.json_path)
+        storage.save([{"id": "a", "task_name": "A", "completed": False}])
+        storage.append({"op": "toggle", "id": "a", "completed": True})
+        binary_path = os.path.join(self.tmpdir.name, "todos.tdb")
+
+        self.assertEqual(convert_snapshot(self.json_path, binary_path), 1)
+        expected = [{"id": "a", "task_name": "A", "completed": True}]
+        self.assertEqual(JournalStorage(binary_path).load(), expected)
+        self.assertLess(os.path.getsize(binary_path), os.path.getsize(self.json_path))
+
+        # 同じパスに戻すと操作ログも取り込まれる
+        convert_snapshot(binary_path, self.json_path, "json")
+        self.assertEqual(self.read_snapshot(), expected)
+        self.assertFalse(os.path.exists(storage.log_path))
+
+
+class TestMappedStorage(StorageTestBase):
+    def add(self, storage, task_id):
+        storage.append({"op": "add", "id": task_id, "task_name": task_id, "completed": False})
+
+    def test_converts_and_maps(self):
+        JournalStorage(self.json_path).save(
+            [{"id": str(i), "task_name": f"Task {i}", "completed": i < 3} for i in range(10)]
+        )
+        storage = MappedStorage(self.json_path)
+        task_list = storage.load()
+        self.assertEqual(task_list[3], {"id": "3", "task_name": "Task 3", "completed": False})
+        with open(self.json_path, "rb") as f:
+            self.assertEqual(f.read(4), b"TODX")
+        self.assertEqual(storage.count_active(), 7)
+
+    def test_appends_are_logged_and_folded_on_load(self):
+        storage = MappedStorage(self.json_path)
+        storage.save([{"id": "a", "task_name": "A", "completed": False}])
+        storage.load()
+        storage.append({"op": "toggle", "id": "a", "completed": True})
+        storage.append({"op": "add", "id": "b", "task_name": "B", "completed": False})
+        self.assertEqual(storage.count_active(), 1)
+        self.assertTrue(os.path.exists(storage.log_path))
+
+        storage = MappedStorage(self.json_path)
+        self.assertEqual(
+            storage.load(),
+            [
+                {"id": "a", "task_name": "A", "completed": True},
+                {"id": "b", "task_name": "B", "completed": False},
+            ],
+        )
+        self.assertFalse(os.path.exists(storage.log_path))
+
+    def test_compaction(self):
+        storage = MappedStorage(self.json_path, compact_threshold=10)
+        storage.save([{"id": "a", "task_name": "A", "completed": False}])
+        storage.load()
+        for i in range(15):
+            storage.append(
+                {"op": "add", "id": str(i), "task_name": f"Task {i}", "completed": False}
+            )
+        storage.close()
+        self.assertEqual(len(MappedStorage(self.json_path).load()), 16)
+
+    def test_load_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            MappedStorage(self.json_path).load()
+
+    def test_maps_are_closed_before_rewrite(self):
+        storage = MappedStorage(self.json_path, compact_threshold=3)
+        storage.save([{"id": "a", "task_name": "A", "completed": False}])
+        rows = storage.load()
+        mapped = rows[0].file
+        self.assertIsInstance(mapped._mm, mmap.mmap)
+        for i in range(3):
+            self.add(storage, str(i))
+        storage.close()
+        # コンパクションの前に閉じ、読み込んだ行は読み出せるまま
+        self.assertNotIsInstance(mapped._mm, mmap.mmap)
+        self.assertEqual(dict(rows[0]), {"id": "a", "task_name": "A", "completed": False})
+
+        rows = storage.load()
+        storage.save(list(rows))
+        self.assertNotIsInstance(rows[0].file._mm, mmap.mmap)
+        self.assertEqual(len(MappedStorage(self.json_path).load()), 4)
+
+    def test_iter_snapshot_closes_map(self):
+        MappedStorage(self.json_path).save([{"id": "a", "task_name": "A", "completed": False}])
+        close = MappedTaskFile.close
+        with mock.patch.object(MappedTaskFile, "close", autospec=True, side_effect=close) as closed:
+            self.assertEqual(len(list(iter_snapshot(self.json_path))), 1)
+        closed.assert_called_once()
+
+
+class TestSharedStorage(StorageTestBase):
+    def test_writes_go_through_and_loads_come_from_memory(self):
+        storage = SharedStorage(JournalStorage(self.json_path))
+        with self.assertRaises(FileNotFoundError):
+            storage.load()
+        storage.append({"op": "add", "id": "a", "task_name": "A", "completed": False})
+        storage.append({"op": "add", "id": "b", "task_name": "B", "completed": True})
+        storage.delete_many(["b"])
+        self.assertEqual(storage.load(), [{"id": "a", "task_name": "A", "completed": False}])
+        self.assertEqual(storage.count_active(), 1)
+        self.assertEqual(JournalStorage(self.json_path).load(), storage.load())
+
+    def test_sync_changes(self):
+        storage = SharedStorage(JournalStorage(self.json_path))
+        received = []
+        storage.on_external_ops = received.append
+        # まだ読み込んでいない
+        self.assertEqual(storage.sync_changes(), [])
+        storage.append({"op": "add", "id": "a", "task_name": "A", "completed": False})
+        self.assertEqual(storage.sync_changes(), [])
+
+        other = JournalStorage(self.json_path)
+        other.load()
+        other.append({"op": "toggle", "id": "a", "completed": True})
+        other.append({"op": "add", "id": "b", "task_name": "B", "completed": False})
+        ops = storage.sync_changes()
+        self.assertEqual(
+            [(op["op"], op["id"]) for op in ops], [("toggle", "a"), ("add", "b")]
+        )
+        self.assertEqual(received, [ops])
+        self.assertEqual(storage.sync_changes(), [])
+        self.assertEqual([task["id"] for task in storage.load()], ["a", "b"])
+
+        # load() で読み直した変更も on_external_ops に渡す
+        other.delete_many(["a"])
+        self.assertEqual([task["id"] for task in storage.load()], ["b"])
+        self.assertEqual(received[-1], [{"op": "delete", "id": "a"}])
+        storage.close()
+        other.close()
+
+    def test_concurrent_appends(self):
+        storage = SharedStorage(JournalStorage(self.json_path, compact_threshold=50))
+
+        def add(prefix):
+            for i in range(100):
+                storage.append(
+                    {"op": "add", "id": f"{prefix}{i}", "task_name": "", "completed": False}
+                )
+
+        threads = [threading.Thread(target=add, args=(prefix,)) for prefix in "abcd"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        storage.close()
+        self.assertEqual(len(storage.load()), 400)
+        self.assertEqual(len(JournalStorage(self.json_path).load()), 400)
+
+
+class TestConcurrentWriters(StorageTestBase):
+    """同じファイルを使う2つの保存先 (2つのプロセスに相当)。"""
+
+    def add(self, storage, task_id, completed=False):
+        storage.append(
+            {"op": "add", "id": task_id, "task_name": task_id.upper(), "completed": completed}
+        )
+
+    def ids(self, storage):
+        return [task["id"] for task in storage.load()]
+
+    def test_journal_change_detection(self):
+        first = JournalStorage(self.json_path)
+        self.add(first, "a")
+        second = JournalStorage(self.json_path)
+        second.load()
+        self.assertFalse(first.changed())
+        self.assertFalse(second.changed())
+
+        self.add(first, "b")
+        self.assertFalse(first.changed())
+        self.assertTrue(second.changed())
+        second.load()
+        self.assertFalse(second.changed())
+
+    def test_journal_append_after_external_write(self):
+        first = JournalStorage(self.json_path)
+        first.save([])
+        second = JournalStorage(self.json_path)
+        second.load()
+        self.add(first, "a")
+        self.add(second, "b")
+        # 追記の前に読み直しているので、手元のタスクにも a がある
+        self.assertEqual(second.count_active(), 2)
+        self.assertEqual(self.ids(JournalStorage(self.json_path)), ["a", "b"])
+
+    def test_journal_save_merges_stale_write(self):
+        first = JournalStorage(self.json_path)
+        first.save(
+            [
+                {"id": "a", "task_name": "A", "completed": False},
+                {"id": "b", "task_name": "B", "completed": False},
+            ]
+        )
+        second = JournalStorage(self.json_path)
+        second.load()
+        self.add(first, "c")
+        first.append({"op": "rename", "id": "b", "task_name": "B2"})
+
+        # second は c と B2 を知らないまま、a を完了にして全体を保存する
+        second.save(
+            [
+                {"id": "a", "task_name": "A", "completed": True},
+                {"id": "b", "task_name": "B", "completed": False},
+            ]
+        )
+        self.assertTrue(second.changed())
+        self.assertEqual(
+            JournalStorage(self.json_path).load(),
+            [
+                {"id": "a", "task_name": "A", "completed": True},
+                {"id": "b", "task_name": "B2", "completed": False},
+                {"id": "c", "task_name": "C", "completed": False},
+            ],
+        )
+
+    def test_journal_compaction_keeps_external_writes(self):
+        first = JournalStorage(self.json_path, compact_threshold=3)
+        first.save([])
+        second = JournalStorage(self.json_path)
+        second.load()
+        self.add(first, "a")
+        self.add(second, "b")
+        self.add(first, "c")
+        first.close()
+        self.assertEqual(self.ids(JournalStorage(self.json_path)), ["a", "b", "c"])
+
+    def test_journal_two_writers_compacting(self):
+        for interleave in (True, False):
+            with self.subTest(interleave=interleave):
+                first = JournalStorage(self.json_path, compact_threshold=3)
+                first.save([])
+                second = JournalStorage(self.json_path, compact_threshold=3)
+                second.load()
+                if interleave:
+                    for i in range(10):
+                        self.add(first, f"a{i}")
+                        self.add(second, f"b{i}")
+                else:
+                    for i in range(10):
+                        self.add(first, f"a{i}")
+                    for i in range(10):
+                        self.add(second, f"b{i}")
+                first.close()
+                second.close()
+                # 一方の退避したログをもう一方の退避で上書きしない
+                self.assertEqual(
+                    sorted(self.ids(JournalStorage(self.json_path))),
+                    sorted([f"a{i}" for i in range(10)] + [f"b{i}" for i in range(10)]),
+                )
+
+    def test_json_storage_merges_stale_write(self):
+        first = JsonStorage(self.json_path)
+        first.save([{"id": "a", "task_name": "A", "completed": False}])
+        second = JsonStorage(self.json_path)
+        second.load()
+        self.add(first, "b")
+        self.assertTrue(second.changed())
+        second.append({"op": "toggle", "id": "a", "completed": True})
+        self.assertEqual(
+            self.read_snapshot(),
+            [
+                {"id": "a", "task_name": "A", "completed": True},
+                {"id": "b", "task_name": "B", "completed": False},
+            ],
+        )
+        # b を取り込んだので、読み直すまでは変更ありと判定する
+        self.assertTrue(second.changed())
+
+    def test_save_keeps_external_rows_folded_by_append(self):
+        for storage_class in (JsonStorage, JournalStorage):
+            with self.subTest(storage=storage_class.__name__):
+                storage_class(self.json_path).save(
+                    [{"id": "seed", "task_name": "Seed", "completed": False}]
+                )
+                first = storage_class(self.json_path)
+                first.load()
+                second = storage_class(self.json_path)
+                tasks = second.load()
+                self.add(first, "a")
+                # 追記の前に a を取り込むが、second の呼び出し側は a を知らない
+                second.append({"op": "toggle", "id": "seed", "completed": True})
+                tasks[0]["completed"] = True
+                second.save(tasks)
+                self.assertEqual(self.ids(storage_class(self.json_path)), ["seed", "a"])
+
+                # 知っているタスクを消した保存は、そのまま削除になる
+                second.save([])
+                self.assertEqual(self.ids(storage_class(self.json_path)), ["a"])
+                second.close()
+
+    def test_json_storage_concurrent_threads(self):
+        JsonStorage(self.json_path).save([])
+
+        def add_many(prefix):
+            storage = JsonStorage(self.json_path)
+            storage.load()
+            for i in range(20):
+                self.add(storage, f"{prefix}{i}")
+
+        threads = [threading.Thread(target=add_many, args=(prefix,)) for prefix in "abc"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.read_snapshot()), 60)
+
+    def test_sqlite_change_detection(self):
+        db_path = os.path.join(self.tmpdir.name, "todos.db")
+        first = SqliteStorage(db_path)
+        first.save([])
+        second = SqliteStorage(db_path)
+        second.load()
+        self.assertFalse(second.changed())
+        self.add(first, "a")
+        self.assertTrue(second.changed())
+        self.assertEqual(self.ids(second), ["a"])
+        self.assertFalse(second.changed())
+        first.close()
+        second.close()
+
+
+class TestSqliteStorage(StorageTestBase):
+    def setUp(self):
+        super().setUp()
+        self.db_path = os.path.join(self.tmpdir.name, "todos.db")
+        self.storage = SqliteStorage(self.db_path)
+
+    def tearDown(self):
+        self.storage.close()
+        super().tearDown()
+
+    def test_load_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            self.storage.load()
+
+    def test_append_and_load(self):
+        self.storage.append({"op": "add", "id": "a", "task_name": "A", "completed": False})
+        self.storage.append({"op": "add", "id": "b", "task_name": "B", "completed": False})
+        self.storage.append({"op": "toggle", "id": "a", "completed": True})
+        self.storage.append({"op": "rename", "id": "b", "task_name": "B2"})
+        self.storage.close()
+
+        storage = SqliteStorage(self.db_path)
+        self.assertEqual(
+            storage.load(),
+            [
+                {"id": "a", "task_name": "A", "completed": True},
+                {"id": "b", "task_name": "B2", "completed": False},
+            ],
+        )
+        storage.close()
+
+    def test_wal_and_index(self):
+        self.storage.save([])
+        conn = self.storage._connect()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN " + SqliteStorage.COUNT_ACTIVE
+        ).fetchall()
+        self.assertIn("tasks_completed", " ".join(row[-1] for row in plan))
+
+    def test_count_active_and_delete_many(self):
+        self.storage.save(
+            [
+                {"id": "a", "task_name": "A", "completed": True},
+                {"id": "b", "task_name": "B", "completed": False},
+                {"id": "c", "task_name": "C", "completed": True},
+            ]
+        )
+        self.assertEqual(self.storage.count_active(), 1)
+        self.storage.delete_many(["a", "c"])
+        self.assertEqual([task["id"] for task in self.storage.load()], ["b"])
+
+
+class TestOpenStorage(unittest.TestCase):
+    def test_schemes(self):
+        self.assertIsInstance(open_storage("json:///storage/todos.json"), JsonStorage)
+        self.assertIsInstance(
+            open_storage("journal:///storage/todos.json"), JournalStorage
+        )
+        storage = open_storage("sqlite:///storage/todos.db")
+        self.assertIsInstance(storage, SqliteStorage)
+        self.assertEqual(storage.db_path, "storage/todos.db")
+        self.assertEqual(open_storage("sqlite:////tmp/todos.db").db_path, "/tmp/todos.db")
+
+    def test_query_options(self):
+        storage = open_storage("json:///storage/todos.json?save_interval=0.5")
+        self.assertEqual(storage.json_path, "storage/todos.json")
+        self.assertEqual(storage._writer.interval, 0.5)
+        storage = open_storage("journal:///storage/todos.json?compact_threshold=10")
+        self.assertEqual(storage.compact_threshold, 10)
+        storage = open_storage("journal:///storage/todos.tdb?snapshot_format=binary")
+        self.assertEqual(storage._write_snapshot.__name__, "write_binary")
+
+    def test_unsupported_scheme(self):
+        with self.assertRaises(ValueError):
+            open_storage("redis://localhost")
+        with self.assertRaises(ValueError):
+            open_storage("storage/todos.json")
+
+
+if __name__ == "__main__":
+    unittest.main()
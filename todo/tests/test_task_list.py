@@ -0,0 +1,137 @@
+import unittest
+from unittest.mock import Mock
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.main import Task
+from src.models import TaskRecord, TaskStore
+from src.task_list import VirtualTaskList
+
+
+def scroll_event(pixels, viewport_dimension=600):
+    event = Mock()
+    event.pixels = pixels
+    event.viewport_dimension = viewport_dimension
+    return event
+
+
+class TestLazyTask(unittest.TestCase):
+    def test_controls_built_on_demand(self):
+        task = Task(
+            "Test Task", None, None, None, None, TaskRecord("Test Task", completed=True)
+        )
+        self.assertFalse(task.built)
+        self.assertEqual(task.controls, [])
+        self.assertTrue(task.display_task.value)
+        self.assertEqual(task.display_task.label, "Test Task")
+        self.assertTrue(task.built)
+        self.assertEqual(len(task.controls), 2)
+
+    def test_release(self):
+        task = Task("Test Task", None, None, None, None)
+        task.build()
+        task.release()
+        self.assertFalse(task.built)
+        self.assertEqual(task.controls, [])
+        self.assertFalse(task.editing)
+
+
+class TestVirtualTaskList(unittest.TestCase):
+    def setUp(self):
+        self.store = TaskStore()
+        self.records = [TaskRecord(f"Task {i}") for i in range(5_000)]
+        for record in self.records:
+            self.store.add(record)
+        self.hidden = set()
+        self.created = []
+        self.list = VirtualTaskList(
+            self.store,
+            self.create_task,
+            lambda record: record.id not in self.hidden,
+            item_extent=50,
+            overscan=5,
+            height=500,
+        )
+        self.list.page = Mock()
+
+    def create_task(self, record):
+        task = Task(None, None, None, None, None, record)
+        self.created.append(task)
+        return task
+
+    def records_of(self, tasks):
+        return [task.record for task in tasks]
+
+    def test_only_window_is_sent(self):
+        self.list._build_add_commands(added_controls=[])
+        children = self.list._get_children()
+        # 表示中の 11 行と後ろの overscan 5 行だけに Task を作る
+        self.assertEqual(len(children), 16)
+        self.assertEqual(self.records_of(children), self.records[:16])
+        self.assertEqual(len(self.created), 16)
+        self.assertTrue(all(task.built for task in children))
+        self.assertEqual(set(self.list.built_tasks), {r.id for r in self.records[:16]})
+        self.assertEqual(self.list.padding.top, 0)
+        self.assertEqual(self.list.padding.bottom, (5_000 - 16) * 50)
+
+    def test_scrolled(self):
+        self.list.before_update()
+        self.list.scrolled(scroll_event(10_000))
+        self.list.page.update.assert_called_once_with(self.list)
+        self.list.before_update()
+        children = self.list._get_children()
+        self.assertEqual(self.records_of(children), self.records[195:218])
+        self.assertEqual(self.list.padding.top, 195 * 50)
+
+        # 同じ範囲に収まるスクロールでは更新しない
+        self.list.scrolled(scroll_event(10_010))
+        self.list.page.update.assert_called_once_with(self.list)
+
+    def test_tasks_are_recycled(self):
+        self.list.before_update()
+        first_window = list(self.list._get_children())
+        for task in first_window:
+            task.build()
+        self.list.scroll_offset = 10_000
+        self.list.before_update()
+        children = self.list._get_children()
+        # 範囲から外れた Task を新しい範囲のレコードに使い回す
+        self.assertEqual(len(self.created), 21)
+        self.assertTrue(set(map(id, first_window)) <= set(map(id, children)))
+        self.assertEqual(self.records_of(children), self.records[195:216])
+        for task in children:
+            self.assertEqual(task.display_task.label, task.record.name)
+        self.assertEqual(len(self.list.built_tasks), 21)
+
+    def test_editing_task_is_kept(self):
+        self.list.before_update()
+        editing = self.list._get_children()[0]
+        editing.edit_view.visible = True
+        self.list.scroll_offset = 10_000
+        self.list.before_update()
+        self.assertNotIn(editing, self.list._get_children())
+        self.assertIs(self.list.built_tasks[self.records[0].id], editing)
+        self.assertTrue(editing.built)
+        self.list.scroll_offset = 0
+        self.list.before_update()
+        self.assertIs(self.list._get_children()[0], editing)
+
+    def test_hidden_tasks_are_skipped(self):
+        self.hidden = {record.id for record in self.records[::2]}
+        self.list.before_update()
+        children = self.list._get_children()
+        self.assertEqual(self.records_of(children), self.records[1:32:2])
+        self.assertEqual(self.list.padding.bottom, (2_500 - 16) * 50)
+
+    def test_window_clamped_after_shrink(self):
+        self.list.scroll_offset = 1_000_000
+        self.store.remove_many([record.id for record in self.records[10:]])
+        self.list.before_update()
+        self.assertEqual(self.list._get_children(), [])
+        self.assertEqual(self.list.padding.top, 10 * 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.storage import write_json
+from src.watcher import FileWatcher, _load_libc
+
+
+class FileWatcherTestBase:
+    use_inotify = True
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "todos.json")
+        self.events = []
+        self.notified = threading.Event()
+        self.watcher = FileWatcher(
+            [self.path], self.callback, interval=0.02, use_inotify=self.use_inotify
+        )
+        self.watcher.start()
+
+    def tearDown(self):
+        self.watcher.stop()
+        self.tmpdir.cleanup()
+
+    def callback(self):
+        self.events.append(os.path.exists(self.path))
+        self.notified.set()
+
+    def wait(self):
+        notified = self.notified.wait(2)
+        self.notified.clear()
+        return notified
+
+    def test_replaced_file_is_reported(self):
+        write_json(self.path, [])
+        self.assertTrue(self.wait())
+        write_json(self.path, [{"id": "a", "task_name": "A", "completed": False}])
+        self.assertTrue(self.wait())
+        self.assertTrue(all(self.events))
+
+    def test_removed_file_is_reported(self):
+        write_json(self.path, [])
+        self.assertTrue(self.wait())
+        os.remove(self.path)
+        self.assertTrue(self.wait())
+        self.assertFalse(self.events[-1])
+
+    def test_other_files_are_ignored(self):
+        with open(os.path.join(self.tmpdir.name, "other.txt"), "w") as f:
+            f.write("x")
+        self.assertFalse(self.notified.wait(0.2))
+
+    def test_stop(self):
+        self.watcher.stop()
+        self.assertFalse(self.watcher.running)
+        write_json(self.path, [])
+        self.assertFalse(self.notified.wait(0.2))
+
+
+@unittest.skipIf(_load_libc() is None, "inotify is not available")
+class TestInotifyWatcher(FileWatcherTestBase, unittest.TestCase):
+    def test_backend(self):
+        self.assertEqual(self.watcher.backend, "inotify")
+
+    def test_burst_is_reported_once(self):
+        for i in range(5):
+            write_json(self.path, [])
+        self.assertTrue(self.wait())
+        self.assertFalse(self.notified.wait(0.2))
+        self.assertEqual(len(self.events), 1)
+
+
+class TestPollingWatcher(FileWatcherTestBase, unittest.TestCase):
+    use_inotify = False
+
+    def test_backend(self):
+        self.assertEqual(self.watcher.backend, "polling")
+
+
+class TestMissingDirectory(unittest.TestCase):
+    def test_falls_back_to_polling(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "missing", "todos.json")
+            watcher = FileWatcher([path], lambda: None, interval=0.02)
+            watcher.start()
+            try:
+                self.assertEqual(watcher.backend, "polling")
+            finally:
+                watcher.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
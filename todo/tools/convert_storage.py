@@ -0,0 +1,35 @@
+"""保存済みのタスクを JSON 形式とバイナリ形式の間で変換する。
+
+操作ログ (.log, .log.1) も反映してから書き出す。読み込むときは形式を自動で判定する。
+
+実行方法 (todo ディレクトリで):
+
+    python tools/convert_storage.py storage/todos.json storage/todos.tdb
+    python tools/convert_storage.py storage/todos.tdb storage/todos.json --format json
+
+変換したファイルを使うには、保存先の URL で形式を指定する:
+
+    journal:///storage/todos.tdb?snapshot_format=binary
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.storage import SNAPSHOT_WRITERS, convert_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("src", help="変換元のファイル")
+    parser.add_argument("dst", help="変換先のファイル (変換元と同じでもよい)")
+    parser.add_argument("--format", choices=sorted(SNAPSHOT_WRITERS), default="binary")
+    args = parser.parse_args()
+
+    count = convert_snapshot(args.src, args.dst, args.format)
+    print(f"{count} tasks written to {args.dst} ({args.format})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""計測結果のファイル (TODO_METRICS) をヒストグラムの表として表示する。
+
+計測するには、環境変数 TODO_METRICS に書き出すファイルのパスを指定してアプリを起動する:
+
+    TODO_METRICS=storage/metrics.json flet run
+
+実行方法 (todo ディレクトリで):
+
+    python tools/show_metrics.py storage/metrics.json
+    python tools/show_metrics.py storage/metrics.json --buckets handler.TodoApp.add_clicked
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.instrumentation import format_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="計測結果の JSON ファイル")
+    parser.add_argument("--buckets", nargs="*", default=[], help="区間ごとの件数を表示する名前")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    print(format_metrics(snapshot))
+    for name in args.buckets:
+        print(f"\n{name}")
+        for bucket, count in snapshot[name].get("buckets", {}).items():
+            print(f"  {bucket:>12} {count:>7} {'#' * min(count, 60)}")
+
+
+if __name__ == "__main__":
+    main()